@@ -0,0 +1,21 @@
+# api/admin_router.py
+
+from fastapi import APIRouter, Depends, Query
+
+from schemas import StandardResponse, UsageStats, UserInDB
+from auth import get_current_admin
+from services.usage_service import usage_stats
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"]
+)
+
+@router.get("/usage", response_model=StandardResponse[UsageStats])
+async def get_usage_stats(
+    days: int = Query(30, ge=1, le=365),
+    top_users: int = Query(20, ge=1, le=200),
+    current_admin: UserInDB = Depends(get_current_admin)
+):
+    """Gemini token usage and estimated cost, overall, per endpoint and model, and for the heaviest users."""
+    return StandardResponse(data=UsageStats(**usage_stats(days, top_users)))
@@ -1,22 +1,40 @@
 import os
+import re
+import json
+import wave
 import asyncio
 from datetime import datetime
 import assemblyai as aai
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse # <-- Import FileResponse
+from typing import Optional
+from fastapi import (
+    APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Header, WebSocket
+)
+from starlette.websockets import WebSocketState
+from fastapi.responses import FileResponse, Response # <-- Import FileResponse
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.collection import Collection
 
 from schemas import (
     AppointmentCreate, AppointmentUpdate, AppointmentInDB, UserInDB, StandardResponse,
-    SimpleMessageResponse, TranscriptionResponse
+    SimpleMessageResponse, TranscriptionResponse, PatientTimeline, UploadCreateRequest, UploadStatus
 )
-from auth import get_current_user
+from auth import get_current_user, get_user_from_token
 from database import get_db_collections
-from services.gemini_service import generate_soap_summary, generate_structured_summary
+from services.summary_service import summarize_transcript, record_summary_usage, diagnosis_terms
+from services.gemini_service import retrieval_index, SummaryGenerationError
+from services.upload_service import (
+    upload_store, parse_checksum_header, UploadError, UploadOffsetMismatch, UploadChecksumMismatch,
+    UploadLengthExceeded, UploadIncomplete
+)
+from services.transcription_service import create_streaming_session, StreamingTranscriptionSession
 from config import settings
+from metrics import track_dependency
 # --- NEW IMPORT ---
-from neo4j_driver import create_appointment_node_and_link_to_user
+from neo4j_driver import (
+    create_appointment_node_and_link_to_user, update_appointment_node, delete_appointment_node,
+    link_appointment_conditions, get_patient_timeline
+)
 
 # CRITICAL: Ensure this line exists and the variable is named 'router'
 router = APIRouter(
@@ -25,6 +43,30 @@ router = APIRouter(
 )
 
 aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
+if settings.ASSEMBLYAI_BASE_URL:
+    aai.settings.base_url = settings.ASSEMBLYAI_BASE_URL
+
+# Fields a client may request via `fields=`. The fields AppointmentInDB cannot
+# be built without are always included. Routes that take `fields=` set
+# response_model_exclude_unset so a projected-out field is omitted rather than
+# filled with its model default; they set the envelope fields explicitly so
+# those are always returned.
+APPOINTMENT_FIELDS = {
+    "doctor_name", "specialization", "reason", "appointment_time", "created_at", "user_id",
+    "transcript", "summary", "structured_summary", "audio_path", "processed_at", "summary_usage",
+    "diagnoses", "medications"
+}
+REQUIRED_APPOINTMENT_FIELDS = {"user_id", "appointment_time"}
+
+def _appointment_projection(fields: Optional[str]) -> Optional[dict]:
+    """Builds a Mongo projection from a comma-separated `fields` parameter."""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - APPOINTMENT_FIELDS
+    if unknown:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown appointment fields: {', '.join(sorted(unknown))}")
+    return {field: 1 for field in requested | REQUIRED_APPOINTMENT_FIELDS}
 
 @router.post("/", response_model=StandardResponse[AppointmentInDB], status_code=status.HTTP_201_CREATED)
 async def create_appointment(
@@ -42,27 +84,95 @@ async def create_appointment(
 
     # --- NEW: Add appointment to Neo4j ---
     try:
-        create_appointment_node_and_link_to_user(
+        await create_appointment_node_and_link_to_user(
             email=current_user.email,
             appointment_id=str(created_appointment["_id"]),
             doctor_name=created_appointment["doctor_name"],
             specialization=created_appointment["specialization"],
-            appointment_time=created_appointment["appointment_time"]
+            appointment_time=created_appointment["appointment_time"],
+            reason=created_appointment.get("reason")
         )
     except Exception as e:
         print(f"CRITICAL: Failed to create Neo4j appointment node for user {current_user.email}. Error: {e}")
     
     return StandardResponse(data=AppointmentInDB(**created_appointment), message="Appointment created successfully.")
 
-@router.get("/", response_model=StandardResponse[list[AppointmentInDB]])
+@router.get("/", response_model=StandardResponse[list[AppointmentInDB]], response_model_exclude_unset=True)
 async def get_user_appointments(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. doctor_name,appointment_time"),
     current_user: UserInDB = Depends(get_current_user),
     collections: tuple = Depends(get_db_collections)
 ):
     _, _, appointment_collection = collections
-    appointments = appointment_collection.find({"user_id": str(current_user.id)}).sort("appointment_time", -1)
+    projection = _appointment_projection(fields)
+    appointments = appointment_collection.find({"user_id": str(current_user.id)}, projection).sort("appointment_time", -1)
     appointment_list = [AppointmentInDB(**appt) for appt in appointments]
-    return StandardResponse(data=appointment_list)
+    return StandardResponse(status=True, data=appointment_list, message=None)
+
+@router.get("/timeline", response_model=StandardResponse[PatientTimeline])
+async def get_appointment_timeline(
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Returns the user's appointment timeline, specialisation history and conditions from the graph."""
+    try:
+        timeline = await get_patient_timeline(current_user.email)
+    except Exception as e:
+        print(f"CRITICAL: Failed to read Neo4j timeline for user {current_user.email}. Error: {e}")
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Timeline is temporarily unavailable.")
+    return StandardResponse(data=PatientTimeline(**timeline))
+
+@router.get("/search", response_model=StandardResponse[list[AppointmentInDB]], response_model_exclude_unset=True)
+async def search_appointments(
+    diagnosis: Optional[str] = Query(None, min_length=2, max_length=100, description="Diagnosis name or prefix, e.g. diabetes"),
+    medication: Optional[str] = Query(None, min_length=2, max_length=100, description="Medication name or prefix, e.g. metformin"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserInDB = Depends(get_current_user),
+    collections: tuple = Depends(get_db_collections)
+):
+    """
+    Finds the user's appointments whose extracted diagnoses/medications
+    contain words starting with every word of the given terms, so "diabetes"
+    finds "type 2 diabetes mellitus". Anchored, lowercased word prefixes let
+    Mongo answer from the (user_id, diagnosis_tokens) and (user_id,
+    medication_tokens) indexes.
+    """
+    _, _, appointment_collection = collections
+    if not diagnosis and not medication:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Provide a diagnosis or a medication to search for.")
+
+    query = {"user_id": str(current_user.id)}
+    for field, term in (("diagnosis_tokens", diagnosis), ("medication_tokens", medication)):
+        words = re.findall(r"[a-z0-9]+", (term or "").lower())
+        if words:
+            query[field] = {"$all": [re.compile(f"^{re.escape(word)}") for word in words]}
+        elif term:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, f"'{term}' contains no searchable words.")
+    # Transcripts are large and not needed to list matches, so they are left out by default.
+    projection = _appointment_projection(fields) or {"transcript": 0}
+    appointments = appointment_collection.find(query, projection).sort("appointment_time", -1).limit(limit)
+    return StandardResponse(status=True, data=[AppointmentInDB(**appt) for appt in appointments], message=None)
+
+@router.get("/{appointment_id}", response_model=StandardResponse[AppointmentInDB], response_model_exclude_unset=True)
+async def get_appointment(
+    appointment_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    current_user: UserInDB = Depends(get_current_user),
+    collections: tuple = Depends(get_db_collections)
+):
+    """Fetch a single appointment"""
+    _, _, appointment_collection = collections
+
+    if not ObjectId.is_valid(appointment_id):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid appointment ID.")
+
+    appointment = appointment_collection.find_one(
+        {"_id": ObjectId(appointment_id), "user_id": str(current_user.id)},
+        _appointment_projection(fields)
+    )
+    if not appointment:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Appointment not found.")
+    return StandardResponse(status=True, data=AppointmentInDB(**appointment), message=None)
 
 @router.patch("/{appointment_id}", response_model=StandardResponse[AppointmentInDB])
 async def update_appointment(
@@ -95,6 +205,11 @@ async def update_appointment(
         {"_id": ObjectId(appointment_id)},
         {"$set": update_data}
     )
+
+    try:
+        await update_appointment_node(current_user.email, appointment_id, update_data)
+    except Exception as e:
+        print(f"CRITICAL: Failed to update Neo4j appointment node for user {current_user.email}. Error: {e}")
     
     # Return updated appointment
     updated_appointment = appointment_collection.find_one({"_id": ObjectId(appointment_id)})
@@ -119,6 +234,16 @@ async def delete_appointment(
     
     if result.deleted_count == 0:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Appointment not found.")
+
+    try:
+        await delete_appointment_node(current_user.email, appointment_id)
+    except Exception as e:
+        print(f"CRITICAL: Failed to delete Neo4j appointment node for user {current_user.email}. Error: {e}")
+
+    try:
+        await retrieval_index.remove_appointment(str(current_user.id), appointment_id)
+    except Exception as e:
+        print(f"CRITICAL: Failed to remove appointment {appointment_id} from the retrieval index. Error: {e}")
     
     # Also delete the audio file if it exists
     try:
@@ -157,41 +282,308 @@ async def process_appointment_audio(
     with open(file_path, "wb") as buffer:
         buffer.write(await audio_file.read())
 
+    formatted_transcript = _transcribe_file(file_path)
+    response_data = await _summarize_and_store(
+        appointment_id, formatted_transcript, file_path, current_user, appointment_collection
+    )
+    return StandardResponse(data=response_data, message="Audio processed successfully.")
+
+def _transcribe_file(file_path: str) -> str:
     try:
         transcriber = aai.Transcriber()
         config = aai.TranscriptionConfig(speaker_labels=True)
-        transcript = transcriber.transcribe(file_path, config)
+        with track_dependency("assemblyai", "transcribe"):
+            transcript = transcriber.transcribe(file_path, config)
         if transcript.status == aai.TranscriptStatus.error:
             raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, transcript.error)
-        formatted_transcript = "\n".join([f"Speaker {utt.speaker}: {utt.text}" for utt in transcript.utterances])
+        return "\n".join([f"Speaker {utt.speaker}: {utt.text}" for utt in transcript.utterances])
     except Exception as e:
         raise HTTPException(status.HTTP_502_BAD_GATEWAY, f"Failed to transcribe audio: {e}")
 
-    soap_task = generate_soap_summary(formatted_transcript)
-    structured_task = generate_structured_summary(formatted_transcript)
-    
-    summary, structured_summary = await asyncio.gather(soap_task, structured_task)
+async def _summarize_and_store(
+    appointment_id: str,
+    formatted_transcript: str,
+    audio_path: Optional[str],
+    current_user: UserInDB,
+    appointment_collection: Collection
+) -> TranscriptionResponse:
+    """Generates the SOAP and structured summaries for a transcript and saves them on the appointment."""
+    try:
+        summary_fields = await summarize_transcript(formatted_transcript)
+    except SummaryGenerationError as e:
+        # Keep the transcript so the appointment can be re-summarised later, but
+        # leave any previous summary and processed_at untouched.
+        appointment_collection.update_one(
+            {"_id": ObjectId(appointment_id)},
+            {"$set": {"transcript": formatted_transcript, "audio_path": audio_path}}
+        )
+        print(f"CRITICAL: Failed to summarise appointment {appointment_id}. Error: {e}")
+        raise HTTPException(status.HTTP_502_BAD_GATEWAY, "Failed to generate the summary. Please try again.")
 
     update_data = {
         "transcript": formatted_transcript,
-        "summary": summary,
-        "structured_summary": structured_summary,
-        "audio_path": file_path,
+        **summary_fields,
+        "audio_path": audio_path,
         "processed_at": datetime.now()
     }
-    appointment_collection.update_one(
+    appointment = appointment_collection.find_one_and_update(
         {"_id": ObjectId(appointment_id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"appointment_time": 1, "doctor_name": 1, "specialization": 1},
+        return_document=ReturnDocument.AFTER
     )
+    record_summary_usage(str(current_user.id), summary_fields, appointment_id=appointment_id)
+
+    try:
+        await retrieval_index.index_appointment(
+            str(current_user.id), appointment_id, summary_fields["summary"], formatted_transcript,
+            appointment_time=appointment["appointment_time"].isoformat(),
+            title=" - ".join(filter(None, [appointment.get("doctor_name"), appointment.get("specialization")]))
+        )
+    except Exception as e:
+        print(f"CRITICAL: Failed to index appointment {appointment_id} for retrieval. Error: {e}")
 
-    response_data = TranscriptionResponse(
+    try:
+        await link_appointment_conditions(
+            current_user.email, appointment_id, diagnosis_terms(summary_fields["structured_summary"]),
+            update_data["processed_at"]
+        )
+    except Exception as e:
+        print(f"CRITICAL: Failed to link Neo4j conditions for appointment {appointment_id}. Error: {e}")
+
+    return TranscriptionResponse(
         appointment_id=appointment_id,
         transcript=formatted_transcript,
-        summary=summary,
-        structured_summary=structured_summary
+        summary=summary_fields["summary"],
+        structured_summary=summary_fields["structured_summary"]
+    )
+
+# --- Resumable chunked uploads ---
+# A tus-style protocol: create an upload, PATCH chunks at an explicit
+# Upload-Offset (optionally with an Upload-Checksum), HEAD to learn where to
+# resume after a dropped connection, and finalize to start processing. The
+# browser recorder streams MediaRecorder chunks here while recording, and the
+# file uploader sends large files in resumable chunks.
+
+# tus "460 Checksum Mismatch"
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+def _get_owned_appointment(appointment_id: str, current_user: UserInDB, appointment_collection: Collection) -> dict:
+    if not ObjectId.is_valid(appointment_id):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid appointment ID.")
+    appointment = appointment_collection.find_one(
+        {"_id": ObjectId(appointment_id), "user_id": str(current_user.id)}
+    )
+    if not appointment:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Appointment not found.")
+    return appointment
+
+def _get_upload(appointment_id: str, upload_id: str, current_user: UserInDB) -> dict:
+    meta = upload_store.get(str(current_user.id), appointment_id, upload_id)
+    if meta is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Upload not found.")
+    return meta
+
+@router.post("/{appointment_id}/uploads", response_model=StandardResponse[UploadStatus], status_code=status.HTTP_201_CREATED)
+async def create_audio_upload(
+    appointment_id: str,
+    upload: UploadCreateRequest,
+    current_user: UserInDB = Depends(get_current_user),
+    collections: tuple = Depends(get_db_collections)
+):
+    """Starts a chunked audio upload for an appointment."""
+    _, _, appointment_collection = collections
+    _get_owned_appointment(appointment_id, current_user, appointment_collection)
+    meta = upload_store.create(
+        str(current_user.id), appointment_id, upload.filename, upload.content_type, upload.length
+    )
+    return StandardResponse(data=UploadStatus(**meta), message="Upload created.")
+
+@router.head("/{appointment_id}/uploads/{upload_id}")
+async def get_audio_upload_offset(
+    appointment_id: str,
+    upload_id: str,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Reports how many bytes the server has, so an interrupted upload can resume from there."""
+    meta = _get_upload(appointment_id, upload_id, current_user)
+    headers = {"Upload-Offset": str(meta["offset"]), "Cache-Control": "no-store"}
+    if meta.get("length") is not None:
+        headers["Upload-Length"] = str(meta["length"])
+    return Response(status_code=status.HTTP_200_OK, headers=headers)
+
+@router.patch("/{appointment_id}/uploads/{upload_id}", response_model=StandardResponse[UploadStatus])
+async def append_audio_chunk(
+    appointment_id: str,
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Appends the request body to the upload, starting at the given byte offset.
+    A chunk that fails its checksum is discarded and must be resent.
+    """
+    meta = _get_upload(appointment_id, upload_id, current_user)
+    try:
+        checksum = parse_checksum_header(upload_checksum)
+        meta = await upload_store.append(meta, upload_offset, request.stream(), checksum)
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e), headers={"Upload-Offset": str(e.expected_offset)})
+    except UploadChecksumMismatch as e:
+        raise HTTPException(HTTP_460_CHECKSUM_MISMATCH, str(e))
+    except UploadLengthExceeded as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+    except UploadError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+    return StandardResponse(data=UploadStatus(**meta))
+
+@router.post("/{appointment_id}/uploads/{upload_id}/finalize", response_model=StandardResponse[TranscriptionResponse])
+async def finalize_audio_upload(
+    appointment_id: str,
+    upload_id: str,
+    current_user: UserInDB = Depends(get_current_user),
+    collections: tuple = Depends(get_db_collections)
+):
+    """Completes an upload; this is the only step that triggers transcription and summarisation."""
+    _, _, appointment_collection = collections
+    _get_owned_appointment(appointment_id, current_user, appointment_collection)
+    meta = _get_upload(appointment_id, upload_id, current_user)
+    try:
+        file_path = await upload_store.finalize(meta)
+    except UploadIncomplete as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e))
+    except UploadError as e:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, str(e))
+    # If either step fails the upload stays finalized but not completed, so
+    # the client can retry finalize without sending the audio again.
+    formatted_transcript = _transcribe_file(file_path)
+    response_data = await _summarize_and_store(
+        appointment_id, formatted_transcript, file_path, current_user, appointment_collection
     )
+    upload_store.complete(meta)
     return StandardResponse(data=response_data, message="Audio processed successfully.")
 
+# --- Live transcription ---
+# The browser streams 16-bit mono PCM frames over a WebSocket while the
+# appointment is happening. Partial and final utterances are pushed back as
+# they arrive, the audio is kept as a WAV file, and when the client sends
+# {"type": "stop"} (or disconnects) the transcript is summarised and stored
+# exactly as an uploaded recording would be.
+
+# How long a client has after connecting to send its access token.
+LIVE_AUTH_TIMEOUT_SECONDS = 10
+
+async def _forward_transcript_events(websocket: WebSocket, session: StreamingTranscriptionSession):
+    async for event in session.events():
+        if websocket.client_state != WebSocketState.CONNECTED:
+            continue
+        try:
+            await websocket.send_json({"type": event.type, "text": event.text})
+        except Exception as e:
+            print(f"Warning: Could not push transcript event to client: {e}")
+
+def _is_stop_frame(text: str) -> bool:
+    """Malformed or unknown control frames are ignored rather than ending the stream."""
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(frame, dict) and frame.get("type") == "stop"
+
+async def _close_websocket(websocket: WebSocket, code: int = status.WS_1000_NORMAL_CLOSURE, reason: Optional[str] = None):
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close(code=code, reason=reason)
+
+async def _authenticate_websocket(websocket: WebSocket, user_collection: Collection) -> Optional[UserInDB]:
+    """
+    Reads the {"type": "auth", "token": ...} message the client must send
+    first. The token is not taken from the URL, where it would end up in
+    access and proxy logs.
+    """
+    try:
+        message = await asyncio.wait_for(websocket.receive_json(), timeout=LIVE_AUTH_TIMEOUT_SECONDS)
+        token = message.get("token") if message.get("type") == "auth" else None
+    except Exception:
+        return None
+    return get_user_from_token(token, user_collection) if isinstance(token, str) else None
+
+@router.websocket("/{appointment_id}/live")
+async def live_transcription(
+    websocket: WebSocket,
+    appointment_id: str,
+    sample_rate: int = Query(settings.STREAMING_SAMPLE_RATE, ge=8000, le=48000),
+    collections: tuple = Depends(get_db_collections)
+):
+    """Transcribes an appointment live and stores the transcript and summaries when the stream ends."""
+    user_collection, _, appointment_collection = collections
+    await websocket.accept()
+    current_user = await _authenticate_websocket(websocket, user_collection)
+    if current_user is None:
+        await _close_websocket(websocket, status.WS_1008_POLICY_VIOLATION, "Could not validate credentials")
+        return
+    try:
+        _get_owned_appointment(appointment_id, current_user, appointment_collection)
+    except HTTPException as e:
+        await _close_websocket(websocket, status.WS_1008_POLICY_VIOLATION, e.detail)
+        return
+
+    try:
+        session = create_streaming_session(sample_rate)
+        await session.start()
+    except Exception as e:
+        print(f"CRITICAL: Could not start live transcription for appointment {appointment_id}. Error: {e}")
+        await websocket.send_json({"type": "error", "text": "Live transcription is unavailable."})
+        await _close_websocket(websocket, status.WS_1011_INTERNAL_ERROR)
+        return
+    forwarder = asyncio.create_task(_forward_transcript_events(websocket, session))
+
+    audio_dir = os.path.join(settings.AUDIO_FILES_DIR, str(current_user.id), appointment_id)
+    os.makedirs(audio_dir, exist_ok=True)
+    audio_path = os.path.join(audio_dir, f"live_{datetime.now().strftime('%Y%m%d_%H%M%S')}.wav")
+    with wave.open(audio_path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    wav_file.writeframes(message["bytes"])
+                    await session.send_audio(message["bytes"])
+                elif message.get("text") and _is_stop_frame(message["text"]):
+                    break
+        except Exception as e:
+            print(f"Warning: Live transcription stream for appointment {appointment_id} ended abruptly: {e}")
+        finally:
+            await session.close()
+            await forwarder
+
+    transcript = session.transcript
+    if not transcript:
+        os.remove(audio_path)
+        await _close_websocket(websocket)
+        return
+
+    try:
+        response_data = await _summarize_and_store(
+            appointment_id, transcript, audio_path, current_user, appointment_collection
+        )
+    except Exception as e:
+        if not isinstance(e, HTTPException):
+            print(f"CRITICAL: Failed to store live transcript for appointment {appointment_id}. Error: {e}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            detail = e.detail if isinstance(e, HTTPException) else "Failed to store the transcript."
+            await websocket.send_json({"type": "error", "text": detail})
+        await _close_websocket(websocket, status.WS_1011_INTERNAL_ERROR)
+        return
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.send_json({"type": "processed", "data": response_data.model_dump(mode="json")})
+    await _close_websocket(websocket)
+
 @router.get("/{appointment_id}/audio", response_class=FileResponse)
 async def download_appointment_audio(
     appointment_id: str,
@@ -36,7 +36,7 @@ async def signup(
     user_collection.insert_one(user_data)
     
     try:
-        create_user_node(email=user.email, full_name=user.full_name, username=user.username)
+        await create_user_node(email=user.email, full_name=user.full_name, username=user.username)
     except Exception as e:
         print(f"CRITICAL: Failed to create Neo4j node for user {user.email}. Error: {e}")
 
@@ -13,6 +13,7 @@ from schemas import (
 from auth import get_current_user
 from database import get_db_collections
 from services.gemini_service import medical_chat_service
+from services.usage_service import record_usage
 
 router = APIRouter(
     prefix="/chat",
@@ -45,14 +46,16 @@ async def handle_chat(
             last_turn = history[-1].turn_number or 0
             current_turn_number = last_turn + 1
 
-    ai_content, citations = await medical_chat_service.get_ai_response(
+    ai_content, citations, usage = await medical_chat_service.get_ai_response(
         prompt=request.prompt, 
         history=history,
         user_profile=current_user
     )
 
     history.append(ChatMessage(role="user", content=request.prompt, turn_number=current_turn_number))
-    history.append(ChatMessage(role="assistant", content=ai_content, turn_number=current_turn_number, citations=citations))
+    history.append(ChatMessage(
+        role="assistant", content=ai_content, turn_number=current_turn_number, citations=citations, usage=usage
+    ))
 
     history_dicts = [msg.model_dump(exclude_none=True) for msg in history]
     
@@ -73,6 +76,8 @@ async def handle_chat(
         result = chat_collection.insert_one(new_chat_doc)
         final_chat_id = str(result.inserted_id)
 
+    record_usage(user_id, "chat", usage, chat_id=final_chat_id, turn_number=current_turn_number)
+
     response_data = ChatTurnResponse(
         chat_id=final_chat_id,
         ai_response=ai_content,
@@ -8,6 +8,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from schemas import LocationRequest, Hospital, StandardResponse, UserInDB
 from auth import get_current_user
+from config import settings
+from metrics import track_dependency
 
 router = APIRouter(
     prefix="/hospitals",
@@ -30,14 +32,15 @@ def search_overpass_api(lat: float, lon: float, radius: float = 0.02) -> List[di
     );
     out center;
     """
-    overpass_url = "https://overpass-api.de/api/interpreter"
+    overpass_url = settings.OVERPASS_URL
     
-    logger.info(f"Searching for hospitals near {lat}, {lon} with radius {radius}")
-    logger.info(f"Overpass query: {overpass_query}")
+    logger.info("Searching for hospitals near %s, %s with radius %s", lat, lon, radius)
+    logger.debug("Overpass query: %s", overpass_query)
     
     try:
-        response = requests.get(overpass_url, params={'data': overpass_query}, timeout=30)
-        response.raise_for_status()
+        with track_dependency("overpass", "interpreter"):
+            response = requests.get(overpass_url, params={'data': overpass_query}, timeout=30)
+            response.raise_for_status()
         
         data = response.json()
         elements = data.get("elements", [])
@@ -0,0 +1,35 @@
+# api/search_router.py
+
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pymongo.errors import OperationFailure
+
+from schemas import StandardResponse, SearchResults, UserInDB
+from auth import get_current_user
+from services.search_service import search_history, SEARCH_TYPES
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+@router.get("/", response_model=StandardResponse[SearchResults])
+async def search(
+    q: str = Query(..., min_length=2, max_length=200, description='Words to find; supports "exact phrases" and -exclusions'),
+    types: Optional[str] = Query(None, description="Comma-separated subset of: chats, appointments"),
+    page: int = Query(1, ge=1, le=50),
+    page_size: int = Query(10, ge=1, le=50),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Ranked full-text search over the user's chat messages and appointment transcripts and summaries."""
+    requested = [t.strip() for t in types.split(",") if t.strip()] if types else list(SEARCH_TYPES)
+    unknown = set(requested) - set(SEARCH_TYPES)
+    if unknown:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Unknown search types: {', '.join(sorted(unknown))}")
+
+    try:
+        results = search_history(str(current_user.id), q, dict.fromkeys(requested), page, page_size)
+    except OperationFailure as e:
+        print(f"CRITICAL: Search failed for user {current_user.email}. Error: {e}")
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Search is temporarily unavailable.")
+    return StandardResponse(data=SearchResults(**results))
@@ -41,11 +41,11 @@ async def update_user_profile(
 
     user_collection.update_one(
         {"_id": ObjectId(current_user.id)},
-        {"$set": update_dict}
+        {"$set": update_dict, "$inc": {"profile_version": 1}}
     )
 
     try:
-        update_user_node_properties(email=current_user.email, properties=update_dict)
+        await update_user_node_properties(email=current_user.email, properties=update_dict)
     except Exception as e:
         print(f"CRITICAL: Failed to update Neo4j node for user {current_user.email}. Error: {e}")
 
@@ -4,13 +4,14 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 import bcrypt
 import jwt
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pymongo.collection import Collection
 
 from config import settings
 from database import get_db_collections
 from schemas import TokenData, UserInDB
+from tracing import tracer
 
 auth_scheme = HTTPBearer()
 
@@ -29,6 +30,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+def get_user_from_token(token: str, user_collection: Collection) -> Optional[UserInDB]:
+    """
+    Resolves a raw access token to its user, or None if it is invalid. Used
+    directly where there is no Authorization header, e.g. WebSockets.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        token_data = TokenData(username=payload.get("sub"))
+    except (jwt.PyJWTError, ValueError):
+        return None
+    if token_data.username is None:
+        return None
+
+    user_data = user_collection.find_one({"username": token_data.username})
+    if user_data is None:
+        return None
+    return UserInDB(**user_data)
+
 async def get_current_user(
     token: HTTPAuthorizationCredentials = Depends(auth_scheme),
     collections: tuple = Depends(get_db_collections)
@@ -36,22 +55,17 @@ async def get_current_user(
     # <-- THE FIX IS HERE: Unpack three values, not two
     user_collection, _, _ = collections
     
-    credentials_exception = HTTPException(
-        status_code=401,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except jwt.PyJWTError:
-        raise credentials_exception
+    with tracer.start_as_current_span("auth.get_current_user"):
+        user = get_user_from_token(token.credentials, user_collection)
+    if user is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
-    user_data = user_collection.find_one({"username": token_data.username})
-    if user_data is None:
-        raise credentials_exception
-    
-    return UserInDB(**user_data)
\ No newline at end of file
+async def get_current_admin(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
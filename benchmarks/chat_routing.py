@@ -0,0 +1,116 @@
+"""
+Benchmarks the chat request classifier and the routing table.
+
+Offline (default): classification accuracy on a labelled prompt set and the
+classifier's per-turn overhead.
+
+    python benchmarks/chat_routing.py
+
+Live (needs GEMINI_API_KEY): sends every sample prompt to Gemini twice, once
+with the routed configuration and once with the old one-size-fits-all
+configuration (gemini-2.5-flash, dynamic thinking, Google Search), and
+compares latency and tokens per route.
+
+    python benchmarks/chat_routing.py --live --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from services.chat_routing import ChatRoute, ROUTES, classify_prompt
+
+SAMPLES = [
+    ("hi", "non_medical"),
+    ("Hello there!", "non_medical"),
+    ("thanks", "non_medical"),
+    ("Thank you so much", "non_medical"),
+    ("who are you?", "non_medical"),
+    ("What can you do?", "non_medical"),
+    ("good morning", "non_medical"),
+    ("ok", "non_medical"),
+    ("Find hospitals near me", "location"),
+    ("is there an urgent care nearby?", "location"),
+    ("closest pharmacy please", "location"),
+    ("I have had a headache for three days", "medical"),
+    ("what is diabetes", "medical"),
+    ("lisinopril side effects", "medical"),
+    ("hi, I have a fever and a sore throat", "medical"),
+    ("My chest hurts when I breathe deeply", "medical"),
+    ("how much ibuprofen can I take?", "medical"),
+    ("what about for children?", "medical"),
+    ("Is it contagious?", "medical"),
+    ("I feel dizzy after standing up", "medical"),
+]
+
+BASELINE = ChatRoute("baseline", "gemini-2.5-flash", thinking_budget=-1, use_search=True, history_messages=5)
+
+def run_offline(iterations: int):
+    correct = 0
+    for prompt, expected in SAMPLES:
+        actual = classify_prompt(prompt)
+        correct += actual == expected
+        if actual != expected:
+            print(f"  misrouted: {prompt!r} -> {actual} (expected {expected})")
+    print(f"accuracy: {correct}/{len(SAMPLES)}")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for prompt, _ in SAMPLES:
+            classify_prompt(prompt)
+    per_call = (time.perf_counter() - start) / (iterations * len(SAMPLES))
+    print(f"classifier overhead: {per_call * 1e6:.1f} us/turn")
+
+async def _timed_call(route: ChatRoute, prompt: str):
+    from google.genai import types
+    from services.gemini_service import client, get_system_prompt
+    from services.usage_service import extract_usage
+
+    config = types.GenerateContentConfig(
+        temperature=0.2,
+        top_p=0.7,
+        top_k=30,
+        thinking_config=types.ThinkingConfig(thinking_budget=route.thinking_budget),
+        tools=[types.Tool(google_search=types.GoogleSearch())] if route.use_search else None,
+        system_instruction=get_system_prompt(None)
+    )
+    start = time.perf_counter()
+    response = await client.aio.models.generate_content(
+        model=route.model, contents=[{'role': 'user', 'parts': [{'text': prompt}]}], config=config
+    )
+    return time.perf_counter() - start, extract_usage(response, route.model)
+
+async def run_live(repeat: int):
+    results = defaultdict(lambda: {"routed": [], "baseline": [], "routed_tokens": [], "baseline_tokens": []})
+    for prompt, _ in SAMPLES:
+        route = ROUTES[classify_prompt(prompt)]
+        for _ in range(repeat):
+            for label, config in (("routed", route), ("baseline", BASELINE)):
+                seconds, usage = await _timed_call(config, prompt)
+                results[route.name][label].append(seconds)
+                results[route.name][f"{label}_tokens"].append(usage["total_tokens"] if usage else 0)
+
+    print(f"{'route':<12} {'routed p50':>11} {'baseline p50':>13} {'routed tok':>11} {'baseline tok':>13}")
+    for name, data in results.items():
+        print(f"{name:<12} {statistics.median(data['routed']):>10.2f}s {statistics.median(data['baseline']):>12.2f}s "
+              f"{statistics.mean(data['routed_tokens']):>11.0f} {statistics.mean(data['baseline_tokens']):>13.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Also compare real Gemini latency per route")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    run_offline(args.iterations)
+    if args.live:
+        asyncio.run(run_live(args.repeat))
+
+if __name__ == "__main__":
+    main()
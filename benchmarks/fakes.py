@@ -0,0 +1,191 @@
+"""
+Local stand-ins for every external dependency of the API, used by the load
+test. Each HTTP fake is a threaded stdlib server that sleeps for a
+configurable latency before answering, so results reflect the API's own
+behaviour under a known upstream delay.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeGeminiHandler(_FakeHandler):
+    """Answers generateContent and batchEmbedContents for any model; JSON prompts get a structured summary back."""
+    STRUCTURED_SUMMARY = {
+        "Chief_Complaint": "Persistent headache", "Symptoms": "Headache, mild nausea",
+        "Physical_Examination": "None", "Diagnosis": "Tension headache", "Medications": "Ibuprofen 400mg",
+        "Treatment_Plan": "Rest and hydration",
+        "Lifestyle_Modifications": {"Diet": {"Recommended": "Water", "Restricted": "Caffeine"},
+                                    "Exercise": "Light walking", "Other_Recommendations": "None"},
+        "Follow_up": {"Timing": "Two weeks", "Special_Instructions": "None"}, "Additional_Notes": "None"
+    }
+
+    @staticmethod
+    def _embedding(text: str, dimensions: int) -> list:
+        """A deterministic bag-of-words vector, so similar texts get similar embeddings."""
+        values = [0.0] * dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            values[int(hashlib.md5(word.encode()).hexdigest(), 16) % dimensions] += 1.0
+        return values
+
+    def do_POST(self):
+        request = json.loads(self._body() or b"{}")
+        time.sleep(self.latency)
+        if re.search(r":batchEmbedContents$", urlparse(self.path).path):
+            self._reply({"embeddings": [
+                {"values": self._embedding(
+                    " ".join(part.get("text", "") for part in item["content"]["parts"]),
+                    item.get("outputDimensionality") or 768
+                )}
+                for item in request.get("requests", [])
+            ]})
+            return
+        if not re.search(r":generateContent$", urlparse(self.path).path):
+            self._reply({"error": {"code": 404, "message": "Unknown method"}}, 404)
+            return
+        wants_json = (request.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        text = json.dumps(self.STRUCTURED_SUMMARY) if wants_json else (
+            "S: Patient reports a headache.\nO: No findings.\nA: Tension headache.\nP: Rest."
+            if "SOAP" in json.dumps(request) else "Here is some general information about your question."
+        )
+        self._reply({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 420, "candidatesTokenCount": 120, "totalTokenCount": 540},
+            "modelVersion": "gemini-2.5-flash"
+        })
+
+class FakeAssemblyAIHandler(_FakeHandler):
+    """Implements the upload and transcript endpoints the SDK uses; transcripts complete immediately."""
+    def _transcript(self, transcript_id: str, audio_url: str = "http://fake/audio") -> dict:
+        utterances = [
+            {"speaker": "A", "text": "What brings you in today?", "start": 0, "end": 1500, "confidence": 0.98,
+             "words": [{"text": "What", "start": 0, "end": 300, "confidence": 0.98, "speaker": "A"}]},
+            {"speaker": "B", "text": "I have had a headache for three days.", "start": 1600, "end": 4000, "confidence": 0.97,
+             "words": [{"text": "I", "start": 1600, "end": 1700, "confidence": 0.97, "speaker": "B"}]},
+        ]
+        return {
+            "id": transcript_id, "status": "completed", "audio_url": audio_url,
+            "text": " ".join(u["text"] for u in utterances), "utterances": utterances,
+            "words": [w for u in utterances for w in u["words"]], "confidence": 0.97,
+            "audio_duration": 4, "speaker_labels": True, "language_code": "en_us"
+        }
+
+    def do_POST(self):
+        body = self._body()
+        time.sleep(self.latency)
+        path = urlparse(self.path).path
+        if path.endswith("/upload"):
+            self._reply({"upload_url": f"http://fake/uploads/{uuid.uuid4().hex}"})
+        elif path.endswith("/transcript"):
+            request = json.loads(body or b"{}")
+            self._reply(self._transcript(uuid.uuid4().hex, request.get("audio_url", "http://fake/audio")))
+        else:
+            self._reply({"error": "not found"}, 404)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        match = re.search(r"/transcript/([^/]+)$", urlparse(self.path).path)
+        if match:
+            self._reply(self._transcript(match.group(1)))
+        else:
+            self._reply({"error": "not found"}, 404)
+
+class FakeOverpassHandler(_FakeHandler):
+    """Returns a handful of facilities around the queried bounding box."""
+    def do_GET(self):
+        time.sleep(self.latency)
+        query = parse_qs(urlparse(self.path).query).get("data", [""])[0]
+        bbox = re.search(r"\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)", query)
+        lat, lon = (float(bbox.group(1)), float(bbox.group(2))) if bbox else (0.0, 0.0)
+        elements = [
+            {"type": "node", "id": i, "lat": lat + i * 0.001, "lon": lon + i * 0.001,
+             "tags": {"amenity": amenity, "name": f"Fake {amenity.title()} {i}", "addr:city": "Testville"}}
+            for i, amenity in enumerate(["hospital", "clinic", "pharmacy", "doctors"] * 3, start=1)
+        ]
+        self._reply({"elements": elements})
+
+def start_fake_server(handler: type, latency: float) -> ThreadingHTTPServer:
+    """Starts `handler` on a free localhost port in a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), type(handler.__name__, (handler,), {"latency": latency}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+class FakeAsyncNeo4jDriver:
+    """
+    Replaces every AsyncNeo4jDriver method that talks to the server: each call
+    sleeps for `latency` and returns no records (EXPLAIN reports an index
+    seek), and the number of writes is counted.
+    """
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.writes = 0
+
+    async def verify_connectivity(self):
+        await asyncio.sleep(self.latency)
+
+    async def execute_write(self, query, parameters=None):
+        await asyncio.sleep(self.latency)
+        self.writes += 1
+        return []
+
+    async def execute_read(self, query, parameters=None):
+        await asyncio.sleep(self.latency)
+        return []
+
+    async def stream_read(self, query, parameters=None, fetch_size: int = 1000):
+        await asyncio.sleep(self.latency)
+        return
+        yield
+
+    async def explain_operators(self, query, parameters=None):
+        # Reports an index seek so the startup plan check stays quiet.
+        await asyncio.sleep(self.latency)
+        return ["NodeUniqueIndexSeek"]
+
+    def install(self, driver):
+        """Points an AsyncNeo4jDriver instance at this fake."""
+        for name in ("verify_connectivity", "execute_write", "execute_read", "stream_read", "explain_operators"):
+            setattr(driver, name, getattr(self, name))
+
+def install_mongomock(database):
+    """Makes `database.connect` use an in-memory mongomock client instead of a real server."""
+    import mongomock
+
+    def connect(uri: str, db_name: str):
+        database.client = mongomock.MongoClient()
+        database.db = database.client[db_name]
+        database.user_collection = database.db.users
+        database.chat_collection = database.db.chats
+        database.appointment_collection = database.db.appointments
+        database.usage_collection = database.db.usage
+
+    database.connect = connect
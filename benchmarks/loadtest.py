@@ -0,0 +1,238 @@
+"""
+End-to-end load test for the API.
+
+Boots main.app under uvicorn against in-memory MongoDB (mongomock, or a real
+server with --mongo-uri), a fake Neo4j driver and fake Gemini, AssemblyAI and
+Overpass HTTP servers with configurable latency. It then runs realistic user
+journeys at increasing concurrency and reports throughput and p50/p95/p99
+latency per route:
+
+    python benchmarks/loadtest.py --concurrency 1,5,10,25 --iterations 3
+    python benchmarks/loadtest.py --gemini-latency 1.5 --json results.json
+
+Each virtual user signs up, logs in, then repeats: a few chat turns, a chat
+history listing, creating and processing an appointment recording, and a
+hospital search. Requires the benchmark extras in benchmarks/requirements.txt.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import httpx
+
+from benchmarks.fakes import (
+    FakeAssemblyAIHandler, FakeAsyncNeo4jDriver, FakeGeminiHandler, FakeOverpassHandler,
+    install_mongomock, server_url, start_fake_server
+)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _silent_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+class Recorder:
+    """Collects (route, latency, ok) samples for one concurrency level."""
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.samples[route].append(time.perf_counter() - start)
+            self.errors[route] += 1
+            raise
+        self.samples[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, wall_seconds: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.samples.items()):
+            values = sorted(values)
+            routes[route] = {
+                "count": len(values),
+                "errors": self.errors[route],
+                "rps": len(values) / wall_seconds,
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+            }
+        total = sum(r["count"] for r in routes.values())
+        return {"wall_seconds": wall_seconds, "requests": total, "throughput_rps": total / wall_seconds, "routes": routes}
+
+async def user_journey(client: httpx.AsyncClient, recorder: Recorder, iterations: int, chat_turns: int, audio: bytes):
+    name = f"load_{uuid.uuid4().hex[:12]}"
+    password = "load-test-password"
+    await recorder.call(client, "POST /auth/signup", "POST", "/auth/signup", json={
+        "username": name, "email": f"{name}@example.com", "full_name": "Load Test", "password": password
+    })
+    response = await recorder.call(client, "POST /auth/login", "POST", "/auth/login",
+                                   data={"username": name, "password": password})
+    token = response.json()["data"]["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    for _ in range(iterations):
+        chat_id = None
+        for turn in range(chat_turns):
+            payload = {"prompt": f"I have had a headache for {turn + 2} days, what could cause it?"}
+            if chat_id:
+                payload["chat_id"] = chat_id
+            response = await recorder.call(client, "POST /chat/", "POST", "/chat/", json=payload)
+            if response.status_code == 200:
+                chat_id = response.json()["data"]["chat_id"]
+        await recorder.call(client, "GET /chat/history", "GET", "/chat/history")
+
+        response = await recorder.call(client, "POST /appointments/", "POST", "/appointments/", json={
+            "doctor_name": "Dr. Load", "specialization": "Neurology", "reason": "Headache",
+            "appointment_time": (datetime.now() + timedelta(days=1)).isoformat()
+        })
+        if response.status_code == 201:
+            appointment_id = response.json()["data"]["_id"]
+            await recorder.call(
+                client, "POST /appointments/{id}/process", "POST", f"/appointments/{appointment_id}/process",
+                files={"audio_file": ("visit.wav", audio, "audio/wav")}
+            )
+        await recorder.call(client, "GET /appointments/", "GET", "/appointments/")
+        await recorder.call(client, "POST /hospitals/nearby", "POST", "/hospitals/nearby",
+                            json={"latitude": 40.7128, "longitude": -74.0060})
+
+async def run_level(base_url: str, concurrency: int, iterations: int, chat_turns: int, audio: bytes) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency * 2)
+
+    async def virtual_user():
+        async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+            try:
+                await user_journey(client, recorder, iterations, chat_turns, audio)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                print(f"  virtual user aborted: {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return recorder.report(time.perf_counter() - start)
+
+def configure_environment(args, log_dir: str):
+    """Points the app's settings at the fakes. Must run before `main` is imported."""
+    gemini = start_fake_server(FakeGeminiHandler, args.gemini_latency)
+    assemblyai = start_fake_server(FakeAssemblyAIHandler, args.assemblyai_latency)
+    overpass = start_fake_server(FakeOverpassHandler, args.overpass_latency)
+    os.environ.update({
+        "MONGO_URI": args.mongo_uri or "mongodb://mongomock",
+        "DB_NAME": f"loadtest_{uuid.uuid4().hex[:8]}",
+        "NEO4J_URI": "bolt://127.0.0.1:1",
+        "NEO4J_USER": "neo4j",
+        "NEO4J_PASSWORD": "unused",
+        "SECRET_KEY": "load-test-secret",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_BASE_URL": server_url(gemini),
+        "ASSEMBLYAI_API_KEY": "fake-key",
+        "ASSEMBLYAI_BASE_URL": server_url(assemblyai),
+        "OVERPASS_URL": f"{server_url(overpass)}/api/interpreter",
+        "STREAMING_TRANSCRIPTION_BACKEND": "fake",
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": os.path.join(log_dir, "api_logs.log"),
+    })
+
+def start_api(args, work_dir: str):
+    import uvicorn
+    import assemblyai as aai
+    import database
+    import neo4j_driver
+    from main import app
+
+    if not args.mongo_uri:
+        install_mongomock(database.db)
+    FakeAsyncNeo4jDriver(args.neo4j_latency).install(neo4j_driver.async_neo4j_driver)
+    aai.settings.polling_interval = 0.05
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+def print_report(concurrency: int, report: dict):
+    print(f"\nconcurrency {concurrency}: {report['requests']} requests in {report['wall_seconds']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s)")
+    print(f"  {'route':<34} {'count':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in report["routes"].items():
+        print(f"  {route:<34} {stats['count']:>6} {stats['errors']:>6} {stats['rps']:>7.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,5,10,25", help="Comma-separated virtual user counts")
+    parser.add_argument("--iterations", type=int, default=3, help="Journeys per virtual user")
+    parser.add_argument("--chat-turns", type=int, default=3)
+    parser.add_argument("--mongo-uri", help="Use a real MongoDB instead of mongomock")
+    parser.add_argument("--gemini-latency", type=float, default=0.8)
+    parser.add_argument("--assemblyai-latency", type=float, default=0.5)
+    parser.add_argument("--overpass-latency", type=float, default=0.3)
+    parser.add_argument("--neo4j-latency", type=float, default=0.01)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure_environment(args, work_dir)
+        # Audio files are written relative to the working directory.
+        os.chdir(work_dir)
+        server, thread, base_url = start_api(args, work_dir)
+        audio = _silent_wav()
+        results = {}
+        try:
+            for concurrency in levels:
+                report = asyncio.run(run_level(base_url, concurrency, args.iterations, args.chat_turns, audio))
+                results[concurrency] = report
+                print_report(concurrency, report)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+            os.chdir(original_cwd)
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
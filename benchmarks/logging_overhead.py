@@ -0,0 +1,97 @@
+"""
+Measures how long request logging holds the event loop, comparing the old
+synchronous basicConfig setup (two f-string INFO lines per request, written
+straight to stdout and api_logs.log) with the queue-based JSON pipeline in
+logging_config (one sampled structured line, written by a listener thread).
+
+    python benchmarks/logging_overhead.py --requests 20000
+
+Output goes to a temporary directory and stdout is discarded, so the numbers
+reflect logging cost rather than terminal speed.
+"""
+import argparse
+import atexit
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from config import settings
+import logging_config
+
+def _reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for name in (logging_config.REQUEST_LOGGER_NAME, "main"):
+        logging.getLogger(name).filters.clear()
+
+def run_baseline(requests: int, log_dir: str, devnull) -> float:
+    _reset_root()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(devnull), logging.FileHandler(os.path.join(log_dir, "baseline.log"))],
+        force=True
+    )
+    logger = logging.getLogger("main")
+    start = time.perf_counter()
+    for i in range(requests):
+        logger.info(f"Request: GET http://localhost:8000/appointments/{i}")
+        logger.info(f"Response: 200 - {0.0123:.4f}s")
+    elapsed = time.perf_counter() - start
+    _reset_root()
+    return elapsed
+
+def run_queued(requests: int, log_dir: str, devnull):
+    _reset_root()
+    settings.LOG_FILE = os.path.join(log_dir, "queued.log")
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        listener = logging_config.configure_logging()
+    finally:
+        sys.stdout = stdout
+    logger = logging.getLogger(logging_config.REQUEST_LOGGER_NAME)
+    start = time.perf_counter()
+    for i in range(requests):
+        logger.info(
+            "%s %s %s", "GET", f"/appointments/{i}", 200,
+            extra={"method": "GET", "path": f"/appointments/{i}", "status": 200, "duration_s": 0.0123}
+        )
+    elapsed = time.perf_counter() - start
+    drain_start = time.perf_counter()
+    atexit.unregister(listener.stop)
+    listener.stop()
+    drain = time.perf_counter() - drain_start
+    _reset_root()
+    return elapsed, drain
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as devnull:
+        baseline = run_baseline(args.requests, log_dir, devnull)
+        queued, drain = run_queued(args.requests, log_dir, devnull)
+        with open(settings.LOG_FILE) as f:
+            lines = f.readlines()
+        written = len(lines)
+        sample = lines[0].strip() if lines else ""
+
+    per_request = lambda seconds: seconds / args.requests * 1e6
+    print(f"requests:                {args.requests}")
+    print(f"sync basicConfig:        {per_request(baseline):8.2f} us/request on the event loop")
+    print(f"queue + JSON + sampling: {per_request(queued):8.2f} us/request on the event loop")
+    print(f"  listener drain:        {drain * 1000:8.1f} ms (background thread)")
+    print(f"  lines written:         {written} (sample rate {settings.REQUEST_LOG_SAMPLE_RATE})")
+    print(f"  sample line:           {sample}")
+    print(f"speedup:                 {baseline / queued:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares per-document update_one calls with Database.bulk_write for a
+migration-style workload: N documents each get a $set.
+
+    python benchmarks/mongo_bulk_write.py --mongo-uri mongodb://localhost:27017 --docs 20000
+    python benchmarks/mongo_bulk_write.py --docs 5000          # mongomock, no server needed
+
+Against mongomock there is no network round trip, so the gap mostly shows
+client-side overhead; use a real server for representative numbers.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config.Settings reads this at import time.
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from pymongo import InsertOne, UpdateOne
+
+from benchmarks.fakes import install_mongomock
+from database import Database
+
+def connect(mongo_uri):
+    database = Database()
+    if not mongo_uri:
+        install_mongomock(database)
+    database.connect(mongo_uri or "mongodb://mongomock", f"bulk_bench_{uuid.uuid4().hex[:8]}")
+    return database
+
+def seed(database: Database, collection, docs: int):
+    collection.delete_many({})
+    database.bulk_write(collection, [InsertOne({"n": i, "summary": "old"}) for i in range(docs)])
+    return [doc["_id"] for doc in collection.find({}, {"_id": 1})]
+
+def run(label: str, docs: int, work) -> float:
+    start = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:8.2f}s {docs / elapsed:>12,.0f} docs/s")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", help="Benchmark against a real MongoDB instead of mongomock")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="100,500,1000")
+    args = parser.parse_args()
+
+    database = connect(args.mongo_uri)
+    collection = database.db.bench
+    try:
+        ids = seed(database, collection, args.docs)
+        baseline = run("update_one per document", args.docs, lambda: [
+            collection.update_one({"_id": _id}, {"$set": {"summary": "per-doc"}}) for _id in ids
+        ])
+        for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+            for ordered in (False, True):
+                operations = [UpdateOne({"_id": _id}, {"$set": {"summary": f"bulk-{batch_size}"}}) for _id in ids]
+                elapsed = run(
+                    f"bulk_write batch={batch_size} {'ordered' if ordered else 'unordered'}", args.docs,
+                    lambda: database.bulk_write(collection, operations, ordered=ordered, batch_size=batch_size)
+                )
+                print(f"{'':<34} {baseline / elapsed:8.1f}x faster")
+    finally:
+        database.client.drop_database(database.db.name)
+        database.client.close()
+
+if __name__ == "__main__":
+    main()
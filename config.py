@@ -10,11 +10,27 @@ class Settings:
     NEO4J_URI: str = os.getenv("NEO4J_URI")
     NEO4J_USER: str = os.getenv("NEO4J_USER")
     NEO4J_PASSWORD: str = os.getenv("NEO4J_PASSWORD")
+    MONGO_BULK_BATCH_SIZE: int = int(os.getenv("MONGO_BULK_BATCH_SIZE", 500))
+    MONGO_BULK_MAX_RETRIES: int = int(os.getenv("MONGO_BULK_MAX_RETRIES", 3))
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", 50))
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 10.0))
+    NEO4J_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("NEO4J_BREAKER_FAILURE_THRESHOLD", 3))
+    NEO4J_BREAKER_RESET_TIMEOUT: float = float(os.getenv("NEO4J_BREAKER_RESET_TIMEOUT", 30.0))
+    NEO4J_RECONNECT_INTERVAL: float = float(os.getenv("NEO4J_RECONNECT_INTERVAL", 15.0))
+    NEO4J_TIMELINE_CACHE_TTL: float = float(os.getenv("NEO4J_TIMELINE_CACHE_TTL", 300))
+    NEO4J_WRITE_QUEUE_MAXSIZE: int = int(os.getenv("NEO4J_WRITE_QUEUE_MAXSIZE", 1000))
+    NEO4J_WRITE_BATCH_SIZE: int = int(os.getenv("NEO4J_WRITE_BATCH_SIZE", 100))
+    NEO4J_WRITE_FLUSH_INTERVAL: float = float(os.getenv("NEO4J_WRITE_FLUSH_INTERVAL", 0.5))
+    NEO4J_WRITE_MAX_RETRIES: int = int(os.getenv("NEO4J_WRITE_MAX_RETRIES", 3))
+    NEO4J_WRITE_ENQUEUE_TIMEOUT: float = float(os.getenv("NEO4J_WRITE_ENQUEUE_TIMEOUT", 2.0))
+    NEO4J_WRITE_DRAIN_TIMEOUT: float = float(os.getenv("NEO4J_WRITE_DRAIN_TIMEOUT", 10.0))
 
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+    # Comma-separated usernames allowed to call /admin endpoints
+    ADMIN_USERNAMES: set = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
 
     # Gemini AI
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
@@ -22,8 +38,49 @@ class Settings:
     GEMINI_TOP_P: float = float(os.getenv("GEMINI_TOP_P", 0.9))
     GEMINI_TOP_K: int = int(os.getenv("GEMINI_TOP_K", 40))
     GEMINI_THINKING_BUDGET: int = int(os.getenv("GEMINI_THINKING_BUDGET", -1))
+    # Cache the static SYSTEM_PROMPT with Gemini context caching (falls back to inline)
+    GEMINI_CONTEXT_CACHING: bool = os.getenv("GEMINI_CONTEXT_CACHING", "true").lower() == "true"
+    GEMINI_CONTEXT_CACHE_TTL: int = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", 3600))
+    GEMINI_CONTEXT_CACHE_RETRY: float = float(os.getenv("GEMINI_CONTEXT_CACHE_RETRY", 600))
+    SYSTEM_PROMPT_CACHE_SIZE: int = int(os.getenv("SYSTEM_PROMPT_CACHE_SIZE", 1024))
+    # JSON overrides for the chat routing table in services/chat_routing.py,
+    # e.g. {"medical": {"thinking_budget": 2048}, "non_medical": {"model": "gemini-2.5-flash"}}
+    CHAT_ROUTES: str = os.getenv("CHAT_ROUTES", "{}")
+    # Retrieval over each user's past appointments (services/retrieval_service.py);
+    # how many passages a chat route injects is its `past_visits` setting
+    RETRIEVAL_INDEX_DIR: str = os.getenv("RETRIEVAL_INDEX_DIR", "retrieval_index")
+    RETRIEVAL_EMBEDDING_MODEL: str = os.getenv("RETRIEVAL_EMBEDDING_MODEL", "gemini-embedding-001")
+    RETRIEVAL_EMBEDDING_DIMENSIONS: int = int(os.getenv("RETRIEVAL_EMBEDDING_DIMENSIONS", 768))
+    RETRIEVAL_CHUNK_CHARS: int = int(os.getenv("RETRIEVAL_CHUNK_CHARS", 1200))
+    RETRIEVAL_MIN_SCORE: float = float(os.getenv("RETRIEVAL_MIN_SCORE", 0.55))
+    RETRIEVAL_TOKEN_BUDGET: int = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", 1000))
+    RETRIEVAL_CACHE_USERS: int = int(os.getenv("RETRIEVAL_CACHE_USERS", 256))
     ASSEMBLYAI_API_KEY: str = os.getenv("ASSEMBLYAI_API_KEY")
+    # Override the upstream endpoints, e.g. to point at the benchmark fakes
+    GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL")
+    ASSEMBLYAI_BASE_URL: str = os.getenv("ASSEMBLYAI_BASE_URL")
+    OVERPASS_URL: str = os.getenv("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+    # "assemblyai" or "fake" (a deterministic local stand-in for tests)
+    STREAMING_TRANSCRIPTION_BACKEND: str = os.getenv("STREAMING_TRANSCRIPTION_BACKEND", "assemblyai")
+    STREAMING_SAMPLE_RATE: int = int(os.getenv("STREAMING_SAMPLE_RATE", 16000))
+
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FILE: str = os.getenv("LOG_FILE", "api_logs.log")
+    # "size" rotates at LOG_MAX_BYTES; "time" rotates on LOG_ROTATION_WHEN (e.g. "midnight")
+    LOG_ROTATION: str = os.getenv("LOG_ROTATION", "size")
+    LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+    LOG_ROTATION_WHEN: str = os.getenv("LOG_ROTATION_WHEN", "midnight")
+    LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", 5))
+    REQUEST_LOG_SAMPLE_RATE: float = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", 0.1))
+    REQUEST_LOG_SLOW_SECONDS: float = float(os.getenv("REQUEST_LOG_SLOW_SECONDS", 1.0))
+
+    # Tracing: "none", "console" or "file"
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "traces.jsonl")
 
     AUDIO_FILES_DIR: str = "audio_records"
+    UPLOAD_EXPIRY_HOURS: float = float(os.getenv("UPLOAD_EXPIRY_HOURS", 24))
+    UPLOAD_CLEANUP_INTERVAL: float = float(os.getenv("UPLOAD_CLEANUP_INTERVAL", 3600))
 
 settings = Settings()
\ No newline at end of file
@@ -1,10 +1,39 @@
 # database.py
 import logging
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
 from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import AutoReconnect, BulkWriteError
 from config import settings
+from metrics import MongoCommandMetrics
+from tracing import MongoCommandTracer
 
 logger = logging.getLogger(__name__)
 
+# Server error codes worth retrying: interrupted, not-primary, network and
+# write-conflict errors. Anything else (e.g. duplicate key) fails for good.
+RETRYABLE_WRITE_ERROR_CODES = {6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+@dataclass
+class BulkWriteSummary:
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    upserted: int = 0
+    deleted: int = 0
+    retries: int = 0
+    # (index into the submitted operations, error message) for operations that were not applied
+    failed: List[tuple] = field(default_factory=list)
+
+    def _add(self, result: dict):
+        self.inserted += result.get("nInserted", 0)
+        self.matched += result.get("nMatched", 0)
+        self.modified += result.get("nModified", 0)
+        self.upserted += result.get("nUpserted", 0)
+        self.deleted += result.get("nRemoved", 0)
+
 class Database:
     def __init__(self):
         self.client: MongoClient = None
@@ -12,20 +41,111 @@ class Database:
         self.user_collection = None
         self.chat_collection = None
         self.appointment_collection = None # <-- ADD THIS
+        self.usage_collection = None
 
     def connect(self, uri: str, db_name: str):
         try:
-            self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+            self.client = MongoClient(uri, serverSelectionTimeoutMS=5000, event_listeners=[MongoCommandMetrics(), MongoCommandTracer()])
             self.client.admin.command('ismaster')
             self.db = self.client[db_name]
             self.user_collection = self.db.users
             self.chat_collection = self.db.chats
             self.appointment_collection = self.db.appointments # <-- ADD THIS
+            self.usage_collection = self.db.usage
+            # Multikey indexes behind /appointments/search
+            self.appointment_collection.create_index([("user_id", 1), ("diagnosis_tokens", 1)])
+            self.appointment_collection.create_index([("user_id", 1), ("medication_tokens", 1)])
+            # Text indexes behind /search, prefixed by user_id so each search only
+            # scans that user's entries. Mongo keeps them current on every write.
+            self.chat_collection.create_index([("user_id", 1), ("history.content", "text")], name="chat_text")
+            self.appointment_collection.create_index(
+                [("user_id", 1), ("summary", "text"), ("transcript", "text")],
+                weights={"summary": 3, "transcript": 1}, name="appointment_text"
+            )
+            self.usage_collection.create_index([("created_at", -1)])
+            self.usage_collection.create_index([("user_id", 1), ("created_at", -1)])
             logger.info(f"Successfully connected to MongoDB database: '{db_name}'")
         except Exception as e:
             logger.critical(f"CRITICAL: Failed to connect to MongoDB at {uri}. Error: {e}")
             raise
 
+    def bulk_write(
+        self,
+        collection: Collection,
+        operations: Sequence,
+        ordered: bool = False,
+        batch_size: Optional[int] = None,
+        max_retries: Optional[int] = None
+    ) -> BulkWriteSummary:
+        """
+        Applies pymongo write operations (UpdateOne, InsertOne, ...) in batches
+        of `batch_size`. Operations that fail with a transient error, or whose
+        write concern was not satisfied, are retried with backoff up to
+        `max_retries` times; callers must therefore pass idempotent operations
+        ($set, upserts). Anything still failing is reported in the summary
+        instead of raised. With ordered=True the first permanent failure stops
+        the whole run, and every operation after it, in this batch or later
+        ones, is reported as not applied.
+        """
+        batch_size = batch_size or settings.MONGO_BULK_BATCH_SIZE
+        max_retries = settings.MONGO_BULK_MAX_RETRIES if max_retries is None else max_retries
+        summary = BulkWriteSummary()
+        for start in range(0, len(operations), batch_size):
+            end = min(start + batch_size, len(operations))
+            pending = list(range(start, end))
+            attempt = 0
+            stopped = False
+            while pending:
+                retry = []
+                try:
+                    result = collection.bulk_write([operations[i] for i in pending], ordered=ordered)
+                    summary._add(result.bulk_api_result)
+                except BulkWriteError as e:
+                    summary._add(e.details)
+                    errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+                    concern_errors = e.details.get("writeConcernErrors", [])
+                    # Ordered writes stop at the first error; nothing after it ran.
+                    first_error = min(errors) if ordered and errors else None
+                    for position, index in enumerate(pending):
+                        if position in errors:
+                            message = errors[position].get("errmsg")
+                            retryable = errors[position].get("code") in RETRYABLE_WRITE_ERROR_CODES
+                        elif first_error is not None and position > first_error:
+                            message = "not applied: an earlier ordered write failed"
+                            retryable = errors[first_error].get("code") in RETRYABLE_WRITE_ERROR_CODES
+                        elif concern_errors:
+                            # Applied on the primary, but not acknowledged by the
+                            # requested write concern.
+                            message = f"write concern not satisfied: {concern_errors[0].get('errmsg')}"
+                            retryable = True
+                        else:
+                            continue
+                        if retryable and attempt < max_retries:
+                            retry.append(index)
+                        else:
+                            summary.failed.append((index, message))
+                            if ordered and position in errors:
+                                stopped = True
+                except AutoReconnect as e:
+                    # The batch may or may not have been applied.
+                    if attempt < max_retries:
+                        retry = pending
+                    else:
+                        summary.failed.extend((i, str(e)) for i in pending)
+                        stopped = ordered
+                if stopped:
+                    summary.failed.extend(
+                        (i, "not applied: an earlier ordered write failed") for i in range(end, len(operations))
+                    )
+                    return summary
+                if retry:
+                    attempt += 1
+                    summary.retries += 1
+                    time.sleep(min(0.1 * 2 ** attempt, 5))
+                    logger.warning(f"Retrying {len(retry)} bulk write operations on {collection.name} (attempt {attempt})")
+                pending = retry
+        return summary
+
     def close(self):
         if self.client:
             self.client.close()
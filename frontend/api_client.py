@@ -1,21 +1,142 @@
+import base64
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 import requests
 import streamlit as st
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# --- Shared HTTP Session ---
+# One pooled keep-alive session for every backend call. Only idempotent methods
+# are retried; POST/PATCH are never replayed automatically.
+DEFAULT_TIMEOUT = (5, 30)       # (connect, read) seconds
+PROCESSING_TIMEOUT = (5, 900)   # audio processing can take several minutes
+
+# Streamlit runs each session's script in its own thread, so a thread-local
+# counter gives the number of backend calls made by the current rerun.
+_call_stats = threading.local()
+
+def reset_backend_call_count():
+    _call_stats.count = 0
+
+def get_backend_call_count():
+    return getattr(_call_stats, "count", 0)
+
+def count_backend_call():
+    _call_stats.count = get_backend_call_count() + 1
+
+class _TimeoutSession(requests.Session):
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        count_backend_call()
+        return super().request(method, url, **kwargs)
+
+def _build_session():
+    session = _TimeoutSession()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "DELETE"}),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+http = _build_session()
+
+# --- Versioned Response Cache ---
+# Streamlit re-executes the script on every widget interaction, so reads are
+# cached until the data actually changes rather than for a fixed time. Each
+# token has a version per resource ("profile", "chats", "appointments") that
+# every write through this module bumps; a cached response is served only
+# while the versions of the resources it depends on are unchanged. Keyed by
+# token so users never see each other's data, and bounded in size.
+MAX_CACHED_RESPONSES = 256
+
+# (path prefix, resources a response depends on); first match wins.
+_RESOURCE_PREFIXES = (
+    ("/users/me/profile", ("profile",)),
+    ("/chat/history", ("chats",)),
+    # The timeline's conditions include the profile's previous issues.
+    ("/appointments/timeline", ("appointments", "profile")),
+    ("/appointments", ("appointments",)),
+)
+
+_cache = OrderedDict()
+_data_versions = {}
+_cache_lock = threading.Lock()
+
+def _resources_for(url):
+    path = url[len(BASE_URL):] if url.startswith(BASE_URL) else url
+    return next((resources for prefix, resources in _RESOURCE_PREFIXES if path.startswith(prefix)), ())
+
+def data_version(token, resource):
+    return _data_versions.get(token, {}).get(resource, 0)
+
+def bump_data_version(token, *resources):
+    """Marks the given resources as changed for this token, so cached reads of them are refetched."""
+    with _cache_lock:
+        versions = _data_versions.setdefault(token, {})
+        for resource in resources:
+            versions[resource] = versions.get(resource, 0) + 1
+        for key in [k for k, entry in _cache.items() if k[0] == token and set(entry[0]) & set(resources)]:
+            del _cache[key]
+
+def _versions(token, resources):
+    return tuple(data_version(token, resource) for resource in resources)
+
+def cached_response(url, token, params=None):
+    """Returns the cached response for a GET, or None if it is missing or out of date."""
+    key = (token, url, tuple(sorted((params or {}).items())))
+    resources = _resources_for(url)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[1] != _versions(token, resources):
+            return None
+        _cache.move_to_end(key)
+        return entry[2]
+
+def prime_cache(url, token, data, params=None):
+    """Stores a response fetched elsewhere (e.g. the async client) so the next read is a cache hit."""
+    key = (token, url, tuple(sorted((params or {}).items())))
+    resources = _resources_for(url)
+    with _cache_lock:
+        _cache[key] = (resources, _versions(token, resources), data)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_RESPONSES:
+            _cache.popitem(last=False)
+
+def _cached_get_json(url, token, params=None):
+    cached = cached_response(url, token, params)
+    if cached is not None:
+        return cached
+    headers = {"Authorization": f"Bearer {token}"}
+    response = http.get(url, headers=headers, params=params)
+    data = response.json() if response.status_code == 200 else None
+    if data is not None:
+        prime_cache(url, token, data, params=params)
+    return data
+
 # --- Auth Functions (Unchanged) ---
 def signup_user(username, email, full_name, password):
     url = f"{BASE_URL}/auth/signup"
     payload = {"username": username, "email": email, "full_name": full_name, "password": password}
-    response = requests.post(url, json=payload)
+    response = http.post(url, json=payload)
     return response.json()
 
 def login_user(username, password):
     url = f"{BASE_URL}/auth/login"
     # OAuth2PasswordRequestForm expects 'application/x-www-form-urlencoded' data
     data = {"username": username, "password": password}
-    response = requests.post(url, data=data)
+    response = http.post(url, data=data)
     
     if response.status_code == 200:
         return response.json()
@@ -34,35 +155,31 @@ def login_user(username, password):
 def get_user_profile(token):
     """Fetches the current user's full profile."""
     url = f"{BASE_URL}/users/me/profile"
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
-    return response.json() if response.status_code == 200 else None
+    return _cached_get_json(url, token)
 
 def update_user_profile(token, profile_data):
     """Updates the user's profile with a PATCH request."""
     url = f"{BASE_URL}/users/me/profile"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.patch(url, json=profile_data, headers=headers)
+    response = http.patch(url, json=profile_data, headers=headers)
+    bump_data_version(token, "profile")
     return response.json() if response.status_code == 200 else None
 
 # --- Chat Functions (Updated) ---
 def get_chat_sessions(token):
     url = f"{BASE_URL}/chat/history"
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
-    return response.json() if response.status_code == 200 else None
+    return _cached_get_json(url, token)
 
 def get_chat_history(chat_id, token):
     url = f"{BASE_URL}/chat/history/{chat_id}"
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
-    return response.json() if response.status_code == 200 else None
+    return _cached_get_json(url, token)
 
 def post_message(prompt, chat_id, token):
     url = f"{BASE_URL}/chat/"
     headers = {"Authorization": f"Bearer {token}"}
     payload = {"prompt": prompt, "chat_id": chat_id}
-    response = requests.post(url, json=payload, headers=headers)
+    response = http.post(url, json=payload, headers=headers, timeout=PROCESSING_TIMEOUT)
+    bump_data_version(token, "chats")
     return response.json() if response.status_code == 200 else None
 
 # --- NEW: Chat Management Functions ---
@@ -71,14 +188,27 @@ def rename_chat(chat_id, new_name, token):
     url = f"{BASE_URL}/chat/history/{chat_id}/rename"
     headers = {"Authorization": f"Bearer {token}"}
     payload = {"new_name": new_name}
-    response = requests.patch(url, json=payload, headers=headers)
+    response = http.patch(url, json=payload, headers=headers)
+    bump_data_version(token, "chats")
     return response.json() if response.status_code == 200 else None
 
 def delete_chat(chat_id, token):
     """Deletes a chat session."""
     url = f"{BASE_URL}/chat/history/{chat_id}"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.delete(url, headers=headers)
+    response = http.delete(url, headers=headers)
+    bump_data_version(token, "chats")
+    return response.json() if response.status_code == 200 else None
+
+def search_history(token, query, types=None, page=1, page_size=10):
+    """Full-text search over the user's chats and appointment transcripts/summaries."""
+    url = f"{BASE_URL}/search/"
+    params = {"q": query, "page": page, "page_size": page_size}
+    if types:
+        params["types"] = ",".join(types)
+    # Not cached: each search is typed once, so caching would only hold stale results.
+    headers = {"Authorization": f"Bearer {token}"}
+    response = http.get(url, headers=headers, params=params)
     return response.json() if response.status_code == 200 else None
 
 def find_hospitals_from_backend(token, lat, lon):
@@ -90,7 +220,7 @@ def find_hospitals_from_backend(token, lat, lon):
     try:
         print(f"Making API call to: {url}")
         print(f"Payload: {payload}")
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = http.post(url, json=payload, headers=headers, timeout=30)
         print(f"Response status: {response.status_code}")
         print(f"Response content: {response.text[:500]}...")  # First 500 chars
         
@@ -115,7 +245,7 @@ def test_api_connection_debug():
     try:
         url = f"{BASE_URL}/health"
         print(f"Testing API connection to: {url}")
-        response = requests.get(url, timeout=10)
+        response = http.get(url, timeout=10)
         print(f"Health check status: {response.status_code}")
         return {"status": True, "message": f"API is reachable - Status: {response.status_code}"}
     except Exception as e:
@@ -142,12 +272,25 @@ def find_hospitals_google_places_fallback(token, lat, lon):
         "message": "Mock hospital data for testing"
     }
 
-def get_appointments(token):
-    """Fetches all appointments for the user."""
+# Fields needed to render appointment cards; excludes transcripts and summaries.
+APPOINTMENT_LIST_FIELDS = "doctor_name,specialization,reason,appointment_time,processed_at"
+
+def get_appointments(token, fields=None):
+    """Fetches all appointments for the user, optionally limited to the given fields."""
     url = f"{BASE_URL}/appointments/"
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
-    return response.json() if response.status_code == 200 else None
+    params = {"fields": fields} if fields else None
+    return _cached_get_json(url, token, params=params)
+
+def get_appointment(token, appointment_id, fields=None):
+    """Fetches a single appointment, optionally limited to the given fields."""
+    url = f"{BASE_URL}/appointments/{appointment_id}"
+    params = {"fields": fields} if fields else None
+    return _cached_get_json(url, token, params=params)
+
+def get_appointment_timeline(token):
+    """Fetches the user's appointment timeline, specialisation history and conditions."""
+    url = f"{BASE_URL}/appointments/timeline"
+    return _cached_get_json(url, token)
 
 def create_appointment(token, doctor_name, specialization, reason, appointment_time: datetime):
     """Creates a new appointment."""
@@ -159,7 +302,8 @@ def create_appointment(token, doctor_name, specialization, reason, appointment_t
         "reason": reason or None,
         "appointment_time": appointment_time.isoformat()
     }
-    response = requests.post(url, json=payload, headers=headers)
+    response = http.post(url, json=payload, headers=headers)
+    bump_data_version(token, "appointments")
     return response.json()
 
 def update_appointment(token, appointment_id, **kwargs):
@@ -175,30 +319,83 @@ def update_appointment(token, appointment_id, **kwargs):
             else:
                 payload[key] = value
     
-    response = requests.patch(url, json=payload, headers=headers)
+    response = http.patch(url, json=payload, headers=headers)
+    bump_data_version(token, "appointments")
     return response.json() if response.status_code == 200 else {"status": False, "error": response.text}
 
 def delete_appointment(token, appointment_id):
     """Deletes an appointment."""
     url = f"{BASE_URL}/appointments/{appointment_id}"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.delete(url, headers=headers)
+    response = http.delete(url, headers=headers)
+    bump_data_version(token, "appointments")
     return response.json() if response.status_code == 200 else {"status": False, "error": response.text}
 
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_MAX_ATTEMPTS = 5
+
+def _upload_checksum(chunk):
+    return "sha256 " + base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+
+def _resume_offset(upload_url, headers, fallback):
+    """Asks the server how many bytes it has committed for an interrupted upload."""
+    try:
+        response = http.head(upload_url, headers=headers)
+        if response.status_code == 200:
+            return int(response.headers["Upload-Offset"])
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"Could not fetch upload offset: {e}")
+    return fallback
+
 def upload_and_process_audio(token, appointment_id, audio_file):
-    """Uploads an audio file for transcription and summarization."""
-    url = f"{BASE_URL}/appointments/{appointment_id}/process"
+    """
+    Uploads an audio file in resumable, checksummed chunks and then finalizes
+    it, which triggers transcription and summarization. A dropped connection
+    resumes from the last committed offset instead of re-sending the file.
+    """
+    uploads_url = f"{BASE_URL}/appointments/{appointment_id}/uploads"
     headers = {"Authorization": f"Bearer {token}"}
-    files = {'audio_file': (audio_file.name, audio_file, audio_file.type)}
-    
-    response = requests.post(url, files=files, headers=headers)
+    payload = {"filename": audio_file.name, "content_type": audio_file.type, "length": audio_file.size}
+    response = http.post(uploads_url, json=payload, headers=headers)
+    if response.status_code != 201:
+        return None
+    upload_url = f"{uploads_url}/{response.json()['data']['upload_id']}"
+
+    offset = 0
+    attempts = 0
+    while offset < audio_file.size:
+        audio_file.seek(offset)
+        chunk = audio_file.read(UPLOAD_CHUNK_SIZE)
+        chunk_headers = {
+            **headers,
+            "Content-Type": "application/offset+octet-stream",
+            "Upload-Offset": str(offset),
+            "Upload-Checksum": _upload_checksum(chunk)
+        }
+        try:
+            response = http.patch(upload_url, data=chunk, headers=chunk_headers)
+            if response.status_code == 200:
+                offset = response.json()["data"]["offset"]
+                attempts = 0
+                continue
+            print(f"Chunk at offset {offset} rejected: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            print(f"Chunk at offset {offset} failed: {e}")
+        attempts += 1
+        if attempts >= UPLOAD_MAX_ATTEMPTS:
+            return None
+        time.sleep(min(2 ** attempts, 10))
+        offset = _resume_offset(upload_url, headers, offset)
+
+    response = http.post(f"{upload_url}/finalize", headers=headers, timeout=PROCESSING_TIMEOUT)
+    bump_data_version(token, "appointments")
     return response.json() if response.status_code == 200 else None
 
 def get_audio_file(token, appointment_id):
     """Downloads the audio file content from the backend."""
     url = f"{BASE_URL}/appointments/{appointment_id}/audio"
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(url, headers=headers)
+    response = http.get(url, headers=headers)
     if response.status_code == 200:
         return response.content # Return the raw bytes of the file
     return None
\ No newline at end of file
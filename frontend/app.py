@@ -1,11 +1,16 @@
 import streamlit as st
 from streamlit_geolocation import streamlit_geolocation
 from api_client import *
+from async_api_client import load_dashboard, DASHBOARD_CALLS, APPOINTMENTS_PAGE_CALLS
+from audio_recorder import create_audio_recorder
+from live_transcriber import create_live_transcriber
 from datetime import datetime, timezone
 import io
+import re
 import time
 # --- Page Configuration ---
 st.set_page_config(page_title="SageAI Medical Advisor", page_icon="🩺", layout="wide")
+reset_backend_call_count()
 
 # --- Session State Initialization ---
 if 'page' not in st.session_state:
@@ -29,6 +34,44 @@ if 'hospital_results' not in st.session_state:
 if 'appointment_id' not in st.session_state:
     st.session_state.appointment_id = None
 
+# --- Rerun-Aware Data Loading ---
+# Streamlit re-executes this script on every widget interaction. Reads go
+# through api_client's versioned cache, so reruns reuse data until a write
+# bumps the token's data version for it. Audio is too large for that shared
+# cache and is kept in a small st.cache_data cache keyed the same way.
+@st.cache_data(show_spinner=False, max_entries=5)
+def cached_audio_file(token, appointment_id, version):
+    audio = get_audio_file(token, appointment_id)
+    if audio is None:
+        # Raising keeps the failure out of the cache.
+        raise FileNotFoundError(appointment_id)
+    return audio
+
+def load_audio_file(token, appointment_id):
+    try:
+        return cached_audio_file(token, appointment_id, data_version(token, "appointments"))
+    except FileNotFoundError:
+        return None
+
+def prefetch_dashboard(token, calls=None):
+    """
+    Loads the data a page needs concurrently into api_client's cache, so the
+    page's own reads are cache hits. With no `calls`, loads profile, chats
+    and appointments as after login. Returns the results by name.
+    """
+    results, timings = load_dashboard(token, calls or DASHBOARD_CALLS)
+    if timings:
+        st.session_state.prefetch_timings = [
+            f"{t.name}: {t.elapsed_ms:.0f} ms (HTTP {t.status}){' [coalesced]' if t.coalesced else ''}"
+            for t in timings
+        ]
+    return results
+
+# Pages whose independent reads are worth fanning out on every render.
+PAGE_PREFETCH_CALLS = {
+    "appointments": APPOINTMENTS_PAGE_CALLS,
+}
+
 # --- UI Rendering Functions (login, profile, hospitals are unchanged) ---
 def render_login_page():
     # ... (This function is correct and unchanged)
@@ -43,7 +86,7 @@ def render_login_page():
                 if response and response.get("status"):
                     st.session_state.logged_in = True
                     st.session_state.token = response["data"]["access_token"]
-                    profile_res = get_user_profile(st.session_state.token)
+                    profile_res = prefetch_dashboard(st.session_state.token)["profile"]
                     if profile_res and profile_res.get("status"):
                         st.session_state.user_profile = profile_res["data"]
                     st.session_state.page = "chat"
@@ -64,7 +107,7 @@ def render_login_page():
                     if login_response and login_response.get("status"):
                         st.session_state.logged_in = True
                         st.session_state.token = login_response["data"]["access_token"]
-                        profile_res = get_user_profile(st.session_state.token)
+                        profile_res = prefetch_dashboard(st.session_state.token)["profile"]
                         if profile_res and profile_res.get("status"):
                             st.session_state.user_profile = profile_res["data"]
                         st.session_state.page = "profile"
@@ -123,6 +166,12 @@ def render_hospitals_page():
         st.write(f"- Location stored: {st.session_state.location is not None}")
         st.write(f"- Hospital results: {type(st.session_state.hospital_results)}")
         st.write(f"- Token present: {bool(st.session_state.token)}")
+        st.write(f"- Backend calls this rerun so far: {get_backend_call_count()}")
+        st.write(f"- Data versions: {[(r, data_version(st.session_state.token, r)) for r in ('profile', 'chats', 'appointments')]}")
+        if st.session_state.get("prefetch_timings"):
+            st.write("**Last prefetch timings:**")
+            for line in st.session_state.prefetch_timings:
+                st.write(f"- {line}")
         
         if st.button("🧪 Test API Connection"):
             with st.spinner("Testing API connection..."):
@@ -312,11 +361,34 @@ def render_appointments_page():
                     error_detail = response.get('detail', 'Failed to schedule appointment.')
                     st.error(f"❌ Error: {error_detail}")
 
+    # Care timeline from the graph
+    with st.expander("🩺 Care Timeline", expanded=False):
+        timeline_response = get_appointment_timeline(st.session_state.token)
+        if timeline_response and timeline_response.get("status"):
+            timeline = timeline_response["data"]
+            if timeline["conditions"]:
+                st.write(f"**Conditions:** {', '.join(timeline['conditions'])}")
+            if timeline["specialization_history"]:
+                st.write("**Specialists Seen:**")
+                for spec in timeline["specialization_history"]:
+                    first = datetime.fromisoformat(spec['first_visit']).strftime('%b %Y')
+                    last = datetime.fromisoformat(spec['last_visit']).strftime('%b %Y')
+                    st.write(f"- {spec['specialization']}: {spec['visit_count']} visit(s), {first} – {last}")
+            for entry in timeline["appointments"]:
+                entry_dt = datetime.fromisoformat(entry['appointment_time'])
+                label = f"Dr. {entry['doctor_name']}" if entry.get('doctor_name') else "Medical Appointment"
+                conditions = f" — {', '.join(entry['conditions'])}" if entry['conditions'] else ""
+                st.write(f"📅 {entry_dt.strftime('%b %d, %Y')} · {label}{conditions}")
+            if not timeline["appointments"]:
+                st.info("Your timeline will appear here once appointments are recorded.")
+        else:
+            st.warning("Care timeline is temporarily unavailable.")
+
     st.divider()
     st.subheader("📋 Your Appointments")
     
     # Load appointments
-    appointments_response = get_appointments(st.session_state.token)
+    appointments_response = get_appointments(st.session_state.token, fields=APPOINTMENT_LIST_FIELDS)
     if appointments_response and appointments_response.get("status"):
         appointments = appointments_response.get("data", [])
         
@@ -377,7 +449,7 @@ def render_appointment_card(appt, is_upcoming=True):
             st.write(f"🕐 **Time:** {appt_dt.strftime('%I:%M %p')}")
             
             # Recording status
-            if appt.get('transcript'):
+            if appt.get('processed_at'):
                 st.success("✅ Recording processed")
             else:
                 st.info("📝 No recording yet")
@@ -470,14 +542,10 @@ def render_transcription_page():
     st.title("🎙️ Appointment Record")
     
     # Find appointment details
-    appointments_response = get_appointments(st.session_state.token)
+    appointment_response = get_appointment(st.session_state.token, st.session_state.appointment_id)
     appointment = None
-    if appointments_response and appointments_response.get("status"):
-        appointments = appointments_response.get("data", [])
-        for appt in appointments:
-            if appt['_id'] == st.session_state.appointment_id:
-                appointment = appt
-                break
+    if appointment_response and appointment_response.get("status"):
+        appointment = appointment_response.get("data")
     
     if not appointment:
         st.error("Could not find appointment details. Please go back.")
@@ -543,7 +611,7 @@ def render_transcription_page():
             col1, col2 = st.columns(2)
             with col1:
                 with st.spinner("Preparing audio file..."):
-                    audio_bytes = get_audio_file(st.session_state.token, appointment["_id"])
+                    audio_bytes = load_audio_file(st.session_state.token, appointment["_id"])
                     if audio_bytes:
                         st.download_button(
                             label="🔊 Download Audio File",
@@ -563,8 +631,17 @@ def render_transcription_page():
         st.info("📝 No recording has been processed for this appointment yet.")
         
         # Recording options in tabs
-        tab1, tab2 = st.tabs(["🎙️ Browser Recorder", "📁 Upload File"])
+        tab1, tab2, live_tab = st.tabs(["🎙️ Browser Recorder", "📁 Upload File", "⚡ Live Transcription"])
         
+        with live_tab:
+            st.subheader("⚡ Live Transcription")
+            st.info("See the conversation transcribed as it happens. The summary is generated as soon as you stop.")
+            create_live_transcriber(st.session_state.token, st.session_state.appointment_id, BASE_URL)
+
+            if st.button("🔄 Refresh Results", key="refresh_live_results", help="Reload after the summary is ready"):
+                bump_data_version(st.session_state.token, "appointments")
+                st.rerun()
+
         with tab1:
             st.subheader("🎙️ Live Audio Recording")
             st.info("Use the recorder below to capture your appointment conversation in real-time.")
@@ -592,324 +669,12 @@ def render_transcription_page():
                 - Add `http://localhost:8501` to "Allow" list
                 """)
             
-            # Professional HTML5 Audio Recorder
-            recorder_html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <style>
-                    .recorder-container {
-                        padding: 25px;
-                        border: 3px solid #0066cc;
-                        border-radius: 15px;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        text-align: center;
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        color: white;
-                        box-shadow: 0 8px 32px rgba(0,0,0,0.3);
-                    }
-                    .recorder-title {
-                        margin-bottom: 25px;
-                        font-size: 28px;
-                        font-weight: bold;
-                        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-                    }
-                    .controls {
-                        margin: 25px 0;
-                        display: flex;
-                        justify-content: center;
-                        gap: 15px;
-                        flex-wrap: wrap;
-                    }
-                    .btn {
-                        color: white;
-                        border: none;
-                        padding: 18px 35px;
-                        border-radius: 30px;
-                        cursor: pointer;
-                        font-size: 16px;
-                        font-weight: bold;
-                        box-shadow: 0 6px 20px rgba(0,0,0,0.3);
-                        transition: all 0.3s ease;
-                        text-transform: uppercase;
-                        letter-spacing: 1px;
-                    }
-                    .btn:hover:not(:disabled) {
-                        transform: translateY(-3px);
-                        box-shadow: 0 8px 25px rgba(0,0,0,0.4);
-                    }
-                    .btn:disabled {
-                        opacity: 0.5;
-                        cursor: not-allowed;
-                        transform: none;
-                    }
-                    .btn-start { 
-                        background: linear-gradient(45deg, #4CAF50, #45a049);
-                        animation: pulse 2s infinite;
-                    }
-                    .btn-pause { background: linear-gradient(45deg, #ff9800, #f57c00); }
-                    .btn-stop { background: linear-gradient(45deg, #f44336, #d32f2f); }
-                    .btn-process { 
-                        background: linear-gradient(45deg, #2196F3, #1976D2);
-                        padding: 18px 45px;
-                        font-size: 18px;
-                        margin-top: 15px;
-                    }
-                    .status {
-                        font-size: 20px;
-                        font-weight: bold;
-                        margin: 25px 0 15px 0;
-                        padding: 15px;
-                        border-radius: 10px;
-                        background: rgba(255,255,255,0.1);
-                        backdrop-filter: blur(10px);
-                    }
-                    .timer {
-                        font-size: 48px;
-                        font-weight: bold;
-                        font-family: 'Courier New', monospace;
-                        margin: 20px 0;
-                        text-shadow: 2px 2px 4px rgba(0,0,0,0.5);
-                        background: rgba(255,255,255,0.1);
-                        padding: 20px;
-                        border-radius: 15px;
-                        backdrop-filter: blur(10px);
-                    }
-                    .audio-player {
-                        width: 100%;
-                        margin-top: 25px;
-                        border-radius: 10px;
-                    }
-                    .error { 
-                        background: rgba(244, 67, 54, 0.2);
-                        border: 2px solid #f44336;
-                    }
-                    .success { 
-                        background: rgba(76, 175, 80, 0.2);
-                        border: 2px solid #4CAF50;
-                    }
-                    .warning {
-                        background: rgba(255, 152, 0, 0.2);
-                        border: 2px solid #ff9800;
-                    }
-                    @keyframes pulse {
-                        0% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.3); }
-                        50% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.6); }
-                        100% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.3); }
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="recorder-container">
-                    <div class="recorder-title">🎤 Professional Audio Recorder</div>
-                    
-                    <div class="controls">
-                        <button id="start-btn" class="btn btn-start" onclick="startRecording()">
-                            🎤 Start Recording
-                        </button>
-                        <button id="pause-btn" class="btn btn-pause" onclick="togglePause()" disabled>
-                            ⏸️ Pause
-                        </button>
-                        <button id="stop-btn" class="btn btn-stop" onclick="stopRecording()" disabled>
-                            ⏹️ Stop
-                        </button>
-                    </div>
-                    
-                    <div id="status" class="status">Ready to record</div>
-                    <div id="timer" class="timer">00:00</div>
-                    
-                    <audio id="playback" class="audio-player" controls style="display: none;"></audio>
-                    
-                    <div>
-                        <button id="process-btn" class="btn btn-process" onclick="processAudio()" disabled>
-                            🚀 Process Recording
-                        </button>
-                    </div>
-                </div>
+            # Streams the recording to the backend while it is being captured
+            create_audio_recorder(st.session_state.token, st.session_state.appointment_id, BASE_URL)
 
-                <script>
-                let mediaRecorder;
-                let audioChunks = [];
-                let startTime;
-                let timerInterval;
-                let isPaused = false;
-                let totalPausedTime = 0;
-                let pauseStartTime;
-                let recordedBlob = null;
-                
-                function updateTimer() {
-                    if (startTime && !isPaused) {
-                        const elapsed = Date.now() - startTime - totalPausedTime;
-                        const minutes = Math.floor(elapsed / 60000);
-                        const seconds = Math.floor((elapsed % 60000) / 1000);
-                        document.getElementById('timer').textContent = 
-                            String(minutes).padStart(2, '0') + ':' + String(seconds).padStart(2, '0');
-                    }
-                }
-                
-                async function startRecording() {
-                    try {
-                        console.log('Requesting microphone access...');
-                        
-                        const stream = await navigator.mediaDevices.getUserMedia({
-                            audio: {
-                                echoCancellation: true,
-                                noiseSuppression: true,
-                                autoGainControl: true,
-                                sampleRate: 44100
-                            }
-                        });
-                        
-                        console.log('Microphone access granted!');
-                        
-                        mediaRecorder = new MediaRecorder(stream);
-                        
-                        mediaRecorder.ondataavailable = (event) => {
-                            if (event.data.size > 0) {
-                                audioChunks.push(event.data);
-                            }
-                        };
-                        
-                        mediaRecorder.onstop = () => {
-                            recordedBlob = new Blob(audioChunks, { type: 'audio/webm' });
-                            const audioUrl = URL.createObjectURL(recordedBlob);
-                            const audioElement = document.getElementById('playback');
-                            audioElement.src = audioUrl;
-                            audioElement.style.display = 'block';
-                            document.getElementById('process-btn').disabled = false;
-                        };
-                        
-                        audioChunks = [];
-                        mediaRecorder.start(1000);
-                        startTime = Date.now();
-                        totalPausedTime = 0;
-                        isPaused = false;
-                        timerInterval = setInterval(updateTimer, 100);
-                        
-                        updateUI('recording');
-                        document.getElementById('status').textContent = '🔴 Recording in progress...';
-                        document.getElementById('status').className = 'status success';
-                        
-                    } catch (err) {
-                        console.error('Microphone access error:', err);
-                        
-                        let errorMessage = '';
-                        let instructions = '';
-                        
-                        if (err.name === 'NotAllowedError') {
-                            errorMessage = '❌ Microphone access denied';
-                            instructions = 'Please allow microphone access and refresh the page';
-                        } else if (err.name === 'NotFoundError') {
-                            errorMessage = '❌ No microphone found';
-                            instructions = 'Please connect a microphone and try again';
-                        } else if (err.name === 'NotSupportedError') {
-                            errorMessage = '❌ Browser not supported';
-                            instructions = 'Try using Chrome or Firefox';
-                        } else {
-                            errorMessage = '❌ Microphone access failed';
-                            if (window.location.protocol === 'http:') {
-                                instructions = 'Use HTTPS: python run_https.py';
-                            } else {
-                                instructions = 'Check browser permissions';
-                            }
-                        }
-                        
-                        document.getElementById('status').textContent = errorMessage + ' - ' + instructions;
-                        document.getElementById('status').className = 'status error';
-                    }
-                }
-                
-                function togglePause() {
-                    if (!mediaRecorder) return;
-                    
-                    if (mediaRecorder.state === 'recording') {
-                        mediaRecorder.pause();
-                        isPaused = true;
-                        pauseStartTime = Date.now();
-                        document.getElementById('pause-btn').textContent = '▶️ Resume';
-                        document.getElementById('status').textContent = '⏸️ Recording paused';
-                        document.getElementById('status').className = 'status warning';
-                    } else if (mediaRecorder.state === 'paused') {
-                        mediaRecorder.resume();
-                        totalPausedTime += Date.now() - pauseStartTime;
-                        isPaused = false;
-                        document.getElementById('pause-btn').textContent = '⏸️ Pause';
-                        document.getElementById('status').textContent = '🔴 Recording resumed...';
-                        document.getElementById('status').className = 'status success';
-                    }
-                }
-                
-                function stopRecording() {
-                    if (mediaRecorder && mediaRecorder.state !== 'inactive') {
-                        mediaRecorder.stop();
-                        clearInterval(timerInterval);
-                        
-                        mediaRecorder.stream.getAudioTracks().forEach(track => track.stop());
-                        
-                        updateUI('stopped');
-                        document.getElementById('status').textContent = '✅ Recording complete - Ready to process';
-                        document.getElementById('status').className = 'status success';
-                    }
-                }
-                
-                function updateUI(state) {
-                    const startBtn = document.getElementById('start-btn');
-                    const pauseBtn = document.getElementById('pause-btn');
-                    const stopBtn = document.getElementById('stop-btn');
-                    
-                    if (state === 'recording') {
-                        startBtn.disabled = true;
-                        pauseBtn.disabled = false;
-                        stopBtn.disabled = false;
-                    } else if (state === 'stopped') {
-                        startBtn.disabled = false;
-                        pauseBtn.disabled = true;
-                        stopBtn.disabled = true;
-                        pauseBtn.textContent = '⏸️ Pause';
-                    }
-                }
-                
-                function processAudio() {
-                    if (recordedBlob) {
-                        document.getElementById('status').textContent = '🔄 Converting audio for upload...';
-                        document.getElementById('status').className = 'status';
-                        document.getElementById('process-btn').disabled = true;
-                        document.getElementById('process-btn').textContent = '🔄 Processing...';
-                        
-                        // Convert blob to base64 for Streamlit
-                        const reader = new FileReader();
-                        reader.onloadend = function() {
-                            const base64data = reader.result.split(',')[1];
-                            
-                            // Send message to Streamlit
-                            window.parent.postMessage({
-                                type: 'streamlit:componentReady',
-                                audioData: base64data,
-                                filename: `recording_${Date.now()}.webm`,
-                                mimeType: 'audio/webm'
-                            }, '*');
-                            
-                            document.getElementById('status').textContent = '✅ Audio ready! Processing with backend...';
-                            document.getElementById('status').className = 'status success';
-                        };
-                        reader.readAsDataURL(recordedBlob);
-                    }
-                }
-                
-                // Check protocol and show warning
-                window.addEventListener('load', function() {
-                    if (window.location.protocol === 'http:') {
-                        document.getElementById('status').textContent = '⚠️ HTTP detected - Microphone may not work. Use HTTPS for best results.';
-                        document.getElementById('status').className = 'status warning';
-                    }
-                });
-                </script>
-            </body>
-            </html>
-            """
-            
-            # Render the enhanced HTML component
-            st.components.v1.html(recorder_html, height=500)
+            if st.button("🔄 Refresh Results", help="Reload after the recorder reports processing is complete"):
+                bump_data_version(st.session_state.token, "appointments")
+                st.rerun()
         
         with tab2:
             st.subheader("📁 Upload Audio File")
@@ -1004,6 +769,70 @@ def render_transcription_page():
         st.rerun()
 
 # --- UPDATED: Chat Page Sidebar ---
+def _escape_markdown(text):
+    """Backslash-escapes markdown punctuation so user text renders literally."""
+    return re.sub(r"([\\`*_{}\[\]()#+\-.!|<>~$:])", r"\\\1", text)
+
+def _highlighted_markdown(snippet):
+    """Renders a search snippet as markdown with its matched terms in bold."""
+    text, parts, position = snippet["text"].replace("\n", " "), [], 0
+    for start, end in snippet.get("highlights", []):
+        parts.append(_escape_markdown(text[position:start]))
+        parts.append(f"**{_escape_markdown(text[start:end])}**")
+        position = end
+    parts.append(_escape_markdown(text[position:]))
+    return "".join(parts)
+
+def render_search_page():
+    st.title("🔎 Search My History")
+    with st.form("search_form"):
+        query = st.text_input("Search chats and visit records", value=st.session_state.get("search_query", ""),
+                              placeholder='e.g. headache, "blood pressure", metformin -dosage')
+        types = st.multiselect("In", ["chats", "appointments"], default=["chats", "appointments"])
+        if st.form_submit_button("Search", type="primary"):
+            st.session_state.search_query = query.strip()
+            st.session_state.search_page = 1
+
+    query = st.session_state.get("search_query")
+    if query and types:
+        page = st.session_state.get("search_page", 1)
+        response = search_history(st.session_state.token, query, types=types, page=page)
+        if not response or not response.get("status"):
+            st.error("❌ Search is unavailable right now.")
+        else:
+            data = response["data"]
+            st.caption(f"{data['total']} matching chats and appointments")
+            for result in data["results"]:
+                icon = "💬" if result["type"] == "chat" else "🗓️"
+                when = result["timestamp"][:10] if result.get("timestamp") else ""
+                with st.container(border=True):
+                    st.markdown(f"{icon} **{result['title']}** · {when}")
+                    for snippet in result["snippets"]:
+                        label = snippet.get("role") or snippet["field"]
+                        st.markdown(f"*{label}:* {_highlighted_markdown(snippet)}")
+                    if result["type"] == "chat" and st.button("Open Chat", key=f"open_chat_{result['id']}"):
+                        chat = get_chat_history(result["id"], st.session_state.token)
+                        if chat and chat.get("status"):
+                            st.session_state.chat_id = result["id"]
+                            st.session_state.messages = chat["data"]["history"]
+                            st.session_state.page = "chat"
+                            st.rerun()
+                    if result["type"] == "appointment" and st.button("View Records", key=f"open_appt_{result['id']}"):
+                        st.session_state.appointment_id = result["id"]
+                        st.session_state.page = "transcribe"
+                        st.rerun()
+            col1, col2 = st.columns(2)
+            if page > 1 and col1.button("⬅️ Previous"):
+                st.session_state.search_page = page - 1
+                st.rerun()
+            if page * data["page_size"] < data["total"] and col2.button("Next ➡️"):
+                st.session_state.search_page = page + 1
+                st.rerun()
+
+    if st.button("⬅️ Back to Chat"):
+        st.session_state.page = "chat"
+        st.rerun()
+
 def render_chat_page():
     with st.sidebar:
         st.header(f"Welcome, {st.session_state.user_profile.get('full_name', '')}!")
@@ -1017,6 +846,9 @@ def render_chat_page():
         if st.button("🏥 Find Hospitals"):
             st.session_state.page = "hospitals"
             st.rerun()
+        if st.button("🔎 Search History"):
+            st.session_state.page = "search"
+            st.rerun()
         if st.button("👤 My Profile"):
             st.session_state.page = "profile"
             st.rerun()
@@ -1079,6 +911,9 @@ def render_chat_page():
                     st.error("Failed to get a response from the AI.")
 
 # --- Main Page Router ---
+if st.session_state.logged_in and st.session_state.page in PAGE_PREFETCH_CALLS:
+    prefetch_dashboard(st.session_state.token, PAGE_PREFETCH_CALLS[st.session_state.page])
+
 if not st.session_state.logged_in:
     render_login_page()
 elif st.session_state.page == "profile":
@@ -1090,5 +925,7 @@ elif st.session_state.page == "appointments":
     render_appointments_page()
 elif st.session_state.page == "transcribe":
     render_transcription_page()
+elif st.session_state.page == "search":
+    render_search_page()
 else: # Default to chat page
-    render_chat_page()
\ No newline at end of file
+    render_chat_page()
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from api_client import BASE_URL, APPOINTMENT_LIST_FIELDS, cached_response, count_backend_call, prime_cache
+
+@dataclass
+class CallTiming:
+    name: str
+    path: str
+    status: Optional[int]
+    elapsed_ms: float
+    coalesced: bool = False
+
+class AsyncApiClient:
+    """
+    Async counterpart of api_client for read-heavy page loads. Independent
+    calls are fanned out concurrently, and identical in-flight GETs (same path,
+    params and token) share a single request.
+    """
+    def __init__(self, base_url: str = BASE_URL, timeout: float = 30.0):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self.timings: List[CallTiming] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    async def get_json(self, path: str, token: str, params: Optional[Dict[str, Any]] = None, name: Optional[str] = None):
+        key = (path, token, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(path, token, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        start = time.perf_counter()
+        status, data = await task
+        self.timings.append(CallTiming(
+            name=name or path,
+            path=path,
+            status=status,
+            elapsed_ms=(time.perf_counter() - start) * 1000,
+            coalesced=coalesced
+        ))
+        return data
+
+    async def _fetch(self, path: str, token: str, params: Optional[Dict[str, Any]]):
+        count_backend_call()
+        headers = {"Authorization": f"Bearer {token}"}
+        try:
+            response = await self._client.get(path, headers=headers, params=params)
+        except httpx.HTTPError as e:
+            print(f"Async API call to {path} failed: {e}")
+            return None, None
+        data = response.json() if response.status_code == 200 else None
+        return response.status_code, data
+
+    async def fetch_many(self, token: str, calls: Dict[str, Tuple[str, Optional[Dict[str, Any]]]]) -> Dict[str, Any]:
+        """Runs every (path, params) call concurrently and returns the results by name."""
+        names = list(calls)
+        results = await asyncio.gather(*(
+            self.get_json(path, token, params, name=name) for name, (path, params) in calls.items()
+        ))
+        return dict(zip(names, results))
+
+DASHBOARD_CALLS = {
+    "profile": ("/users/me/profile", None),
+    "chat_sessions": ("/chat/history", None),
+    "appointments": ("/appointments/", {"fields": APPOINTMENT_LIST_FIELDS}),
+}
+APPOINTMENTS_PAGE_CALLS = {
+    "appointments": ("/appointments/", {"fields": APPOINTMENT_LIST_FIELDS}),
+    "timeline": ("/appointments/timeline", None),
+}
+
+async def _load_dashboard(token: str, calls: Dict[str, Tuple[str, Optional[Dict[str, Any]]]]):
+    results = {name: cached_response(f"{BASE_URL}{path}", token, params) for name, (path, params) in calls.items()}
+    missing = {name: calls[name] for name, result in results.items() if result is None}
+    if not missing:
+        return results, []
+    async with AsyncApiClient() as client:
+        fetched = await client.fetch_many(token, missing)
+    for name, (path, params) in missing.items():
+        if fetched[name] is not None:
+            prime_cache(f"{BASE_URL}{path}", token, fetched[name], params=params)
+    return {**results, **fetched}, client.timings
+
+def load_dashboard(token: str, calls: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = DASHBOARD_CALLS):
+    """
+    Fetches the (path, params) `calls` a page needs concurrently and primes
+    api_client's cache with them, so page render waits for the slowest call
+    rather than the sum of all of them. Calls already cached are not
+    repeated. Returns (results, timings).
+    """
+    return asyncio.run(_load_dashboard(token, calls))
@@ -1,187 +1,410 @@
+import json
 import streamlit as st
-import io
-import base64
-from typing import Optional
 
-def create_audio_recorder(key: str = "audio_recorder") -> Optional[bytes]:
-    """
-    Creates a custom audio recorder using HTML5 MediaRecorder API
-    Returns audio bytes when recording is complete
-    """
-    
-    # Initialize session state for this recorder
-    if f"{key}_recording" not in st.session_state:
-        st.session_state[f"{key}_recording"] = False
-    if f"{key}_audio_data" not in st.session_state:
-        st.session_state[f"{key}_audio_data"] = None
-    
-    # Audio recorder HTML/JavaScript component
-    audio_recorder_html = f"""
-    <div style="padding: 20px; border: 2px dashed #ccc; border-radius: 10px; text-align: center; background: #f9f9f9;">
-        <h4>Audio Recorder</h4>
-        
-        <div style="margin: 15px 0;">
-            <button id="start-btn-{key}" onclick="startRecording_{key}()" 
-                    style="background: #4CAF50; color: white; border: none; padding: 10px 20px; margin: 5px; border-radius: 5px; cursor: pointer;">
+# The recorder streams MediaRecorder chunks straight to the backend's chunked
+# upload endpoint while recording, so nothing is base64-encoded or routed
+# through Streamlit session state and the upload is complete when the user
+# presses stop. Processing runs when the user presses "Process Recording".
+RECORDER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        .recorder-container {
+            padding: 25px;
+            border: 3px solid #0066cc;
+            border-radius: 15px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            text-align: center;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            color: white;
+            box-shadow: 0 8px 32px rgba(0,0,0,0.3);
+        }
+        .recorder-title {
+            margin-bottom: 25px;
+            font-size: 28px;
+            font-weight: bold;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
+        }
+        .controls {
+            margin: 25px 0;
+            display: flex;
+            justify-content: center;
+            gap: 15px;
+            flex-wrap: wrap;
+        }
+        .btn {
+            color: white;
+            border: none;
+            padding: 18px 35px;
+            border-radius: 30px;
+            cursor: pointer;
+            font-size: 16px;
+            font-weight: bold;
+            box-shadow: 0 6px 20px rgba(0,0,0,0.3);
+            transition: all 0.3s ease;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+        .btn:hover:not(:disabled) {
+            transform: translateY(-3px);
+            box-shadow: 0 8px 25px rgba(0,0,0,0.4);
+        }
+        .btn:disabled {
+            opacity: 0.5;
+            cursor: not-allowed;
+            transform: none;
+        }
+        .btn-start { 
+            background: linear-gradient(45deg, #4CAF50, #45a049);
+            animation: pulse 2s infinite;
+        }
+        .btn-pause { background: linear-gradient(45deg, #ff9800, #f57c00); }
+        .btn-stop { background: linear-gradient(45deg, #f44336, #d32f2f); }
+        .btn-process { 
+            background: linear-gradient(45deg, #2196F3, #1976D2);
+            padding: 18px 45px;
+            font-size: 18px;
+            margin-top: 15px;
+        }
+        .status {
+            font-size: 20px;
+            font-weight: bold;
+            margin: 25px 0 15px 0;
+            padding: 15px;
+            border-radius: 10px;
+            background: rgba(255,255,255,0.1);
+            backdrop-filter: blur(10px);
+        }
+        .timer {
+            font-size: 48px;
+            font-weight: bold;
+            font-family: 'Courier New', monospace;
+            margin: 20px 0;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.5);
+            background: rgba(255,255,255,0.1);
+            padding: 20px;
+            border-radius: 15px;
+            backdrop-filter: blur(10px);
+        }
+        .audio-player {
+            width: 100%;
+            margin-top: 25px;
+            border-radius: 10px;
+        }
+        .error { 
+            background: rgba(244, 67, 54, 0.2);
+            border: 2px solid #f44336;
+        }
+        .success { 
+            background: rgba(76, 175, 80, 0.2);
+            border: 2px solid #4CAF50;
+        }
+        .warning {
+            background: rgba(255, 152, 0, 0.2);
+            border: 2px solid #ff9800;
+        }
+        @keyframes pulse {
+            0% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.3); }
+            50% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.6); }
+            100% { box-shadow: 0 6px 20px rgba(76, 175, 80, 0.3); }
+        }
+    </style>
+</head>
+<body>
+    <div class="recorder-container">
+        <div class="recorder-title">🎤 Professional Audio Recorder</div>
+
+        <div class="controls">
+            <button id="start-btn" class="btn btn-start" onclick="startRecording()">
                 🎤 Start Recording
             </button>
-            
-            <button id="pause-btn-{key}" onclick="pauseRecording_{key}()" disabled
-                    style="background: #ff9800; color: white; border: none; padding: 10px 20px; margin: 5px; border-radius: 5px; cursor: pointer;">
+            <button id="pause-btn" class="btn btn-pause" onclick="togglePause()" disabled>
                 ⏸️ Pause
             </button>
-            
-            <button id="stop-btn-{key}" onclick="stopRecording_{key}()" disabled
-                    style="background: #f44336; color: white; border: none; padding: 10px 20px; margin: 5px; border-radius: 5px; cursor: pointer;">
+            <button id="stop-btn" class="btn btn-stop" onclick="stopRecording()" disabled>
                 ⏹️ Stop
             </button>
         </div>
-        
-        <div id="status-{key}" style="margin: 10px 0; font-weight: bold;">Ready to record</div>
-        <div id="timer-{key}" style="margin: 10px 0; font-size: 18px; color: #333;">00:00</div>
-        
-        <audio id="audio-playback-{key}" controls style="width: 100%; margin-top: 15px; display: none;"></audio>
-        
-        <div style="margin-top: 15px;">
-            <button id="send-btn-{key}" onclick="sendAudio_{key}()" disabled
-                    style="background: #2196F3; color: white; border: none; padding: 12px 24px; border-radius: 5px; cursor: pointer; font-size: 16px;">
-                📤 Send for Processing
+
+        <div id="status" class="status">Ready to record</div>
+        <div id="timer" class="timer">00:00</div>
+        <div id="upload-progress">Uploaded: 0 KB</div>
+
+        <audio id="playback" class="audio-player" controls style="display: none;"></audio>
+
+        <div>
+            <button id="process-btn" class="btn btn-process" onclick="processAudio()" disabled>
+                🚀 Process Recording
             </button>
         </div>
     </div>
 
     <script>
-    let mediaRecorder_{key};
-    let audioChunks_{key} = [];
-    let startTime_{key};
-    let timerInterval_{key};
-    let isPaused_{key} = false;
-    
-    function updateTimer_{key}() {{
-        if (!isPaused_{key}) {{
-            const elapsed = Date.now() - startTime_{key};
+    const CONFIG = __RECORDER_CONFIG__;
+    const API = `${CONFIG.baseUrl}/appointments/${CONFIG.appointmentId}/uploads`;
+    const AUTH = { 'Authorization': `Bearer ${CONFIG.token}` };
+
+    let mediaRecorder;
+    let audioChunks = [];
+    let startTime;
+    let timerInterval;
+    let isPaused = false;
+    let totalPausedTime = 0;
+    let pauseStartTime;
+    let uploadId = null;
+    let uploadOffset = 0;
+    let uploadFailed = false;
+    // Chunks are sent strictly in order: each PATCH waits for the previous one.
+    let uploadChain = Promise.resolve();
+
+    function setStatus(text, cls) {
+        document.getElementById('status').textContent = text;
+        document.getElementById('status').className = 'status ' + (cls || '');
+    }
+
+    function updateTimer() {
+        if (startTime && !isPaused) {
+            const elapsed = Date.now() - startTime - totalPausedTime;
             const minutes = Math.floor(elapsed / 60000);
             const seconds = Math.floor((elapsed % 60000) / 1000);
-            document.getElementById('timer-{key}').textContent = 
+            document.getElementById('timer').textContent =
                 String(minutes).padStart(2, '0') + ':' + String(seconds).padStart(2, '0');
-        }}
-    }}
-    
-    async function startRecording_{key}() {{
-        try {{
-            const stream = await navigator.mediaRecorder.getUserMedia({{ audio: true }});
-            mediaRecorder_{key} = new MediaRecorder(stream);
-            
-            mediaRecorder_{key}.ondataavailable = event => {{
-                audioChunks_{key}.push(event.data);
-            }};
-            
-            mediaRecorder_{key}.onstop = () => {{
-                const audioBlob = new Blob(audioChunks_{key}, {{ type: 'audio/wav' }});
-                const audioUrl = URL.createObjectURL(audioBlob);
-                const audioElement = document.getElementById('audio-playback-{key}');
-                audioElement.src = audioUrl;
+        }
+    }
+
+    async function createUpload() {
+        const response = await fetch(API, {
+            method: 'POST',
+            headers: { ...AUTH, 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: `recording_${Date.now()}.webm`, content_type: 'audio/webm' })
+        });
+        if (!response.ok) throw new Error(`Could not start upload (HTTP ${response.status})`);
+        const body = await response.json();
+        uploadId = body.data.upload_id;
+        uploadOffset = body.data.offset;
+    }
+
+    async function checksumHeader(blob) {
+        const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return 'sha256 ' + btoa(String.fromCharCode(...new Uint8Array(digest)));
+    }
+
+    async function serverOffset() {
+        const response = await fetch(`${API}/${uploadId}`, { method: 'HEAD', headers: AUTH });
+        if (!response.ok) throw new Error(`Could not resume upload (HTTP ${response.status})`);
+        return parseInt(response.headers.get('Upload-Offset'), 10);
+    }
+
+    async function sendChunk(blob) {
+        const checksum = await checksumHeader(blob);
+        for (let attempt = 1; attempt <= 5; attempt++) {
+            try {
+                const response = await fetch(`${API}/${uploadId}`, {
+                    method: 'PATCH',
+                    headers: {
+                        ...AUTH,
+                        'Content-Type': 'application/offset+octet-stream',
+                        'Upload-Offset': String(uploadOffset),
+                        'Upload-Checksum': checksum
+                    },
+                    body: blob
+                });
+                if (response.ok) {
+                    const body = await response.json();
+                    uploadOffset = body.data.offset;
+                    document.getElementById('upload-progress').textContent =
+                        `Uploaded: ${(uploadOffset / 1024).toFixed(0)} KB`;
+                    return;
+                }
+                console.warn(`Chunk rejected (HTTP ${response.status}), attempt ${attempt}`);
+            } catch (err) {
+                console.warn(`Chunk upload interrupted, attempt ${attempt}:`, err);
+            }
+            await new Promise(resolve => setTimeout(resolve, Math.min(1000 * 2 ** attempt, 10000)));
+            try {
+                // The chunk may have been committed before the connection dropped.
+                const committed = await serverOffset();
+                if (committed === uploadOffset + blob.size) {
+                    uploadOffset = committed;
+                    return;
+                }
+                if (Number.isInteger(committed) && committed >= 0) uploadOffset = committed;
+            } catch (err) {
+                // Still offline; the next attempt retries with the offset we have.
+                console.warn(`Could not re-sync upload offset, attempt ${attempt}:`, err);
+            }
+        }
+        throw new Error('Chunk upload failed after 5 attempts');
+    }
+
+    function queueChunk(blob) {
+        uploadChain = uploadChain.then(() => uploadFailed ? null : sendChunk(blob)).catch(err => {
+            uploadFailed = true;
+            console.error(err);
+            setStatus('❌ ' + err.message + ' - please use the Upload File tab', 'error');
+        });
+    }
+
+    async function startRecording() {
+        try {
+            console.log('Requesting microphone access...');
+
+            const stream = await navigator.mediaDevices.getUserMedia({
+                audio: {
+                    echoCancellation: true,
+                    noiseSuppression: true,
+                    autoGainControl: true,
+                    sampleRate: 44100
+                }
+            });
+
+            console.log('Microphone access granted!');
+
+            await createUpload();
+            uploadFailed = false;
+            uploadChain = Promise.resolve();
+
+            mediaRecorder = new MediaRecorder(stream);
+
+            mediaRecorder.ondataavailable = (event) => {
+                if (event.data.size > 0) {
+                    audioChunks.push(event.data);
+                    queueChunk(event.data);
+                }
+            };
+
+            mediaRecorder.onstop = async () => {
+                const recordedBlob = new Blob(audioChunks, { type: 'audio/webm' });
+                const audioElement = document.getElementById('playback');
+                audioElement.src = URL.createObjectURL(recordedBlob);
                 audioElement.style.display = 'block';
-                
-                // Convert to base64 and store
-                const reader = new FileReader();
-                reader.onloadend = () => {{
-                    const base64Audio = reader.result.split(',')[1];
-                    window.parent.postMessage({{
-                        type: 'audio-recorded',
-                        key: '{key}',
-                        audio: base64Audio
-                    }}, '*');
-                }};
-                reader.readAsDataURL(audioBlob);
-                
-                document.getElementById('send-btn-{key}').disabled = false;
-            }};
-            
-            audioChunks_{key} = [];
-            mediaRecorder_{key}.start();
-            startTime_{key} = Date.now();
-            isPaused_{key} = false;
-            timerInterval_{key} = setInterval(updateTimer_{key}, 1000);
-            
-            document.getElementById('start-btn-{key}').disabled = true;
-            document.getElementById('pause-btn-{key}').disabled = false;
-            document.getElementById('stop-btn-{key}').disabled = false;
-            document.getElementById('status-{key}').textContent = 'Recording...';
-            document.getElementById('status-{key}').style.color = '#4CAF50';
-            
-        }} catch (err) {{
-            console.error('Error starting recording:', err);
-            document.getElementById('status-{key}').textContent = 'Error: Could not access microphone';
-            document.getElementById('status-{key}').style.color = '#f44336';
-        }}
-    }}
-    
-    function pauseRecording_{key}() {{
-        if (mediaRecorder_{key} && mediaRecorder_{key}.state === 'recording') {{
-            mediaRecorder_{key}.pause();
-            isPaused_{key} = true;
-            document.getElementById('status-{key}').textContent = 'Paused';
-            document.getElementById('status-{key}').style.color = '#ff9800';
-            document.getElementById('pause-btn-{key}').textContent = '▶️ Resume';
-            document.getElementById('pause-btn-{key}').onclick = resumeRecording_{key};
-        }}
-    }}
-    
-    function resumeRecording_{key}() {{
-        if (mediaRecorder_{key} && mediaRecorder_{key}.state === 'paused') {{
-            mediaRecorder_{key}.resume();
-            isPaused_{key} = false;
-            document.getElementById('status-{key}').textContent = 'Recording...';
-            document.getElementById('status-{key}').style.color = '#4CAF50';
-            document.getElementById('pause-btn-{key}').textContent = '⏸️ Pause';
-            document.getElementById('pause-btn-{key}').onclick = pauseRecording_{key};
-        }}
-    }}
-    
-    function stopRecording_{key}() {{
-        if (mediaRecorder_{key}) {{
-            mediaRecorder_{key}.stop();
-            clearInterval(timerInterval_{key});
-            
-            // Stop all audio tracks
-            mediaRecorder_{key}.stream.getAudioTracks().forEach(track => track.stop());
-            
-            document.getElementById('start-btn-{key}').disabled = false;
-            document.getElementById('pause-btn-{key}').disabled = true;
-            document.getElementById('stop-btn-{key}').disabled = true;
-            document.getElementById('status-{key}').textContent = 'Recording complete';
-            document.getElementById('status-{key}').style.color = '#2196F3';
-        }}
-    }}
-    
-    function sendAudio_{key}() {{
-        window.parent.postMessage({{
-            type: 'audio-send-requested',
-            key: '{key}'
-        }}, '*');
-    }}
+                await uploadChain;
+                if (!uploadFailed) {
+                    setStatus('✅ Recording uploaded - Ready to process', 'success');
+                    document.getElementById('process-btn').disabled = false;
+                }
+            };
+
+            audioChunks = [];
+            mediaRecorder.start(1000);
+            startTime = Date.now();
+            totalPausedTime = 0;
+            isPaused = false;
+            timerInterval = setInterval(updateTimer, 100);
+
+            updateUI('recording');
+            setStatus('🔴 Recording in progress...', 'success');
+
+        } catch (err) {
+            console.error('Recorder start error:', err);
+
+            let errorMessage = '';
+            let instructions = '';
+
+            if (err.name === 'NotAllowedError') {
+                errorMessage = '❌ Microphone access denied';
+                instructions = 'Please allow microphone access and refresh the page';
+            } else if (err.name === 'NotFoundError') {
+                errorMessage = '❌ No microphone found';
+                instructions = 'Please connect a microphone and try again';
+            } else if (err.name === 'NotSupportedError') {
+                errorMessage = '❌ Browser not supported';
+                instructions = 'Try using Chrome or Firefox';
+            } else if (err.message && err.message.startsWith('Could not start upload')) {
+                errorMessage = '❌ ' + err.message;
+                instructions = 'Check that the backend is running';
+            } else {
+                errorMessage = '❌ Microphone access failed';
+                if (window.location.protocol === 'http:') {
+                    instructions = 'Use HTTPS: python run_https.py';
+                } else {
+                    instructions = 'Check browser permissions';
+                }
+            }
+
+            setStatus(errorMessage + ' - ' + instructions, 'error');
+        }
+    }
+
+    function togglePause() {
+        if (!mediaRecorder) return;
+
+        if (mediaRecorder.state === 'recording') {
+            mediaRecorder.pause();
+            isPaused = true;
+            pauseStartTime = Date.now();
+            document.getElementById('pause-btn').textContent = '▶️ Resume';
+            setStatus('⏸️ Recording paused', 'warning');
+        } else if (mediaRecorder.state === 'paused') {
+            mediaRecorder.resume();
+            totalPausedTime += Date.now() - pauseStartTime;
+            isPaused = false;
+            document.getElementById('pause-btn').textContent = '⏸️ Pause';
+            setStatus('🔴 Recording resumed...', 'success');
+        }
+    }
+
+    function stopRecording() {
+        if (mediaRecorder && mediaRecorder.state !== 'inactive') {
+            mediaRecorder.stop();
+            clearInterval(timerInterval);
+
+            mediaRecorder.stream.getAudioTracks().forEach(track => track.stop());
+
+            updateUI('stopped');
+            setStatus('⏳ Finishing upload...', '');
+        }
+    }
+
+    function updateUI(state) {
+        const startBtn = document.getElementById('start-btn');
+        const pauseBtn = document.getElementById('pause-btn');
+        const stopBtn = document.getElementById('stop-btn');
+
+        if (state === 'recording') {
+            startBtn.disabled = true;
+            pauseBtn.disabled = false;
+            stopBtn.disabled = false;
+        } else if (state === 'stopped') {
+            startBtn.disabled = false;
+            pauseBtn.disabled = true;
+            stopBtn.disabled = true;
+            pauseBtn.textContent = '⏸️ Pause';
+        }
+    }
+
+    async function processAudio() {
+        const processBtn = document.getElementById('process-btn');
+        processBtn.disabled = true;
+        processBtn.textContent = '🔄 Processing...';
+        setStatus('🔄 Transcribing and summarising... This may take a few minutes.', '');
+        try {
+            const response = await fetch(`${API}/${uploadId}/finalize`, { method: 'POST', headers: AUTH });
+            if (!response.ok) throw new Error(`Processing failed (HTTP ${response.status})`);
+            setStatus('✅ Processing complete! Click "Refresh Results" below.', 'success');
+            processBtn.textContent = '✅ Processed';
+        } catch (err) {
+            setStatus('❌ ' + err.message, 'error');
+            processBtn.disabled = false;
+            processBtn.textContent = '🚀 Process Recording';
+        }
+    }
+
+    // Check protocol and show warning
+    window.addEventListener('load', function() {
+        if (window.location.protocol === 'http:') {
+            setStatus('⚠️ HTTP detected - Microphone may not work. Use HTTPS for best results.', 'warning');
+        }
+    });
     </script>
+</body>
+</html>
+"""
+
+def create_audio_recorder(token: str, appointment_id: str, base_url: str, height: int = 520):
+    """
+    Renders the browser audio recorder for an appointment. The component talks
+    to the backend directly with the user's token.
     """
-    
-    # Display the HTML component
-    st.components.v1.html(audio_recorder_html, height=300)
-    
-    # Listen for messages from the HTML component
-    if f"{key}_send_requested" not in st.session_state:
-        st.session_state[f"{key}_send_requested"] = False
-    
-    return st.session_state.get(f"{key}_audio_data")
-
-def handle_audio_message(message_data):
-    """Handle audio messages from the HTML component"""
-    if message_data.get('type') == 'audio-recorded':
-        key = message_data.get('key')
-        audio_b64 = message_data.get('audio')
-        if audio_b64:
-            audio_bytes = base64.b64decode(audio_b64)
-            st.session_state[f"{key}_audio_data"] = audio_bytes
-    
-    elif message_data.get('type') == 'audio-send-requested':
-        key = message_data.get('key')
-        st.session_state[f"{key}_send_requested"] = True
\ No newline at end of file
+    config = json.dumps({"token": token, "appointmentId": appointment_id, "baseUrl": base_url})
+    st.components.v1.html(RECORDER_HTML.replace("__RECORDER_CONFIG__", config), height=height)
@@ -0,0 +1,145 @@
+import json
+import streamlit as st
+
+# Streams microphone audio to the backend's live transcription WebSocket as
+# 16 kHz 16-bit PCM and shows utterances as they are recognised. When the user
+# stops, the backend summarises the transcript straight away, so results are
+# ready a few seconds after the appointment ends.
+LIVE_TRANSCRIBER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        .live-container {
+            padding: 20px;
+            border: 3px solid #0066cc;
+            border-radius: 15px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            color: white;
+        }
+        .controls { display: flex; justify-content: center; gap: 15px; margin-bottom: 15px; }
+        .btn {
+            color: white;
+            border: none;
+            padding: 14px 30px;
+            border-radius: 30px;
+            cursor: pointer;
+            font-size: 15px;
+            font-weight: bold;
+        }
+        .btn:disabled { opacity: 0.5; cursor: not-allowed; }
+        .btn-start { background: linear-gradient(45deg, #4CAF50, #45a049); }
+        .btn-stop { background: linear-gradient(45deg, #f44336, #d32f2f); }
+        .status { text-align: center; font-weight: bold; margin-bottom: 10px; }
+        .transcript {
+            height: 260px;
+            overflow-y: auto;
+            background: rgba(255,255,255,0.12);
+            border-radius: 10px;
+            padding: 12px;
+            line-height: 1.5;
+        }
+        .partial { opacity: 0.7; font-style: italic; }
+    </style>
+</head>
+<body>
+    <div class="live-container">
+        <div class="controls">
+            <button id="start-btn" class="btn btn-start" onclick="startLive()">🎤 Start Live Transcription</button>
+            <button id="stop-btn" class="btn btn-stop" onclick="stopLive()" disabled>⏹️ Stop &amp; Summarise</button>
+        </div>
+        <div id="status" class="status">Ready</div>
+        <div class="transcript"><div id="finals"></div><div id="partial" class="partial"></div></div>
+    </div>
+
+    <script>
+    const CONFIG = __LIVE_CONFIG__;
+    const WS_URL = `${CONFIG.baseUrl.replace(/^http/, 'ws')}/appointments/${CONFIG.appointmentId}/live` +
+        `?sample_rate=${CONFIG.sampleRate}`;
+
+    let socket, audioContext, source, processor, stream;
+
+    function setStatus(text) {
+        document.getElementById('status').textContent = text;
+    }
+
+    function toPcm16(samples) {
+        const pcm = new Int16Array(samples.length);
+        for (let i = 0; i < samples.length; i++) {
+            const s = Math.max(-1, Math.min(1, samples[i]));
+            pcm[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+        }
+        return pcm.buffer;
+    }
+
+    function handleMessage(event) {
+        const message = JSON.parse(event.data);
+        if (message.type === 'partial') {
+            document.getElementById('partial').textContent = message.text;
+        } else if (message.type === 'final') {
+            const line = document.createElement('div');
+            line.textContent = message.text;
+            document.getElementById('finals').appendChild(line);
+            document.getElementById('partial').textContent = '';
+        } else if (message.type === 'error') {
+            setStatus('❌ ' + message.text);
+        } else if (message.type === 'processed') {
+            setStatus('✅ Summary ready! Click "Refresh Results" below.');
+        }
+    }
+
+    async function startLive() {
+        try {
+            stream = await navigator.mediaDevices.getUserMedia({ audio: { channelCount: 1, echoCancellation: true } });
+        } catch (err) {
+            setStatus('❌ Microphone access failed - ' + err.message);
+            return;
+        }
+        socket = new WebSocket(WS_URL);
+        socket.binaryType = 'arraybuffer';
+        socket.onmessage = handleMessage;
+        socket.onclose = event => {
+            if (event.code !== 1000 && event.code !== 1005) setStatus('❌ Connection closed: ' + (event.reason || event.code));
+            document.getElementById('start-btn').disabled = false;
+            document.getElementById('stop-btn').disabled = true;
+        };
+        socket.onopen = () => {
+            // Authenticate first; the token is kept out of the URL so it is never logged.
+            socket.send(JSON.stringify({ type: 'auth', token: CONFIG.token }));
+            // The browser resamples the microphone to the requested rate.
+            audioContext = new AudioContext({ sampleRate: CONFIG.sampleRate });
+            source = audioContext.createMediaStreamSource(stream);
+            processor = audioContext.createScriptProcessor(4096, 1, 1);
+            processor.onaudioprocess = e => {
+                if (socket.readyState === WebSocket.OPEN) socket.send(toPcm16(e.inputBuffer.getChannelData(0)));
+            };
+            source.connect(processor);
+            processor.connect(audioContext.destination);
+            document.getElementById('start-btn').disabled = true;
+            document.getElementById('stop-btn').disabled = false;
+            setStatus('🔴 Listening...');
+        };
+    }
+
+    function stopLive() {
+        if (processor) processor.disconnect();
+        if (source) source.disconnect();
+        if (audioContext) audioContext.close();
+        if (stream) stream.getAudioTracks().forEach(track => track.stop());
+        document.getElementById('stop-btn').disabled = true;
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: 'stop' }));
+            setStatus('🔄 Generating summary...');
+        }
+    }
+    </script>
+</body>
+</html>
+"""
+
+def create_live_transcriber(token: str, appointment_id: str, base_url: str, sample_rate: int = 16000, height: int = 420):
+    """Renders the live transcription component for an appointment."""
+    config = json.dumps({
+        "token": token, "appointmentId": appointment_id, "baseUrl": base_url, "sampleRate": sample_rate
+    })
+    st.components.v1.html(LIVE_TRANSCRIBER_HTML.replace("__LIVE_CONFIG__", config), height=height)
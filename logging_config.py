@@ -0,0 +1,106 @@
+# logging_config.py
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+from config import settings
+from tracing import TraceContextFilter
+
+# Per-request access lines go to this logger so they can be sampled
+# independently of application logs.
+REQUEST_LOGGER_NAME = "api.requests"
+
+# LogRecord attributes that are not user-supplied `extra` fields.
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields become top-level keys."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestLogSampler(logging.Filter):
+    """
+    Keeps a `sample_rate` fraction of routine request logs. Warnings, 5xx
+    responses and requests slower than `slow_seconds` are always kept.
+    """
+    def __init__(self, sample_rate: float, slow_seconds: float):
+        super().__init__(REQUEST_LOGGER_NAME)
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "status", 0) >= 500 or getattr(record, "duration_s", 0) >= self.slow_seconds:
+            return True
+        return random.random() < self.sample_rate
+
+class _StructuredQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without pre-rendering them to text
+    (the stock QueueHandler does), so the JSON formatter still sees the extra
+    fields. Only the work that must happen on the caller's thread is done here.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _file_handler() -> logging.Handler:
+    if settings.LOG_ROTATION == "time":
+        return TimedRotatingFileHandler(
+            settings.LOG_FILE, when=settings.LOG_ROTATION_WHEN, backupCount=settings.LOG_BACKUP_COUNT
+        )
+    return RotatingFileHandler(
+        settings.LOG_FILE, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT
+    )
+
+def configure_logging() -> QueueListener:
+    """
+    Routes all logging through an in-memory queue. The event loop only
+    enqueues records; a background listener thread formats them as JSON and
+    writes them to stdout and a rotating log file.
+    """
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout), _file_handler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    queue_handler = _StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(TraceContextFilter())
+    request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+    request_logger.addFilter(RequestLogSampler(settings.REQUEST_LOG_SAMPLE_RATE, settings.REQUEST_LOG_SLOW_SECONDS))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
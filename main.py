@@ -1,27 +1,30 @@
 import logging
-import sys
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, Response
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind
+
+# Marks the start of module import so startup can report import-to-ready time.
+IMPORT_STARTED_AT = time.perf_counter()
 
 # Import routers
-from api import auth_router, chat_router, user_router, hospitals_router, appointments_router
+from api import auth_router, chat_router, user_router, hospitals_router, appointments_router, admin_router, search_router
 from database import db
 from config import settings
-from neo4j_driver import close_neo4j_driver
+import neo4j_driver
+from neo4j_driver import close_neo4j_driver, graph_write_queue, async_neo4j_driver, ensure_neo4j_schema
+from logging_config import configure_logging, REQUEST_LOGGER_NAME
+from services.upload_service import upload_store
+from tracing import configure_tracing, shutdown_tracing, tracer
+from metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, RESPONSES, current_route, route_template, render_metrics
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('api_logs.log')
-    ]
-)
+configure_tracing()
+configure_logging()
 logger = logging.getLogger(__name__)
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -32,10 +35,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to connect to database: {e}")
         raise
+    # Neo4j connects in the background so its availability never gates startup.
+    async_neo4j_driver.start_background_reconnect(
+        interval=settings.NEO4J_RECONNECT_INTERVAL,
+        on_connect=ensure_neo4j_schema
+    )
+    graph_write_queue.start()
+    upload_store.start_cleanup(settings.UPLOAD_CLEANUP_INTERVAL)
+    app.state.startup_seconds = time.perf_counter() - IMPORT_STARTED_AT
+    logger.info(f"API ready {app.state.startup_seconds:.3f}s after import")
     yield
     logger.info("Shutting down SageAI Medical Advisor API...")
+    await graph_write_queue.stop()
+    await upload_store.stop_cleanup()
     db.close()
-    close_neo4j_driver()
+    await close_neo4j_driver()
+    shutdown_tracing()
 
 app = FastAPI(
     title="SageAI Medical Advisor API",
@@ -47,25 +62,64 @@ app = FastAPI(
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    
-    # Log the request
-    logger.info(f"Request: {request.method} {request.url}")
-    
+    start_time = time.perf_counter()
     response = await call_next(request)
-    
-    # Log the response
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} - {process_time:.4f}s")
-    
+    duration = time.perf_counter() - start_time
+    # One structured line per request; routine ones are sampled by logging_config.
+    request_logger.info(
+        "%s %s %s",
+        request.method, request.url.path, response.status_code,
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_s": round(duration, 4)
+        }
+    )
     return response
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    method = request.method
+    route = route_template(request.scope)
+    # Copied into the endpoint's context, so dependency metrics carry the route.
+    route_token = current_route.set(route)
+    in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+    in_flight.inc()
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start_time)
+        RESPONSES.labels(method, route, str(status_code)).inc()
+        in_flight.dec()
+        current_route.reset(route_token)
+
+# Registered last so it wraps the logging and metrics middleware, which then
+# log and observe inside the request's span.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    route = route_template(request.scope)
+    with tracer.start_as_current_span(
+        f"{request.method} {route}",
+        context=propagate.extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.route": route, "http.target": request.url.path}
+    ) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Upload-Offset", "Upload-Length"],
 )
 
 # Exception handler for better error logging
@@ -84,16 +138,36 @@ app.include_router(chat_router.router)
 app.include_router(user_router.router)
 app.include_router(hospitals_router.router)
 app.include_router(appointments_router.router)
+app.include_router(admin_router.router)
+app.include_router(search_router.router)
 logger.info("All routers included successfully")
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the SageAI Medical Advisor API"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+def graph_write_plan_status() -> str:
+    if neo4j_driver.label_scan_writes is None:
+        return "unchecked"
+    if neo4j_driver.label_scan_writes:
+        return "label_scan: " + ", ".join(neo4j_driver.label_scan_writes)
+    return "index_seek"
+
 @app.get("/health")
 def health_check():
     try:
         db.client.admin.command('ping')
-        return {"status": "healthy", "database": "connected"}
+        return {
+            "status": "healthy",
+            "database": "connected",
+            "graph_database": async_neo4j_driver.breaker.state,
+            "graph_write_plans": graph_write_plan_status(),
+            "startup_seconds": getattr(app.state, "startup_seconds", None)
+        }
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,157 @@
+# metrics.py
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+from opentelemetry.trace import SpanKind
+from starlette.routing import Match
+
+from tracing import tracer
+
+# Buckets reach well past a minute because transcription and summarisation
+# requests legitimately take that long.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling an HTTP request, by route template.",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ["method", "route"]
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "HTTP responses sent, by status code.",
+    ["method", "route", "status"]
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_call_duration_seconds",
+    "Time spent in calls to an external dependency, by the route that made them.",
+    ["dependency", "operation", "route"],
+    buckets=LATENCY_BUCKETS
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_call_errors_total",
+    "Failed calls to an external dependency, by the route that made them.",
+    ["dependency", "operation", "route"]
+)
+
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total",
+    "Gemini tokens consumed, by endpoint and kind (prompt, thinking, output).",
+    ["endpoint", "kind"]
+)
+GEMINI_COST = Counter(
+    "gemini_cost_usd_total",
+    "Estimated Gemini spend in USD, by endpoint.",
+    ["endpoint"]
+)
+
+CHAT_ROUTE_DECISIONS = Counter(
+    "chat_route_decisions_total",
+    "Chat turns by the route the request classifier picked.",
+    ["route"]
+)
+STRUCTURED_SUMMARY_PARSES = Counter(
+    "structured_summary_parses_total",
+    "Structured summary generations by parse outcome: valid, repaired (fixed locally) or failed.",
+    ["outcome"]
+)
+
+# Route template of the request being handled, set by the metrics middleware.
+# Dependency calls made outside a request (startup, background tasks, scripts)
+# are labelled "background".
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+def route_template(scope) -> str:
+    """
+    Returns the path template (e.g. /appointments/{appointment_id}) the request
+    matches, so labels stay bounded no matter how many IDs are requested.
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+def _observe_dependency(dependency: str, operation: str, seconds: float, failed: bool):
+    route = current_route.get()
+    DEPENDENCY_LATENCY.labels(dependency, operation, route).observe(seconds)
+    if failed:
+        DEPENDENCY_ERRORS.labels(dependency, operation, route).inc()
+
+@contextmanager
+def track_dependency(dependency: str, operation: str):
+    """
+    Times a call to `dependency`, counts it as an error if it raises, and
+    wraps it in a client span so it shows up in the request's trace.
+    """
+    start = time.perf_counter()
+    failed = False
+    try:
+        with tracer.start_as_current_span(
+            f"{dependency}.{operation}",
+            kind=SpanKind.CLIENT,
+            attributes={"peer.service": dependency, "operation": operation}
+        ):
+            yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _observe_dependency(dependency, operation, time.perf_counter() - start, failed)
+
+class DependencyTimer:
+    """
+    Like track_dependency, for calls that hand control back to the caller
+    between driver round trips (e.g. a streamed read yielding each record):
+    only the time spent inside `timing()` blocks is recorded, once, when
+    `finish()` is called. The span is not made current, since the caller's
+    code runs while it is open.
+    """
+    def __init__(self, dependency: str, operation: str):
+        self.dependency = dependency
+        self.operation = operation
+        self.elapsed = 0.0
+        self.failed = False
+        self.span = tracer.start_span(
+            f"{dependency}.{operation}",
+            kind=SpanKind.CLIENT,
+            attributes={"peer.service": dependency, "operation": operation}
+        )
+
+    @contextmanager
+    def timing(self):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failed = True
+            raise
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def finish(self):
+        _observe_dependency(self.dependency, self.operation, self.elapsed, self.failed)
+        self.span.end()
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records every MongoDB command's server round-trip time, as reported by the driver."""
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        _observe_dependency("mongodb", event.command_name, event.duration_micros / 1_000_000, False)
+
+    def failed(self, event):
+        _observe_dependency("mongodb", event.command_name, event.duration_micros / 1_000_000, True)
+
+def render_metrics():
+    """Returns the metrics payload and its content type in Prometheus text format."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,85 +1,611 @@
 # neo4j_driver.py
-from neo4j import GraphDatabase
+import asyncio
+import logging
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from neo4j import AsyncGraphDatabase, READ_ACCESS
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
 from config import settings
-from typing import Dict, Any
+from metrics import DependencyTimer, track_dependency
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Awaitable, Callable
 from datetime import datetime # <-- Make sure datetime is imported
 
-class Neo4jDriver:
-    def __init__(self, uri, user, password):
+logger = logging.getLogger(__name__)
+
+class Neo4jCircuitOpen(ServiceUnavailable):
+    """Raised instead of attempting a Bolt connection while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive connectivity failures and
+    rejects calls for `reset_timeout` seconds, then lets a single trial call
+    through (half-open) to decide whether to close again.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half_open":
+            # Re-arm the timer so only one trial call goes through.
+            self.opened_at = time.monotonic()
+            return True
+        return state == "closed"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Neo4j circuit breaker opened after {self.failures} consecutive failures.")
+            self.opened_at = time.monotonic()
+
+CONNECTIVITY_ERRORS = (ServiceUnavailable, SessionExpired)
+
+class AsyncNeo4jDriver:
+    """
+    Event-loop friendly Neo4j driver. Writes and reads run as
+    managed transactions, so the driver retries transient failures itself.
+    The underlying driver is created on first use and guarded by a circuit
+    breaker, so an unavailable Neo4j fails calls fast instead of stalling them.
+    """
+    def __init__(
+        self,
+        uri,
+        user,
+        password,
+        max_connection_pool_size: int,
+        connection_acquisition_timeout: float,
+        breaker: CircuitBreaker
+    ):
+        self.uri = uri
+        self.auth = (user, password)
+        self.max_connection_pool_size = max_connection_pool_size
+        self.connection_acquisition_timeout = connection_acquisition_timeout
+        self.breaker = breaker
+        self.driver = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def _get_driver(self):
+        if self.driver is None:
+            try:
+                self.driver = AsyncGraphDatabase.driver(
+                    self.uri,
+                    auth=self.auth,
+                    max_connection_pool_size=self.max_connection_pool_size,
+                    connection_acquisition_timeout=self.connection_acquisition_timeout
+                )
+            except Exception as e:
+                raise ServiceUnavailable(f"Could not create async Neo4j driver: {e}") from e
+        return self.driver
+
+    @asynccontextmanager
+    async def _session(self, **kwargs):
+        if not self.breaker.allow():
+            raise Neo4jCircuitOpen("Neo4j circuit breaker is open; skipping call.")
         try:
-            self.driver = GraphDatabase.driver(uri, auth=(user, password))
-            self.driver.verify_connectivity()
-            print("Successfully connected to Neo4j.")
-        except Exception as e:
-            print(f"Error connecting to Neo4j: {e}")
-            self.driver = None
+            async with self._get_driver().session(**kwargs) as session:
+                yield session
+        except CONNECTIVITY_ERRORS:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    async def verify_connectivity(self):
+        await self._get_driver().verify_connectivity()
+        print("Successfully connected to Neo4j (async).")
 
-    def close(self):
+    def start_background_reconnect(self, interval: float, on_connect: Optional[Callable[[], Awaitable[None]]] = None):
+        """Connects in the background and keeps re-probing while Neo4j is unreachable."""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(
+                self._reconnect_loop(interval, on_connect), name="neo4j-reconnect"
+            )
+
+    async def _reconnect_loop(self, interval: float, on_connect):
+        connected = False
+        while True:
+            if not connected or self.breaker.state != "closed":
+                try:
+                    await self.verify_connectivity()
+                    self.breaker.record_success()
+                    if on_connect is not None:
+                        await on_connect()
+                    connected = True
+                except CONNECTIVITY_ERRORS as e:
+                    self.breaker.record_failure()
+                    connected = False
+                    logger.warning(f"Neo4j still unreachable, retrying in {interval}s: {e}")
+                except Exception as e:
+                    connected = False
+                    logger.error(f"Neo4j connected but post-connect setup failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
         if self.driver is not None:
-            self.driver.close()
-            print("Neo4j connection closed.")
+            await self.driver.close()
+            self.driver = None
+            print("Async Neo4j connection closed.")
 
-    def execute_query(self, query, parameters=None):
-        if self.driver is None:
-            print("Neo4j driver not initialized.")
-            return None
-        with self.driver.session() as session:
-            result = session.run(query, parameters)
-            return [record for record in result]
+    async def execute_write(self, query, parameters=None):
+        async def work(tx):
+            result = await tx.run(query, parameters)
+            return [record async for record in result]
+        with track_dependency("neo4j", "write"):
+            async with self._session() as session:
+                return await session.execute_write(work)
 
-neo4j_driver = Neo4jDriver(settings.NEO4J_URI, settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+    async def execute_read(self, query, parameters=None):
+        async def work(tx):
+            result = await tx.run(query, parameters)
+            return [record async for record in result]
+        with track_dependency("neo4j", "read"):
+            async with self._session(default_access_mode=READ_ACCESS) as session:
+                return await session.execute_read(work)
 
-def create_user_node(email: str, full_name: str, username: str):
-    query = (
-        "MERGE (u:User {email: $email}) "
-        "ON CREATE SET u.username = $username, u.fullName = $full_name, u.createdAt = timestamp()"
+    async def stream_read(self, query, parameters=None, fetch_size: int = 1000) -> AsyncIterator[Any]:
+        """
+        Yields records as they arrive instead of materialising the whole result.
+        Streaming cannot be retried transparently, so this uses an explicit
+        read transaction rather than execute_read.
+        """
+        # Only the driver's work is timed, not the caller's between records.
+        timer = DependencyTimer("neo4j", "stream_read")
+        try:
+            async with AsyncExitStack() as stack:
+                with timer.timing():
+                    session = await stack.enter_async_context(
+                        self._session(default_access_mode=READ_ACCESS, fetch_size=fetch_size)
+                    )
+                    tx = await stack.enter_async_context(await session.begin_transaction())
+                    records = (await tx.run(query, parameters)).__aiter__()
+                while True:
+                    with timer.timing():
+                        try:
+                            record = await records.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    yield record
+                with timer.timing():
+                    await stack.aclose()
+        finally:
+            timer.finish()
+
+    async def explain_operators(self, query, parameters=None) -> List[str]:
+        """Returns the operator types of the query plan, without executing the query."""
+        async with self._session(default_access_mode=READ_ACCESS) as session:
+            result = await session.run(f"EXPLAIN {query}", parameters)
+            summary = await result.consume()
+        operators = []
+        pending = [summary.plan] if summary.plan else []
+        while pending:
+            plan = pending.pop()
+            operators.append(plan["operatorType"])
+            pending.extend(plan.get("children", []))
+        return operators
+
+async_neo4j_driver = AsyncNeo4jDriver(
+    settings.NEO4J_URI,
+    settings.NEO4J_USER,
+    settings.NEO4J_PASSWORD,
+    max_connection_pool_size=settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+    connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.NEO4J_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.NEO4J_BREAKER_RESET_TIMEOUT
     )
-    parameters = {"email": email, "full_name": full_name, "username": username}
-    neo4j_driver.execute_query(query, parameters)
-    print(f"Created or merged User node for: {email}")
+)
+
+# --- Schema bootstrap ---
+# The write-behind queries below MERGE on User.email and Appointment.id; without these
+# constraints each MERGE falls back to a label scan.
+
+GRAPH_SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT user_email_unique IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
+    "CREATE CONSTRAINT appointment_id_unique IF NOT EXISTS FOR (a:Appointment) REQUIRE a.id IS UNIQUE",
+    "CREATE INDEX user_username IF NOT EXISTS FOR (u:User) ON (u.username)",
+    "CREATE INDEX appointment_time IF NOT EXISTS FOR (a:Appointment) ON (a.appointmentTime)",
+    "CREATE CONSTRAINT condition_name_unique IF NOT EXISTS FOR (c:Condition) REQUIRE c.name IS UNIQUE",
+]
+
+# Write-behind query kinds whose plan fell back to a label scan at the last
+# schema check; reported by /health. None until the check has run.
+label_scan_writes: Optional[List[str]] = None
+
+async def ensure_neo4j_schema():
+    """Creates the graph constraints and indexes, then checks the write plans use them."""
+    global label_scan_writes
+    for statement in GRAPH_SCHEMA_STATEMENTS:
+        await async_neo4j_driver.execute_write(statement)
+    logger.info(f"Ensured {len(GRAPH_SCHEMA_STATEMENTS)} Neo4j constraints/indexes.")
+    results = await verify_graph_write_plans()
+    label_scan_writes = [kind for kind, uses_index in results.items() if not uses_index]
+
+async def verify_graph_write_plans() -> Dict[str, bool]:
+    """
+    EXPLAINs each write-behind query and reports whether its lookups resolve
+    through an index seek rather than a label scan.
+    """
+    sample_rows = [{
+        "email": "plan-check@example.com", "username": "", "full_name": "", "props": {},
+        "appointment_id": "plan-check", "doctor_name": "", "specialization": "", "reason": "",
+        "appointment_time": "", "processed_at": "", "conditions": ["plan-check"]
+    }]
+    results = {}
+    for kind, query in GRAPH_WRITE_QUERIES.items():
+        operators = await async_neo4j_driver.explain_operators(query, {"rows": sample_rows})
+        uses_seek = any("IndexSeek" in op for op in operators)
+        uses_scan = any("NodeByLabelScan" in op or "AllNodesScan" in op for op in operators)
+        results[kind] = uses_seek and not uses_scan
+        if not results[kind]:
+            logger.warning(f"Neo4j '{kind}' write is not using an index seek. Plan operators: {operators}")
+    return results
+
+# --- Batched write-behind queue ---
+# Graph writes are mirrors of data already committed to MongoDB, so request
+# handlers only enqueue them. A background task drains the queue and flushes
+# consecutive writes of the same kind as a single UNWIND statement.
 
-def update_user_node_properties(email: str, properties: Dict[str, Any]):
+GRAPH_WRITE_QUERIES = {
+    "create_user": (
+        "UNWIND $rows AS row "
+        "MERGE (u:User {email: row.email}) "
+        "ON CREATE SET u.username = row.username, u.fullName = row.full_name, u.createdAt = timestamp()"
+    ),
+    "update_user": (
+        "UNWIND $rows AS row "
+        "MERGE (u:User {email: row.email}) "
+        "SET u += row.props"
+    ),
+    "create_appointment": (
+        "UNWIND $rows AS row "
+        "MATCH (u:User {email: row.email}) "
+        "MERGE (a:Appointment {id: row.appointment_id}) "
+        "ON CREATE SET "
+        "  a.doctor = row.doctor_name, "
+        "  a.specialization = row.specialization, "
+        "  a.reason = row.reason, "
+        "  a.appointmentTime = row.appointment_time, "
+        "  a.createdAt = timestamp() "
+        "MERGE (u)-[:HAS_APPOINTMENT]->(a)"
+    ),
+    "update_appointment": (
+        "UNWIND $rows AS row "
+        "MATCH (a:Appointment {id: row.appointment_id}) "
+        "SET a += row.props"
+    ),
+    "delete_appointment": (
+        "UNWIND $rows AS row "
+        "MATCH (a:Appointment {id: row.appointment_id}) "
+        "DETACH DELETE a"
+    ),
+    "link_conditions": (
+        "UNWIND $rows AS row "
+        "MATCH (a:Appointment {id: row.appointment_id}) "
+        "SET a.processedAt = row.processed_at "
+        "WITH a, row "
+        "OPTIONAL MATCH (a)-[old:DIAGNOSED_WITH]->(:Condition) "
+        "DELETE old "
+        "WITH DISTINCT a, row "
+        "UNWIND row.conditions AS condition_name "
+        "MERGE (c:Condition {name: condition_name}) "
+        "MERGE (a)-[:DIAGNOSED_WITH]->(c)"
+    ),
+}
+
+TRANSIENT_NEO4J_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+class GraphWriteQueueFull(Exception):
+    """Raised when a graph write cannot be enqueued before the backpressure timeout."""
+
+class GraphWriteQueue:
+    def __init__(
+        self,
+        maxsize: int,
+        batch_size: int,
+        flush_interval: float,
+        max_retries: int,
+        enqueue_timeout: float,
+        drain_timeout: float
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.enqueue_timeout = enqueue_timeout
+        self.drain_timeout = drain_timeout
+        self._in_flight = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._worker = asyncio.create_task(self._run(), name="neo4j-write-behind")
+        logger.info("Neo4j write-behind queue started.")
+
+    async def stop(self):
+        """
+        Stops the worker after flushing what is still queued, waiting at most
+        `drain_timeout` seconds so an unreachable Neo4j cannot stall shutdown.
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"CRITICAL: Neo4j write-behind queue not drained within {self.drain_timeout}s; "
+                f"dropped {self._queue.qsize() + self._in_flight} writes."
+            )
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info("Neo4j write-behind queue flushed and stopped.")
+
+    async def enqueue(self, kind: str, row: Dict[str, Any]):
+        if not self.running:
+            # No event-loop worker (e.g. scripts): write through immediately.
+            await self._write_with_retry(kind, [row])
+            return
+        try:
+            await asyncio.wait_for(self._queue.put((kind, row)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise GraphWriteQueueFull(
+                f"Neo4j write queue is full ({self.maxsize} pending writes); dropped '{kind}' write."
+            )
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._in_flight = len(batch)
+            try:
+                await self._flush(batch)
+            finally:
+                self._in_flight = 0
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        # Group consecutive writes of the same kind so ordering between kinds
+        # (e.g. a user created before their appointment) is preserved.
+        groups: List[Tuple[str, List[Dict[str, Any]]]] = []
+        for kind, row in batch:
+            if groups and groups[-1][0] == kind:
+                groups[-1][1].append(row)
+            else:
+                groups.append((kind, [row]))
+        for kind, rows in groups:
+            try:
+                await self._write_with_retry(kind, rows)
+            except Exception as e:
+                logger.error(f"CRITICAL: Dropped {len(rows)} Neo4j '{kind}' writes. Error: {e}")
+
+    async def _write_with_retry(self, kind: str, rows: List[Dict[str, Any]]):
+        query = GRAPH_WRITE_QUERIES[kind]
+        for attempt in range(self.max_retries + 1):
+            try:
+                await async_neo4j_driver.execute_write(query, {"rows": rows})
+                logger.info(f"Flushed {len(rows)} Neo4j '{kind}' writes.")
+                timeline_cache.invalidate(row["email"] for row in rows)
+                return
+            except Neo4jCircuitOpen:
+                # The breaker already knows Neo4j is down; retrying only delays the failure.
+                raise
+            except TRANSIENT_NEO4J_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 0.5 * (2 ** attempt)
+                logger.warning(f"Transient Neo4j error on '{kind}' batch, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+graph_write_queue = GraphWriteQueue(
+    maxsize=settings.NEO4J_WRITE_QUEUE_MAXSIZE,
+    batch_size=settings.NEO4J_WRITE_BATCH_SIZE,
+    flush_interval=settings.NEO4J_WRITE_FLUSH_INTERVAL,
+    max_retries=settings.NEO4J_WRITE_MAX_RETRIES,
+    enqueue_timeout=settings.NEO4J_WRITE_ENQUEUE_TIMEOUT,
+    drain_timeout=settings.NEO4J_WRITE_DRAIN_TIMEOUT
+)
+
+async def create_user_node(email: str, full_name: str, username: str):
+    row = {"email": email, "full_name": full_name, "username": username}
+    await graph_write_queue.enqueue("create_user", row)
+    print(f"Queued User node merge for: {email}")
+
+async def update_user_node_properties(email: str, properties: Dict[str, Any]):
     if not properties:
         print("No properties to update in Neo4j.")
         return
-    query = (
-        "MERGE (u:User {email: $email}) "
-        "SET u += $props"
-    )
-    parameters = {"email": email, "props": properties}
-    neo4j_driver.execute_query(query, parameters)
-    print(f"Updated Neo4j properties for user: {email}")
+    row = {"email": email, "props": properties}
+    await graph_write_queue.enqueue("update_user", row)
+    print(f"Queued Neo4j property update for user: {email}")
 
-# --- THIS IS THE NEW FUNCTION THAT WAS MISSING ---
-def create_appointment_node_and_link_to_user(
+async def create_appointment_node_and_link_to_user(
     email: str,
     appointment_id: str,
     doctor_name: str,
     specialization: str,
-    appointment_time: datetime
+    appointment_time: datetime,
+    reason: Optional[str] = None
 ):
     """
-    Creates an Appointment node and links it to an existing User node.
+    Queues creation of an Appointment node linked to an existing User node.
     """
-    query = (
-        "MATCH (u:User {email: $email}) "
-        "MERGE (a:Appointment {id: $appointment_id}) "
-        "ON CREATE SET "
-        "  a.doctor = $doctor_name, "
-        "  a.specialization = $specialization, "
-        "  a.appointmentTime = $appointment_time, "
-        "  a.createdAt = timestamp() "
-        "MERGE (u)-[:HAS_APPOINTMENT]->(a)"
-    )
-    parameters = {
+    row = {
         "email": email,
         "appointment_id": appointment_id,
         "doctor_name": doctor_name,
         "specialization": specialization,
+        "reason": reason,
         "appointment_time": appointment_time.isoformat()
     }
-    neo4j_driver.execute_query(query, parameters)
-    print(f"Created or merged Appointment node for user: {email}")
+    await graph_write_queue.enqueue("create_appointment", row)
+    print(f"Queued Appointment node merge for user: {email}")
+
+async def update_appointment_node(email: str, appointment_id: str, update_data: Dict[str, Any]):
+    """Queues an update of the mirrored Appointment node after a PATCH."""
+    field_map = {"doctor_name": "doctor", "specialization": "specialization", "reason": "reason"}
+    props = {field_map[k]: v for k, v in update_data.items() if k in field_map}
+    if update_data.get("appointment_time"):
+        props["appointmentTime"] = update_data["appointment_time"].isoformat()
+    if not props:
+        return
+    row = {"email": email, "appointment_id": appointment_id, "props": props}
+    await graph_write_queue.enqueue("update_appointment", row)
+    print(f"Queued Appointment node update for user: {email}")
+
+async def delete_appointment_node(email: str, appointment_id: str):
+    row = {"email": email, "appointment_id": appointment_id}
+    await graph_write_queue.enqueue("delete_appointment", row)
+    print(f"Queued Appointment node deletion for user: {email}")
+
+def normalize_condition(name: Any) -> Optional[str]:
+    """
+    Canonical form of a condition name, shared by Condition nodes and the
+    profile's previous issues so the two dedupe against each other:
+    lowercased, whitespace collapsed, surrounding periods dropped.
+    """
+    if not isinstance(name, str):
+        return None
+    name = re.sub(r"\s+", " ", name).strip(" .").lower()
+    return name or None
+
+def _normalize_conditions(names) -> List[str]:
+    return list(dict.fromkeys(filter(None, map(normalize_condition, names))))
+
+async def link_appointment_conditions(email: str, appointment_id: str, conditions: List[str], processed_at: datetime):
+    """Queues linking a processed Appointment node to the Condition nodes diagnosed in it."""
+    row = {
+        "email": email,
+        "appointment_id": appointment_id,
+        "conditions": _normalize_conditions(conditions),
+        "processed_at": processed_at.isoformat()
+    }
+    await graph_write_queue.enqueue("link_conditions", row)
+    print(f"Queued {len(row['conditions'])} Condition links for appointment: {appointment_id}")
+
+# --- Patient timeline projection ---
+# A single traversal returns the user's appointments (newest first) with their
+# linked conditions. The projection is cached per user and invalidated whenever
+# the write-behind queue flushes a write for that user.
+
+PATIENT_TIMELINE_QUERY = (
+    "MATCH (u:User {email: $email}) "
+    "OPTIONAL MATCH (u)-[:HAS_APPOINTMENT]->(a:Appointment) "
+    "OPTIONAL MATCH (a)-[:DIAGNOSED_WITH]->(c:Condition) "
+    "WITH u, a, collect(DISTINCT c.name) AS conditions "
+    "ORDER BY a.appointmentTime DESC "
+    "RETURN u.previous_issues AS previous_issues, "
+    "  collect(CASE WHEN a IS NULL THEN NULL ELSE a {"
+    "    .id, .doctor, .specialization, .reason, .appointmentTime, .processedAt, conditions: conditions"
+    "  } END) AS appointments"
+)
+
+class TimelineCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(email)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, email: str, projection: Dict[str, Any]):
+        self._entries[email] = (time.monotonic() + self.ttl, projection)
+
+    def invalidate(self, emails):
+        for email in emails:
+            self._entries.pop(email, None)
+
+timeline_cache = TimelineCache(ttl=settings.NEO4J_TIMELINE_CACHE_TTL)
+
+async def get_patient_timeline(email: str) -> Dict[str, Any]:
+    """
+    Returns the user's appointment timeline, specialisation history and
+    conditions, computed from one graph traversal and cached per user.
+    """
+    cached = timeline_cache.get(email)
+    if cached is not None:
+        return cached
+
+    records = await async_neo4j_driver.execute_read(PATIENT_TIMELINE_QUERY, {"email": email})
+    record = records[0] if records else None
+    appointments = []
+    for appt in (record["appointments"] if record else []):
+        appointments.append({
+            "appointment_id": appt["id"],
+            "doctor_name": appt["doctor"],
+            "specialization": appt["specialization"],
+            "reason": appt["reason"],
+            "appointment_time": appt["appointmentTime"],
+            "processed": appt["processedAt"] is not None,
+            "conditions": _normalize_conditions(appt["conditions"])
+        })
+
+    # Appointments arrive newest first, so the last one seen is the first visit.
+    specializations: Dict[str, Dict[str, Any]] = {}
+    for appt in appointments:
+        if not appt["specialization"]:
+            continue
+        entry = specializations.setdefault(appt["specialization"], {
+            "specialization": appt["specialization"],
+            "visit_count": 0,
+            "last_visit": appt["appointment_time"]
+        })
+        entry["visit_count"] += 1
+        entry["first_visit"] = appt["appointment_time"]
+
+    # Condition nodes written before names were normalised may differ only in case.
+    conditions = _normalize_conditions(
+        [c for appt in appointments for c in appt["conditions"]]
+        + list((record["previous_issues"] if record else None) or [])
+    )
+
+    projection = {
+        "appointments": appointments,
+        "specialization_history": sorted(specializations.values(), key=lambda s: s["last_visit"], reverse=True),
+        "conditions": conditions
+    }
+    timeline_cache.set(email, projection)
+    return projection
 
-def close_neo4j_driver():
-    neo4j_driver.close()
\ No newline at end of file
+async def close_neo4j_driver():
+    await async_neo4j_driver.close()
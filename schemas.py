@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional, TypeVar, Generic, Tuple, Dict, Any
 from bson import ObjectId
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, model_validator
 
 # --- Generic Response Model (Unchanged) ---
 T = TypeVar('T')
@@ -60,6 +60,8 @@ class UserProfile(UserBase, UserProfileUpdate):
 class UserInDB(UserBase, UserProfileUpdate):
     id: PyObjectId = Field(alias="_id")
     hashed_password: str
+    # Incremented on every profile update; keys the cached system prompt
+    profile_version: int = 0
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
@@ -71,6 +73,42 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 
+# --- Gemini Usage Accounting ---
+class GeminiUsage(BaseModel):
+    model: str
+    route: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    thinking_tokens: int = 0
+    output_tokens: int = 0
+    tool_use_prompt_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+
+class UsageTotals(BaseModel):
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    thinking_tokens: int = 0
+    output_tokens: int = 0
+    tool_use_prompt_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+
+class EndpointUsage(UsageTotals):
+    endpoint: str
+    model: Optional[str] = None
+    route: Optional[str] = None
+
+class UserUsage(UsageTotals):
+    user_id: str
+
+class UsageStats(BaseModel):
+    since: datetime
+    totals: UsageTotals
+    by_endpoint: List[EndpointUsage] = []
+    by_user: List[UserUsage] = []
+
 # --- Chat Schemas (UPDATED) ---
 class ChatMessage(BaseModel):
     role: str
@@ -78,6 +116,7 @@ class ChatMessage(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.now)
     turn_number: Optional[int] = None
     citations: Optional[List[SourceCitation]] = None
+    usage: Optional[GeminiUsage] = None
 
 class ChatSession(BaseModel):
     id: PyObjectId = Field(alias="_id")
@@ -125,12 +164,109 @@ class AppointmentUpdate(BaseModel):
     reason: Optional[str] = Field(None, max_length=500)
     appointment_time: Optional[datetime] = None
 
+# --- Structured Summary Schema ---
+def _summary_text(value: Any) -> str:
+    """Flattens whatever the model put in a text field into a string; empty means "None"."""
+    if value is None:
+        return "None"
+    if isinstance(value, (list, tuple)):
+        value = "; ".join(_summary_text(v) for v in value if v not in (None, "", "None"))
+    elif isinstance(value, dict):
+        value = "; ".join(f"{k}: {_summary_text(v)}" for k, v in value.items() if v not in (None, "", "None"))
+    value = str(value).strip()
+    return value or "None"
+
+def _summary_key(key: Any) -> str:
+    return "".join(ch for ch in str(key).lower() if ch.isalnum())
+
+class _SummarySection(BaseModel):
+    """
+    Base for the structured summary models. Every field is required so the
+    JSON schema sent to Gemini asks for all of them, but validation is
+    tolerant: keys match case- and punctuation-insensitively, missing text
+    fields become "None", lists and numbers are flattened to text, and a bare
+    string given for a whole section fills its first field.
+    """
+    @model_validator(mode="before")
+    @classmethod
+    def _tolerate(cls, data: Any) -> Any:
+        fields = cls.model_fields
+        if not isinstance(data, dict):
+            data = {next(iter(fields)): data} if data is not None else {}
+        by_key = {_summary_key(name): name for name in fields}
+        normalised = {}
+        for key, value in data.items():
+            name = by_key.get(_summary_key(key))
+            if name:
+                normalised[name] = value
+        for name, field in fields.items():
+            if field.annotation is str:
+                normalised[name] = _summary_text(normalised.get(name))
+            else:
+                normalised.setdefault(name, {})
+        return normalised
+
+    @classmethod
+    def schema_repairs(cls, data: Any, path: str = "") -> List[str]:
+        """
+        Describes what validating `data` has to fix: renamed keys, missing
+        fields and values of the wrong type. Cosmetic normalisation (trimmed
+        whitespace, empty or null text becoming "None", ignored extra keys)
+        is not reported.
+        """
+        if not isinstance(data, dict):
+            return [f"{path.rstrip('.') or 'summary'} not an object"]
+        keys = {_summary_key(key): key for key in data}
+        repairs = []
+        for name, field in cls.model_fields.items():
+            key = keys.get(_summary_key(name))
+            if key is None:
+                repairs.append(f"missing {path}{name}")
+                continue
+            if key != name:
+                repairs.append(f"renamed {path}{key}")
+            if field.annotation is str:
+                if data[key] is not None and not isinstance(data[key], str):
+                    repairs.append(f"coerced {path}{name}")
+            else:
+                repairs.extend(field.annotation.schema_repairs(data[key], f"{path}{name}."))
+        return repairs
+
+class DietAdvice(_SummarySection):
+    Recommended: str
+    Restricted: str
+
+class LifestyleModifications(_SummarySection):
+    Diet: DietAdvice
+    Exercise: str
+    Other_Recommendations: str
+
+class FollowUp(_SummarySection):
+    Timing: str
+    Special_Instructions: str
+
+class StructuredSummary(_SummarySection):
+    Chief_Complaint: str
+    Symptoms: str
+    Physical_Examination: str
+    Diagnosis: str
+    Medications: str
+    Treatment_Plan: str
+    Lifestyle_Modifications: LifestyleModifications
+    Follow_up: FollowUp
+    Additional_Notes: str
+
 class AppointmentRecord(BaseModel):
     transcript: Optional[str] = None
     summary: Optional[str] = None
-    structured_summary: Optional[Dict[str, Any]] = None # <-- MODIFIED: Use Dict for JSON object
+    structured_summary: Optional[StructuredSummary] = None
+    # Lowercased names extracted from structured_summary, indexed per user for search
+    diagnoses: List[str] = []
+    medications: List[str] = []
     audio_path: Optional[str] = None
     processed_at: Optional[datetime] = None
+    # Gemini usage of the summaries, keyed "soap" and "structured"
+    summary_usage: Optional[Dict[str, GeminiUsage]] = None
 
 class AppointmentInDB(AppointmentBase, AppointmentRecord):
     id: PyObjectId = Field(alias="_id")
@@ -142,8 +278,63 @@ class AppointmentInDB(AppointmentBase, AppointmentRecord):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+class TimelineAppointment(BaseModel):
+    appointment_id: str
+    doctor_name: Optional[str] = None
+    specialization: Optional[str] = None
+    reason: Optional[str] = None
+    appointment_time: datetime
+    processed: bool = False
+    conditions: List[str] = []
+
+class SpecializationVisit(BaseModel):
+    specialization: str
+    visit_count: int
+    first_visit: datetime
+    last_visit: datetime
+
+class PatientTimeline(BaseModel):
+    appointments: List[TimelineAppointment] = []
+    specialization_history: List[SpecializationVisit] = []
+    conditions: List[str] = []
+
+# --- Search Schemas ---
+class SearchSnippet(BaseModel):
+    field: str
+    text: str
+    # (start, end) character offsets of matched terms within `text`
+    highlights: List[Tuple[int, int]] = []
+    role: Optional[str] = None
+    turn_number: Optional[int] = None
+
+class SearchResult(BaseModel):
+    type: str
+    id: str
+    title: str
+    score: float
+    timestamp: Optional[datetime] = None
+    snippets: List[SearchSnippet] = []
+
+class SearchResults(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    results: List[SearchResult] = []
+
+class UploadCreateRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: Optional[str] = None
+    length: Optional[int] = Field(None, gt=0)
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    filename: str
+    offset: int
+    length: Optional[int] = None
+
 class TranscriptionResponse(BaseModel):
     appointment_id: str
     transcript: str
     summary: str
-    structured_summary: Dict[str, Any]
\ No newline at end of file
+    structured_summary: StructuredSummary
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Normalises the structured_summary of already-processed appointments to the
+StructuredSummary schema and fills in the extracted `diagnoses` and
+`medications` arrays and the word tokens /appointments/search matches on.
+No model calls are made.
+
+    python scripts/backfill_summary_fields.py
+    python scripts/backfill_summary_fields.py --all --dry-run
+
+By default only appointments without the extracted arrays are touched; --all
+recomputes them everywhere, e.g. after changing the extraction rules in
+services/summary_service.py.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from config import settings
+from database import db
+from schemas import StructuredSummary
+from services.summary_service import summary_index_fields
+
+logger = logging.getLogger("backfill_summary_fields")
+
+def build_query(args) -> dict:
+    query = {"structured_summary": {"$type": "object"}}
+    if not args.all:
+        query["diagnosis_tokens"] = {"$exists": False}
+    return query
+
+def run(args):
+    query = build_query(args)
+    if args.dry_run:
+        print(f"{db.appointment_collection.count_documents(query)} appointments would be backfilled.")
+        return
+
+    stats = {"updated": 0, "failed": 0}
+    last_id = None
+    while True:
+        page_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        page = list(db.appointment_collection.find(page_query, {"structured_summary": 1}).sort("_id", 1).limit(args.page_size))
+        if not page:
+            break
+        operations = []
+        for appointment in page:
+            structured_summary = StructuredSummary.model_validate(appointment["structured_summary"]).model_dump()
+            operations.append(UpdateOne(
+                {"_id": appointment["_id"]},
+                {"$set": {"structured_summary": structured_summary, **summary_index_fields(structured_summary)}}
+            ))
+        written = db.bulk_write(db.appointment_collection, operations)
+        for index, error in written.failed:
+            logger.error(f"Failed to write appointment {page[index]['_id']}: {error}")
+        stats["updated"] += len(page) - len(written.failed)
+        stats["failed"] += len(written.failed)
+        last_id = page[-1]["_id"]
+        logger.info(f"Backfilled {stats['updated']} appointments ({stats['failed']} failed), up to {last_id}")
+
+    logger.info(f"Done: {stats['updated']} updated, {stats['failed']} failed.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Recompute appointments that already have the fields")
+    parser.add_argument("--page-size", type=int, default=500, help="Appointments per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching appointments")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db.connect(settings.MONGO_URI, settings.DB_NAME)
+    try:
+        run(args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Embeds the summaries and transcripts of already-processed appointments into
+the per-user retrieval index that grounds chat answers in past visits. New
+appointments are indexed when they are processed; run this once for the
+ones processed before retrieval existed, after changing
+RETRIEVAL_EMBEDDING_MODEL / RETRIEVAL_EMBEDDING_DIMENSIONS, or to replace
+indexes still stored in the old .npy + .json pairs.
+
+    python scripts/build_retrieval_index.py --concurrency 4
+    python scripts/build_retrieval_index.py --user-id 665f1c... --dry-run
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from database import db
+from services.gemini_service import retrieval_index
+
+logger = logging.getLogger("build_retrieval_index")
+
+def build_query(args) -> dict:
+    query = {"summary": {"$exists": True, "$nin": [None, ""]}}
+    if args.user_id:
+        query["user_id"] = args.user_id
+    return query
+
+async def index_one(appointment: dict, semaphore: asyncio.Semaphore) -> bool:
+    async with semaphore:
+        try:
+            await retrieval_index.index_appointment(
+                appointment["user_id"], str(appointment["_id"]), appointment["summary"], appointment.get("transcript"),
+                appointment_time=appointment["appointment_time"].isoformat(),
+                title=" - ".join(filter(None, [appointment.get("doctor_name"), appointment.get("specialization")]))
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to index appointment {appointment['_id']}: {e}")
+            return False
+
+async def run(args):
+    query = build_query(args)
+    if args.dry_run:
+        print(f"{db.appointment_collection.count_documents(query)} appointments would be indexed.")
+        return
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    projection = {"user_id": 1, "summary": 1, "transcript": 1, "appointment_time": 1, "doctor_name": 1, "specialization": 1}
+    stats = {"indexed": 0, "failed": 0}
+    last_id = None
+    while True:
+        page_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        page = await asyncio.to_thread(
+            lambda: list(db.appointment_collection.find(page_query, projection).sort("_id", 1).limit(args.page_size))
+        )
+        if not page:
+            break
+        results = await asyncio.gather(*(index_one(appointment, semaphore) for appointment in page))
+        stats["indexed"] += sum(results)
+        stats["failed"] += len(results) - sum(results)
+        last_id = page[-1]["_id"]
+        logger.info(f"Indexed {stats['indexed']} appointments ({stats['failed']} failed), up to {last_id}")
+
+    logger.info(f"Done: {stats['indexed']} indexed, {stats['failed']} failed.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4, help="Appointments embedded at once")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--user-id", help="Only this user's appointments")
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching appointments")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db.connect(settings.MONGO_URI, settings.DB_NAME)
+    try:
+        asyncio.run(run(args))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
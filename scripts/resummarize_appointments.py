@@ -0,0 +1,174 @@
+"""
+Regenerates the SOAP and structured summaries of already-processed
+appointments from their stored transcripts, e.g. after changing the prompts
+in services/gemini_service.py.
+
+    python scripts/resummarize_appointments.py --concurrency 4
+    python scripts/resummarize_appointments.py --processed-before 2025-01-01 --dry-run
+    python scripts/resummarize_appointments.py --resume   # continue after an interruption
+
+Appointments are read in _id order one page at a time and summarised with at
+most --concurrency Gemini calls in flight. Each page is written back with
+db.bulk_write, which retries transient failures, and only then is its last
+_id saved to the checkpoint file, so --resume never skips an appointment
+that was not written.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config import settings
+from database import db
+from neo4j_driver import close_neo4j_driver, link_appointment_conditions
+from services.summary_service import summarize_transcript, record_summary_usage, diagnosis_terms
+from services.gemini_service import retrieval_index
+
+logger = logging.getLogger("resummarize")
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return ObjectId(json.load(f)["last_id"])
+
+def save_checkpoint(path: str, last_id: ObjectId, stats: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"last_id": str(last_id), "updated_at": datetime.now().isoformat(), **stats}, f)
+    os.replace(tmp_path, path)
+
+def build_query(args) -> dict:
+    query = {"transcript": {"$exists": True, "$nin": [None, ""]}}
+    if args.user_id:
+        query["user_id"] = args.user_id
+    if args.processed_before:
+        query["processed_at"] = {"$lt": datetime.fromisoformat(args.processed_before)}
+    return query
+
+async def resummarize_one(appointment: dict, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        try:
+            return appointment, await summarize_transcript(appointment["transcript"])
+        except Exception as e:
+            logger.error(f"Failed to summarise appointment {appointment['_id']}: {e}")
+            return appointment, None
+
+async def relink_conditions(results, user_emails: dict):
+    for appointment, fields in results:
+        email = user_emails.get(appointment["user_id"])
+        if not email:
+            continue
+        try:
+            await link_appointment_conditions(
+                email, str(appointment["_id"]), diagnosis_terms(fields["structured_summary"]),
+                appointment.get("processed_at") or datetime.now()
+            )
+        except Exception as e:
+            logger.error(f"Failed to relink conditions for appointment {appointment['_id']}: {e}")
+
+async def reindex_for_retrieval(results):
+    for appointment, fields in results:
+        try:
+            await retrieval_index.index_appointment(
+                appointment["user_id"], str(appointment["_id"]), fields["summary"], appointment["transcript"],
+                appointment_time=appointment["appointment_time"].isoformat(),
+                title=" - ".join(filter(None, [appointment.get("doctor_name"), appointment.get("specialization")]))
+            )
+        except Exception as e:
+            logger.error(f"Failed to reindex appointment {appointment['_id']} for retrieval: {e}")
+
+def lookup_emails(user_ids) -> dict:
+    object_ids = [ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)]
+    users = db.user_collection.find({"_id": {"$in": object_ids}}, {"email": 1})
+    return {str(user["_id"]): user["email"] for user in users}
+
+async def run(args):
+    query = build_query(args)
+    last_id = load_checkpoint(args.checkpoint) if args.resume else None
+    if args.resume and last_id:
+        logger.info(f"Resuming after appointment {last_id}")
+
+    if args.dry_run:
+        if last_id:
+            query["_id"] = {"$gt": last_id}
+        print(f"{db.appointment_collection.count_documents(query)} appointments would be re-summarised.")
+        return
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    stats = {"updated": 0, "failed": 0}
+    while True:
+        page_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        page = await asyncio.to_thread(
+            lambda: list(db.appointment_collection.find(
+                page_query, {"transcript": 1, "user_id": 1, "processed_at": 1,
+                             "appointment_time": 1, "doctor_name": 1, "specialization": 1}
+            ).sort("_id", 1).limit(args.page_size))
+        )
+        if not page:
+            break
+
+        results = await asyncio.gather(*(resummarize_one(appointment, semaphore) for appointment in page))
+        succeeded = [(appointment, fields) for appointment, fields in results if fields is not None]
+        now = datetime.now()
+        operations = [
+            UpdateOne({"_id": appointment["_id"]}, {"$set": {**fields, "resummarized_at": now}})
+            for appointment, fields in succeeded
+        ]
+        written = await asyncio.to_thread(db.bulk_write, db.appointment_collection, operations)
+        for index, error in written.failed:
+            logger.error(f"Failed to write appointment {succeeded[index][0]['_id']}: {error}")
+        failed_writes = {index for index, _ in written.failed}
+        generated = len(succeeded)
+        succeeded = [result for index, result in enumerate(succeeded) if index not in failed_writes]
+        for appointment, fields in succeeded:
+            record_summary_usage(appointment["user_id"], fields, appointment_id=str(appointment["_id"]), source="resummarize")
+        if not args.skip_graph:
+            await relink_conditions(succeeded, lookup_emails({a["user_id"] for a, _ in succeeded}))
+        if not args.skip_retrieval:
+            await reindex_for_retrieval(succeeded)
+
+        stats["updated"] += len(succeeded)
+        stats["failed"] += len(page) - generated + len(failed_writes)
+        last_id = page[-1]["_id"]
+        save_checkpoint(args.checkpoint, last_id, stats)
+        logger.info(f"Re-summarised {stats['updated']} appointments ({stats['failed']} failed), up to {last_id}")
+
+    logger.info(f"Done: {stats['updated']} updated, {stats['failed']} failed.")
+
+async def run_and_close(args):
+    try:
+        await run(args)
+    finally:
+        await close_neo4j_driver()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4, help="Appointments summarised at once")
+    parser.add_argument("--page-size", type=int, default=50, help="Appointments per bulk write and checkpoint")
+    parser.add_argument("--user-id", help="Only this user's appointments")
+    parser.add_argument("--processed-before", help="Only appointments processed before this ISO date")
+    parser.add_argument("--checkpoint", default="resummarize.checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpointed appointment")
+    parser.add_argument("--skip-graph", action="store_true", help="Do not relink Neo4j conditions")
+    parser.add_argument("--skip-retrieval", action="store_true", help="Do not re-embed summaries for chat retrieval")
+    parser.add_argument("--dry-run", action="store_true", help="Only count matching appointments")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db.connect(settings.MONGO_URI, settings.DB_NAME)
+    try:
+        asyncio.run(run_and_close(args))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
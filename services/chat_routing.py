@@ -0,0 +1,83 @@
+# services/chat_routing.py
+
+import json
+import re
+from dataclasses import dataclass, replace
+from typing import Dict
+
+from config import settings
+
+# The SYSTEM_PROMPT distinguishes "Medical Intent Queries" from greetings,
+# filler and questions about the assistant. Only the former need grounded
+# search and deep thinking, so turns are classified locally before calling
+# Gemini and routed to a configuration that matches their intent.
+
+@dataclass(frozen=True)
+class ChatRoute:
+    name: str
+    model: str
+    thinking_budget: int
+    use_search: bool
+    # Most recent stored messages (user and assistant each count) sent as context
+    history_messages: int
+    # Passages from the user's past appointments to add to the prompt
+    past_visits: int = 0
+
+DEFAULT_ROUTES: Dict[str, ChatRoute] = {
+    "non_medical": ChatRoute("non_medical", "gemini-2.5-flash-lite", thinking_budget=0, use_search=False, history_messages=2),
+    "location": ChatRoute("location", "gemini-2.5-flash-lite", thinking_budget=0, use_search=False, history_messages=2),
+    "medical": ChatRoute("medical", "gemini-2.5-flash", thinking_budget=-1, use_search=True, history_messages=5, past_visits=4),
+}
+
+def load_routes(overrides: Dict[str, dict]) -> Dict[str, ChatRoute]:
+    """Applies per-route overrides, e.g. {"medical": {"thinking_budget": 2048}}, to the defaults."""
+    routes = dict(DEFAULT_ROUTES)
+    for name, fields in overrides.items():
+        if name not in routes:
+            raise ValueError(f"Unknown chat route '{name}' in CHAT_ROUTES.")
+        routes[name] = replace(routes[name], **fields)
+    return routes
+
+ROUTES = load_routes(json.loads(settings.CHAT_ROUTES))
+
+_GREETING = re.compile(
+    r"^(hi|hello|hey|hiya|yo|good (morning|afternoon|evening)|greetings|thanks?( you)?|thank you( so much)?|"
+    r"ok(ay)?|cool|great|bye|goodbye|see you|cheers)\b[\s!.,?]*(there|sage|sageai)?[\s!.,?]*$",
+    re.IGNORECASE
+)
+_ABOUT_ASSISTANT = re.compile(
+    r"\b(who|what) are you\b|\byour name\b|\bwhat can you do\b|\bhow do you work\b|\bare you (a |an )?(bot|ai|human)\b",
+    re.IGNORECASE
+)
+_LOCATION = re.compile(
+    r"\b(hospital|clinic|pharmacy|doctor|er|emergency room|urgent care)s?\b.*\b(near|nearby|closest|around)\b|"
+    r"\b(near|nearby|closest)\b.*\b(hospital|clinic|pharmacy|doctor|urgent care)s?\b",
+    re.IGNORECASE
+)
+# Any of these makes a turn medical, even if it also looks like a greeting.
+_MEDICAL_TERMS = re.compile(
+    r"\b(pain|ache|aches|hurt|hurts|sore|fever|cough|cold|flu|headache|migraine|nausea|vomit\w*|dizz\w*|rash|"
+    r"bleed\w*|swell\w*|symptom\w*|diagnos\w*|disease|condition|infection|allerg\w*|asthma|diabet\w*|"
+    r"cancer|blood|pressure|heart|chest|breath\w*|tired|fatigue|sleep|anxiety|depress\w*|pregnan\w*|"
+    r"medic\w*|drug|dose|dosage|pill|tablet|side effects?|treatment|therapy|surgery|vaccine|injury|"
+    r"sick|ill|illness|doctor|mg)\b",
+    re.IGNORECASE
+)
+
+def classify_prompt(prompt: str) -> str:
+    """
+    Returns "non_medical", "location" or "medical". Anything that is not
+    clearly a greeting, filler, a question about the assistant or a facility
+    search is treated as medical, so ambiguous follow-ups keep full grounding.
+    """
+    text = prompt.strip()
+    if _LOCATION.search(text):
+        return "location"
+    if _MEDICAL_TERMS.search(text):
+        return "medical"
+    if _GREETING.match(text) or _ABOUT_ASSISTANT.search(text):
+        return "non_medical"
+    return "medical"
+
+def route_for(prompt: str) -> ChatRoute:
+    return ROUTES[classify_prompt(prompt)]
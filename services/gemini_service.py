@@ -1,15 +1,22 @@
 # services/gemini_service.py
 
+import asyncio
 import logging
-import json
-from typing import List, Dict, Tuple
+import time
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional, Any
 # This is the correct import for the new SDK you are using.
 import google.genai as genai
 from google.genai import types
 
 
 from config import settings
-from schemas import ChatMessage, SourceCitation, UserInDB
+from metrics import track_dependency, CHAT_ROUTE_DECISIONS, STRUCTURED_SUMMARY_PARSES
+from services.usage_service import extract_usage
+from services.chat_routing import route_for, ChatRoute
+from services.json_repair import loads_tolerant, JSONRepairError
+from services.retrieval_service import RetrievalIndex
+from schemas import ChatMessage, SourceCitation, UserInDB, StructuredSummary
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +59,8 @@ When the user asks a medical question, do not just list facts. Your goal is to p
 try:
     # This line `genai.Client()` confirms you are using the NEW Google GenAI SDK.
     # The new functions will use this same `client` object.
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    http_options = types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None
+    client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
     logger.info("Google GenAI Client initialized successfully.")
 except Exception as e:
     logger.critical(f"CRITICAL: Failed to initialize Google GenAI Client. Error: {e}")
@@ -62,32 +70,57 @@ class MedicalChatService:
     def __init__(self):
         if not client:
             raise RuntimeError("Google GenAI Client is not available.")
-        # Using the model you specified
-        self.model = 'gemini-2.5-flash'
+        # The model, thinking budget and search tool are chosen per turn by
+        # services.chat_routing; see ROUTES there for the defaults.
 
-    async def get_ai_response(self, prompt: str, history: List[ChatMessage], user_profile: UserInDB) -> Tuple[str, List[SourceCitation]]:
+    async def get_ai_response(
+        self, prompt: str, history: List[ChatMessage], user_profile: UserInDB
+    ) -> Tuple[str, List[SourceCitation], Optional[Dict[str, Any]]]:
         try:
-            contextual_history = history[-5:]
-            contents = [{'role': 'model' if msg.role == 'assistant' else 'user', 'parts': [{'text': msg.content}]} for msg in contextual_history]
-            contents.append({'role': 'user', 'parts': [{'text': prompt}]})
-
-            system_instruction = get_system_prompt(user_profile)
+            route = route_for(prompt)
+            CHAT_ROUTE_DECISIONS.labels(route.name).inc()
 
-            config = types.GenerateContentConfig(
-                temperature=0.2,
-                top_p=0.7,
-                top_k=30,
-                thinking_config=types.ThinkingConfig(thinking_budget=-1),
-                tools=[types.Tool(google_search=types.GoogleSearch())],
-                system_instruction=system_instruction
-            )
+            contextual_history = history[-route.history_messages:] if route.history_messages else []
+            contents = [{'role': 'model' if msg.role == 'assistant' else 'user', 'parts': [{'text': msg.content}]} for msg in contextual_history]
+            prompt_parts = [{'text': prompt}]
+            past_visits = await _past_visits_context(user_profile, prompt, route)
+            if past_visits:
+                # Only this turn carries the retrieved notes; stored history keeps the bare prompt.
+                prompt_parts.insert(0, {'text': past_visits})
+            contents.append({'role': 'user', 'parts': prompt_parts})
+
+            profile_context, system_instruction = system_prompt_cache.get(user_profile)
+            cached_content = await context_cache.get(route)
+
+            if cached_content:
+                # SYSTEM_PROMPT and the tools live in the cached content, which
+                # cannot be combined with an inline system_instruction, so the
+                # user's profile travels as the first turn instead.
+                contents.insert(0, {'role': 'user', 'parts': [{'text': profile_context}]})
+                config = types.GenerateContentConfig(
+                    temperature=0.2,
+                    top_p=0.7,
+                    top_k=30,
+                    thinking_config=types.ThinkingConfig(thinking_budget=route.thinking_budget),
+                    cached_content=cached_content
+                )
+            else:
+                config = types.GenerateContentConfig(
+                    temperature=0.2,
+                    top_p=0.7,
+                    top_k=30,
+                    thinking_config=types.ThinkingConfig(thinking_budget=route.thinking_budget),
+                    tools=_route_tools(route),
+                    system_instruction=system_instruction
+                )
 
             # This is the NEW SDK's async method, which is correct.
-            response = await client.aio.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=config
-            )
+            with track_dependency("gemini", f"chat_{route.name}"):
+                response = await client.aio.models.generate_content(
+                    model=route.model,
+                    contents=contents,
+                    config=config
+                )
 
             logger.info("Successfully received response from Gemini API.")
 
@@ -102,13 +135,16 @@ class MedicalChatService:
                             index=i + 1
                         ))
 
-            return response.text, citations
+            usage = extract_usage(response, route.model)
+            if usage:
+                usage["route"] = route.name
+            return response.text, citations, usage
 
         except Exception as e:
             logger.error(f"Error during Gemini content generation: {e}", exc_info=True)
-            return "I'm sorry, I encountered a technical issue. Please try again shortly.", []
+            return "I'm sorry, I encountered a technical issue. Please try again shortly.", [], None
 
-def get_system_prompt(user_profile: UserInDB) -> str:
+def get_profile_context(user_profile: UserInDB) -> str:
     profile_section = "The user has not provided any specific health information."
     if user_profile:
         profile_parts = []
@@ -123,16 +159,150 @@ def get_system_prompt(user_profile: UserInDB) -> str:
         if profile_parts:
             profile_section = "You MUST consider the following user health profile in your response:\n" + "\n".join(profile_parts)
 
-    return f"{SYSTEM_PROMPT}\n---\n**User's Personal Health Context:**\n{profile_section}\n---"
+    return f"**User's Personal Health Context:**\n{profile_section}\n---"
+
+def compose_system_prompt(profile_context: str) -> str:
+    return f"{SYSTEM_PROMPT}\n---\n{profile_context}"
+
+def get_system_prompt(user_profile: UserInDB) -> str:
+    return compose_system_prompt(get_profile_context(user_profile))
 
 # --- END OF UNCHANGED SECTION ---
 
+async def _past_visits_context(user_profile: UserInDB, prompt: str, route: ChatRoute) -> Optional[str]:
+    if not route.past_visits or not user_profile:
+        return None
+    try:
+        return await retrieval_index.context_for(
+            str(user_profile.id), prompt, k=route.past_visits,
+            min_score=settings.RETRIEVAL_MIN_SCORE, token_budget=settings.RETRIEVAL_TOKEN_BUDGET
+        )
+    except Exception as e:
+        # Answering without the notes beats not answering.
+        logger.error(f"Past-visit retrieval failed for user {user_profile.id}: {e}")
+        return None
+
+def _route_tools(route: ChatRoute):
+    return [types.Tool(google_search=types.GoogleSearch())] if route.use_search else None
 
-async def generate_soap_summary(transcript: str) -> str:
-    # ... (This function is correct and unchanged)
+class SystemPromptCache:
+    """
+    Composed instructions per user, keyed on the profile_version that
+    update_user_profile increments. A profile edit changes the key, so stale
+    entries are never read and simply age out of the LRU.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+
+    def get(self, user_profile: Optional[UserInDB]) -> Tuple[str, str]:
+        """Returns (profile context, full system instruction) for the user."""
+        if user_profile is None:
+            profile_context = get_profile_context(None)
+            return profile_context, compose_system_prompt(profile_context)
+        key = (str(user_profile.id), user_profile.profile_version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        profile_context = get_profile_context(user_profile)
+        entry = (profile_context, compose_system_prompt(profile_context))
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+class ContextCacheManager:
+    """
+    Keeps one Gemini cached content per (model, tools) holding the static
+    SYSTEM_PROMPT, so its tokens are processed once and billed at the cached
+    rate on every turn. Caches are renewed shortly before they expire. If the
+    provider refuses (e.g. the prompt is under the model's caching minimum),
+    that route falls back to the inline system instruction and creation is
+    retried after GEMINI_CONTEXT_CACHE_RETRY seconds.
+    """
+    def __init__(self, enabled: bool, ttl: int, retry_after: float):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._caches: Dict[Tuple[str, bool], Tuple[str, float]] = {}
+        self._disabled_until: Dict[Tuple[str, bool], float] = {}
+        self._locks: Dict[Tuple[str, bool], asyncio.Lock] = {}
+
+    async def get(self, route: ChatRoute) -> Optional[str]:
+        if not self.enabled or client is None:
+            return None
+        key = (route.model, route.use_search)
+        now = time.monotonic()
+        cached = self._caches.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        if self._disabled_until.get(key, 0) > now:
+            return None
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            cached = self._caches.get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            try:
+                with track_dependency("gemini", "cache_create"):
+                    cache = await client.aio.caches.create(
+                        model=route.model,
+                        config=types.CreateCachedContentConfig(
+                            display_name=f"sageai-system-{route.model}{'-search' if route.use_search else ''}",
+                            system_instruction=SYSTEM_PROMPT,
+                            tools=_route_tools(route),
+                            ttl=f"{self.ttl}s"
+                        )
+                    )
+            except Exception as e:
+                logger.warning(f"Gemini context caching unavailable for {route.model}, using inline prompt: {e}")
+                self._disabled_until[key] = time.monotonic() + self.retry_after
+                return None
+            # Renew a minute early so a request never references an expired cache.
+            self._caches[key] = (cache.name, time.monotonic() + max(self.ttl - 60, self.ttl / 2))
+            return cache.name
+
+async def embed_texts(texts: List[str], task_type: str) -> List[List[float]]:
+    """Embeds texts with the retrieval embedding model, at most 100 per request."""
+    if not client:
+        raise RuntimeError("GenAI Client is not available.")
+    vectors = []
+    for start in range(0, len(texts), 100):
+        with track_dependency("gemini", "embed"):
+            response = await client.aio.models.embed_content(
+                model=settings.RETRIEVAL_EMBEDDING_MODEL,
+                contents=texts[start:start + 100],
+                config=types.EmbedContentConfig(
+                    task_type=task_type,
+                    output_dimensionality=settings.RETRIEVAL_EMBEDDING_DIMENSIONS
+                )
+            )
+        vectors.extend(embedding.values for embedding in response.embeddings)
+    return vectors
+
+system_prompt_cache = SystemPromptCache(maxsize=settings.SYSTEM_PROMPT_CACHE_SIZE)
+context_cache = ContextCacheManager(
+    enabled=settings.GEMINI_CONTEXT_CACHING,
+    ttl=settings.GEMINI_CONTEXT_CACHE_TTL,
+    retry_after=settings.GEMINI_CONTEXT_CACHE_RETRY
+)
+retrieval_index = RetrievalIndex(
+    settings.RETRIEVAL_INDEX_DIR,
+    embed=embed_texts,
+    dimensions=settings.RETRIEVAL_EMBEDDING_DIMENSIONS,
+    chunk_chars=settings.RETRIEVAL_CHUNK_CHARS,
+    max_cached_users=settings.RETRIEVAL_CACHE_USERS
+)
+
+
+class SummaryGenerationError(Exception):
+    """A summary could not be generated. Callers must not store a placeholder in its place."""
+
+async def generate_soap_summary(transcript: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Returns the SOAP note and the call's token usage. Raises SummaryGenerationError on failure."""
     if not client:
         logger.error("Cannot generate SOAP summary, GenAI Client is not available.")
-        return "Error: AI service is not configured."
+        raise SummaryGenerationError("AI service is not configured.")
     soap_prompt = """
     You are a highly skilled medical assistant. Your task is to create a concise and accurate SOAP note from the provided doctor-patient conversation transcript.
     Follow these guidelines strictly:
@@ -150,24 +320,29 @@ async def generate_soap_summary(transcript: str) -> str:
                 thinking_config=types.ThinkingConfig(thinking_budget=-1),
                 system_instruction="You are a medical documentation specialist focused on accuracy and clarity."
             )
-        response = await client.aio.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=[soap_prompt, f"Here is the transcript:\n\n{transcript}"],
-            config=config
-        )
-        return response.text
+        with track_dependency("gemini", "soap_summary"):
+            response = await client.aio.models.generate_content(
+                model='gemini-2.5-flash',
+                contents=[soap_prompt, f"Here is the transcript:\n\n{transcript}"],
+                config=config
+            )
     except Exception as e:
         logger.error(f"Error during SOAP summary generation: {e}", exc_info=True)
-        return "I'm sorry, I encountered an error while generating the summary."
+        raise SummaryGenerationError(f"SOAP summary generation failed: {e}") from e
+    if not response.text:
+        raise SummaryGenerationError("SOAP summary generation returned no text.")
+    return response.text, extract_usage(response, 'gemini-2.5-flash')
 
 
-async def generate_structured_summary(transcript: str) -> dict:
+async def generate_structured_summary(transcript: str) -> Tuple[dict, Optional[Dict[str, Any]]]:
     """
     Generates a structured clinical summary in JSON format from a transcript.
+    Returns the summary and the call's token usage. Raises
+    SummaryGenerationError if the call fails or its output is unrecoverable.
     """
     if not client:
         logger.error("Cannot generate structured summary, GenAI Client is not available.")
-        return {"error": "AI service is not configured."}
+        raise SummaryGenerationError("AI service is not configured.")
 
     structured_prompt = """You are a medical documentation specialist. Please analyze the provided doctor-patient conversation and create a structured clinical summary.
     Guidelines:
@@ -190,6 +365,7 @@ async def generate_structured_summary(transcript: str) -> dict:
     # The safety_settings have been completely removed as requested.
     generation_config = types.GenerateContentConfig(
         response_mime_type="application/json",
+        response_schema=StructuredSummary,
         temperature=0.2,
         top_p=0.7,
         top_k=30,
@@ -197,19 +373,40 @@ async def generate_structured_summary(transcript: str) -> dict:
     )
 
     try:
-        response = await client.aio.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=[structured_prompt, f"Given Context:\n{transcript}"],
-            config=generation_config
-        )
-        return json.loads(response.text)
+        with track_dependency("gemini", "structured_summary"):
+            response = await client.aio.models.generate_content(
+                model='gemini-2.5-flash',
+                contents=[structured_prompt, f"Given Context:\n{transcript}"],
+                config=generation_config
+            )
     except Exception as e:
         logger.error(f"Error during structured summary generation: {e}", exc_info=True)
-        return {
-            "Chief_Complaint": "None", "Symptoms": "None", "Physical_Examination": "None", "Diagnosis": "None", "Medications": "None",
-            "Treatment_Plan": "None", "Lifestyle_Modifications": { "Diet": {"Recommended": "None", "Restricted": "None"}, "Exercise": "None", "Other_Recommendations": "None" },
-            "Follow_up": {"Timing": "None", "Special_Instructions": "None"}, "Additional_Notes": f"Error processing transcript: {str(e)}"
-        }
+        raise SummaryGenerationError(f"Structured summary generation failed: {e}") from e
+    return parse_structured_summary(response.text), extract_usage(response, 'gemini-2.5-flash')
+
+def parse_structured_summary(text: Optional[str]) -> dict:
+    """
+    Turns the model's JSON output into a StructuredSummary dict without another
+    model call: malformed JSON (fences, trailing commas, truncation, ...) is
+    repaired and fields are coerced to the schema. Raises
+    SummaryGenerationError for output that cannot be recovered.
+    """
+    try:
+        raw, repairs = loads_tolerant(text)
+    except JSONRepairError as e:
+        STRUCTURED_SUMMARY_PARSES.labels(outcome="failed").inc()
+        logger.error(f"Structured summary output could not be parsed: {e}. Output: {(text or '').strip()[:4000]}")
+        raise SummaryGenerationError(f"Structured summary output could not be parsed: {e}") from e
+
+    summary = StructuredSummary.model_validate(raw).model_dump()
+    repairs.extend(StructuredSummary.schema_repairs(raw))
+    if repairs:
+        STRUCTURED_SUMMARY_PARSES.labels(outcome="repaired").inc()
+        logger.warning(f"Repaired structured summary output: {', '.join(repairs)}")
+    else:
+        STRUCTURED_SUMMARY_PARSES.labels(outcome="valid").inc()
+    return summary
+
 
 # This instantiation remains for your original, unchanged chat functionality
 medical_chat_service = MedicalChatService()
\ No newline at end of file
@@ -0,0 +1,146 @@
+# services/json_repair.py
+
+import ast
+import json
+import re
+from typing import Any, List, Tuple
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.S | re.I)
+
+class JSONRepairError(ValueError):
+    """The text could not be turned into a JSON object."""
+
+def _close_structures(text: str) -> Tuple[str, bool]:
+    """
+    Rewrites JSON-ish text in one string-aware pass: drops // and /* */
+    comments, trailing commas and anything after the top-level value, and
+    closes strings, objects and arrays left open by truncated output. Returns
+    the rewritten text and whether it had to be closed.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    # (length of out, open structures) just before each comma outside a string:
+    # everything up to there is a complete member, so truncation can cut back to it.
+    checkpoints: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = len(text) if newline == -1 else newline
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+            continue
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _strip_dangling(out)
+            if stack and stack[-1] == ch:
+                stack.pop()
+                out.append(ch)
+            if not stack:
+                break
+        elif ch == ",":
+            checkpoints.append((len(out), tuple(stack)))
+            out.append(ch)
+        else:
+            out.append(ch)
+        i += 1
+
+    if not in_string and not stack:
+        return "".join(out), False
+
+    if in_string:
+        out.append('"')
+    closed = _finish(list(out), stack)
+    try:
+        json.loads(closed, strict=False)
+        return closed, True
+    except json.JSONDecodeError:
+        pass
+    if checkpoints:
+        # Closing in place left a half-written member (e.g. a key without a
+        # value); drop back to the last complete one instead.
+        length, open_structures = checkpoints[-1]
+        return _finish(out[:length], list(open_structures)), True
+    return closed, True
+
+def _strip_dangling(out: List[str]):
+    while out and (out[-1].isspace() or out[-1] == ","):
+        out.pop()
+
+def _finish(out: List[str], stack: List[str]) -> str:
+    _strip_dangling(out)
+    if out and out[-1] == ":":
+        out.append("null")
+    return "".join(out) + "".join(reversed(stack))
+
+def loads_tolerant(text: str) -> Tuple[Any, List[str]]:
+    """
+    Parses model output that was meant to be a JSON object. Returns the value
+    and the names of the repairs that were needed (empty for valid JSON).
+    Raises JSONRepairError when nothing usable can be recovered.
+    """
+    if not text or not text.strip():
+        raise JSONRepairError("Output is empty.")
+    try:
+        return json.loads(text), []
+    except json.JSONDecodeError:
+        pass
+
+    repairs = []
+    candidate = text.strip()
+    fenced = _FENCE_RE.search(candidate)
+    if fenced and "{" in fenced.group(1):
+        candidate = fenced.group(1)
+        repairs.append("code_fence")
+    start = candidate.find("{")
+    if start == -1:
+        raise JSONRepairError("Output contains no JSON object.")
+    if candidate[:start].strip():
+        repairs.append("leading_text")
+    candidate = candidate[start:]
+
+    try:
+        value, end = json.JSONDecoder(strict=False).raw_decode(candidate)
+        if candidate[end:].strip():
+            repairs.append("trailing_text")
+        elif not repairs:
+            # Same text failed json.loads, so only raw newlines/tabs in strings were wrong.
+            repairs.append("control_characters")
+        return value, repairs
+    except json.JSONDecodeError:
+        pass
+
+    rewritten, truncated = _close_structures(candidate)
+    try:
+        value = json.loads(rewritten, strict=False)
+        repairs.append("truncated" if truncated else "syntax")
+        return value, repairs
+    except json.JSONDecodeError:
+        pass
+
+    # Last resort: Python-style literals (single quotes, None, True).
+    try:
+        value = ast.literal_eval(rewritten)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise JSONRepairError("Output is not recoverable JSON.")
+    if not isinstance(value, dict):
+        raise JSONRepairError("Output is not a JSON object.")
+    repairs.append("python_literal")
+    return value, repairs
@@ -0,0 +1,198 @@
+# services/retrieval_service.py
+
+import asyncio
+import fcntl
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# embed(texts, task_type) -> one vector per text
+EmbedFn = Callable[[List[str], str], Awaitable[List[List[float]]]]
+
+_USER_ID_RE = re.compile(r"^[0-9a-f]{24}$")
+
+def chunk_appointment(summary: Optional[str], transcript: Optional[str], chunk_chars: int) -> List[Tuple[str, str]]:
+    """
+    Splits an appointment into (kind, text) passages of at most about
+    `chunk_chars`: the SOAP summary by paragraph, the transcript by whole
+    utterances, each transcript window repeating the previous window's last
+    utterance so an exchange is never cut from its reply.
+    """
+    chunks = []
+    for kind, units, joiner in (
+        ("summary", re.split(r"\n\s*\n", summary or ""), "\n\n"),
+        ("transcript", (transcript or "").splitlines(), "\n"),
+    ):
+        units = [u.strip() for u in units if u.strip()]
+        window: List[str] = []
+        for unit in units:
+            if window and len(joiner.join(window + [unit])) > chunk_chars:
+                chunks.append((kind, joiner.join(window)))
+                window = window[-1:] if kind == "transcript" else []
+            window.append(unit[:chunk_chars])
+        if window:
+            chunks.append((kind, joiner.join(window)))
+    return chunks
+
+class _UserIndex:
+    """
+    One user's passages: L2-normalised float32 vectors, one row per entry in
+    `meta`. `version` identifies the file it was read from (None if the user
+    has no file yet).
+    """
+    def __init__(self, vectors: np.ndarray, meta: List[Dict[str, Any]], version: Optional[tuple] = None):
+        self.vectors = vectors
+        self.meta = meta
+        self.version = version
+
+class RetrievalIndex:
+    """
+    Brute-force embedding index over each user's appointment summaries and
+    transcripts. Per-user matrices are small (tens to hundreds of passages),
+    so a NumPy dot product beats any ANN structure. Each user's index is one
+    <root>/<user_id>.npz holding the vectors and the passage metadata, so a
+    reader never sees one without the other. Several API workers share the
+    directory: updates are serialised with an flock on <user_id>.lock, and
+    a cached index is reloaded whenever its file has been replaced since.
+    """
+    def __init__(self, root: str, embed: EmbedFn, dimensions: int, chunk_chars: int, max_cached_users: int):
+        self.root = root
+        self.embed = embed
+        self.dimensions = dimensions
+        self.chunk_chars = chunk_chars
+        self.max_cached_users = max_cached_users
+        self._cache: "OrderedDict[str, _UserIndex]" = OrderedDict()
+
+    def _path(self, user_id: str, suffix: str) -> str:
+        if not _USER_ID_RE.match(user_id):
+            raise ValueError(f"Invalid user id '{user_id}'.")
+        return os.path.join(self.root, f"{user_id}{suffix}")
+
+    @staticmethod
+    def _file_version(stat: os.stat_result) -> tuple:
+        # Every write replaces the file, so the inode changes even when two
+        # writes land within the filesystem's timestamp granularity.
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _version(self, user_id: str) -> Optional[tuple]:
+        try:
+            return self._file_version(os.stat(self._path(user_id, ".npz")))
+        except FileNotFoundError:
+            return None
+
+    def _read(self, user_id: str) -> _UserIndex:
+        empty = np.zeros((0, self.dimensions), dtype=np.float32)
+        try:
+            f = open(self._path(user_id, ".npz"), "rb")
+        except FileNotFoundError:
+            return _UserIndex(empty, [])
+        with f:
+            version = self._file_version(os.fstat(f.fileno()))
+            with np.load(f) as data:
+                vectors, meta = data["vectors"], json.loads(str(data["meta"]))
+        if vectors.shape != (len(meta), self.dimensions):
+            # Written with another embedding size; rebuilt as appointments are reprocessed.
+            return _UserIndex(empty, [], version)
+        return _UserIndex(vectors, meta, version)
+
+    def _write(self, user_id: str, index: _UserIndex):
+        path = self._path(user_id, ".npz")
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, vectors=index.vectors, meta=np.array(json.dumps(index.meta)))
+        os.replace(f"{path}.tmp", path)
+        index.version = self._version(user_id)
+
+    def _cache_put(self, user_id: str, index: _UserIndex):
+        self._cache[user_id] = index
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_cached_users:
+            self._cache.popitem(last=False)
+
+    async def _load(self, user_id: str) -> _UserIndex:
+        index = self._cache.get(user_id)
+        if index is None or index.version != self._version(user_id):
+            # Not cached, or another worker has written a newer version.
+            index = await asyncio.to_thread(self._read, user_id)
+        self._cache_put(user_id, index)
+        return index
+
+    async def _embed(self, texts: List[str], task_type: str) -> np.ndarray:
+        vectors = np.asarray(await self.embed(texts, task_type), dtype=np.float32).reshape(len(texts), self.dimensions)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _replace_locked(self, user_id: str, appointment_id: str, vectors: np.ndarray, meta: List[Dict[str, Any]]) -> _UserIndex:
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(user_id, ".lock"), "a") as lock_file:
+            # Held across the read-modify-write so concurrent updates from any
+            # worker (or thread) never drop each other's passages.
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            index = self._read(user_id)
+            keep = [i for i, m in enumerate(index.meta) if m["appointment_id"] != appointment_id]
+            updated = _UserIndex(
+                np.vstack([index.vectors[keep], vectors]) if len(vectors) else index.vectors[keep],
+                [index.meta[i] for i in keep] + meta
+            )
+            self._write(user_id, updated)
+        return updated
+
+    async def _replace(self, user_id: str, appointment_id: str, vectors: np.ndarray, meta: List[Dict[str, Any]]):
+        updated = await asyncio.to_thread(self._replace_locked, user_id, appointment_id, vectors, meta)
+        self._cache_put(user_id, updated)
+
+    async def index_appointment(
+        self,
+        user_id: str,
+        appointment_id: str,
+        summary: Optional[str],
+        transcript: Optional[str],
+        appointment_time: Optional[str] = None,
+        title: Optional[str] = None
+    ):
+        """(Re)indexes one appointment, replacing any passages it had before."""
+        chunks = chunk_appointment(summary, transcript, self.chunk_chars)
+        vectors = await self._embed([text for _, text in chunks], "RETRIEVAL_DOCUMENT") if chunks else np.zeros((0, self.dimensions), dtype=np.float32)
+        meta = [
+            {"appointment_id": appointment_id, "kind": kind, "text": text, "appointment_time": appointment_time, "title": title}
+            for kind, text in chunks
+        ]
+        await self._replace(user_id, appointment_id, vectors, meta)
+
+    async def remove_appointment(self, user_id: str, appointment_id: str):
+        await self._replace(user_id, appointment_id, np.zeros((0, self.dimensions), dtype=np.float32), [])
+
+    async def search(self, user_id: str, query: str, k: int, min_score: float) -> List[Tuple[float, Dict[str, Any]]]:
+        """The user's k passages most similar to `query` (cosine, at least `min_score`), best first."""
+        index = await self._load(user_id)
+        if not index.meta or k <= 0:
+            # Users without processed visits cost no embedding call.
+            return []
+        scores = index.vectors @ (await self._embed([query], "RETRIEVAL_QUERY"))[0]
+        top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), index.meta[i]) for i in top if scores[i] >= min_score]
+
+    async def context_for(self, user_id: str, query: str, k: int, min_score: float, token_budget: int) -> Optional[str]:
+        """
+        Formats the best matching passages as a prompt block, adding them in
+        score order until the estimated token count (about 4 characters per
+        token) would exceed `token_budget`. Returns None if nothing is relevant.
+        """
+        lines, used = [], 0
+        for score, passage in await self.search(user_id, query, k, min_score):
+            header = " - ".join(filter(None, [(passage.get("appointment_time") or "")[:10], passage.get("title"), passage["kind"]]))
+            entry = f"[{header}]\n{passage['text']}"
+            cost = len(entry) // 4 + 1
+            if used + cost > token_budget:
+                continue
+            lines.append(entry)
+            used += cost
+        if not lines:
+            return None
+        return (
+            "**Relevant notes from the user's own past appointments** (use them only if they bear on the question):\n"
+            + "\n\n".join(lines) + "\n---"
+        )
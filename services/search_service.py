@@ -0,0 +1,132 @@
+# services/search_service.py
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+from database import db
+
+SEARCH_TYPES = ("chats", "appointments")
+SNIPPET_CHARS = 180
+MAX_SNIPPETS = 3
+
+def highlight_pattern(query: str) -> Optional[Pattern]:
+    """
+    Builds a regex for the words a $text query matched. Mongo stems English
+    words, so each term matches any word sharing its stem-ish prefix
+    ("headaches" highlights "headache"). Negated terms are skipped.
+    """
+    phrases = [phrase for negated, phrase in re.findall(r'(-?)"([^"]+)"', query) if not negated]
+    words = [word for word in re.sub(r'-?"[^"]*"', " ", query).split() if not word.startswith("-")]
+    stems = set()
+    for term in words + [word for phrase in phrases for word in phrase.split()]:
+        term = re.sub(r"\W", "", term.lower())
+        if len(term) >= 2:
+            stems.add(term if len(term) <= 4 else term[:max(4, len(term) - 3)])
+    if not stems:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(s) for s in sorted(stems, key=len, reverse=True)) + r")\w*", re.I)
+
+def make_snippet(text: str, pattern: Optional[Pattern], field: str, **extra) -> Optional[Dict[str, Any]]:
+    """
+    Cuts a window of about SNIPPET_CHARS around the first match in `text` and
+    returns it with the character offsets of every match inside the window.
+    Returns None when nothing in `text` matches.
+    """
+    matches = list(pattern.finditer(text)) if pattern and text else []
+    if not matches:
+        return None
+    start = max(0, matches[0].start() - SNIPPET_CHARS // 3)
+    if start:
+        space = text.find(" ", start, matches[0].start())
+        start = space + 1 if space != -1 else start
+    end = min(len(text), start + SNIPPET_CHARS)
+    if end < len(text):
+        space = text.rfind(" ", matches[0].end(), end)
+        end = space if space != -1 else end
+    prefix = "…" if start else ""
+    offset = len(prefix) - start
+    return {
+        "field": field,
+        "text": prefix + text[start:end] + ("…" if end < len(text) else ""),
+        "highlights": [(m.start() + offset, m.end() + offset) for m in matches if m.start() >= start and m.end() <= end],
+        **extra
+    }
+
+def _best_snippets(candidates: Iterable[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    snippets = [s for s in candidates if s]
+    snippets.sort(key=lambda s: len(s["highlights"]), reverse=True)
+    return snippets[:MAX_SNIPPETS]
+
+def _text_query(user_id: str, query: str) -> dict:
+    # user_id is the equality prefix of both text indexes, so it is required here.
+    return {"user_id": user_id, "$text": {"$search": query}}
+
+def _search_chats(user_id: str, query: str, pattern: Optional[Pattern], limit: int) -> List[Dict[str, Any]]:
+    cursor = db.chat_collection.find(
+        _text_query(user_id, query),
+        {"score": {"$meta": "textScore"}, "chat_name": 1, "created_at": 1, "updated_at": 1, "history": 1}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+    results = []
+    for chat in cursor:
+        history = chat.get("history", [])
+        results.append({
+            "type": "chat",
+            "id": str(chat["_id"]),
+            "title": chat.get("chat_name") or (history[0]["content"][:50] if history else "Chat"),
+            "score": chat["score"],
+            "timestamp": chat.get("updated_at") or chat.get("created_at"),
+            "snippets": _best_snippets(
+                make_snippet(msg.get("content", ""), pattern, "content", role=msg.get("role"), turn_number=msg.get("turn_number"))
+                for msg in history
+            )
+        })
+    return results
+
+def _search_appointments(user_id: str, query: str, pattern: Optional[Pattern], limit: int) -> List[Dict[str, Any]]:
+    cursor = db.appointment_collection.find(
+        _text_query(user_id, query),
+        {"score": {"$meta": "textScore"}, "doctor_name": 1, "specialization": 1, "reason": 1,
+         "appointment_time": 1, "summary": 1, "transcript": 1}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+    results = []
+    for appt in cursor:
+        title = " - ".join(filter(None, [appt.get("doctor_name"), appt.get("specialization")])) or appt.get("reason") or "Appointment"
+        # Transcripts are one utterance per line; snippet each matching utterance separately.
+        utterances = (appt.get("transcript") or "").splitlines()
+        results.append({
+            "type": "appointment",
+            "id": str(appt["_id"]),
+            "title": title,
+            "score": appt["score"],
+            "timestamp": appt.get("appointment_time"),
+            "snippets": _best_snippets(
+                [make_snippet(appt.get("summary") or "", pattern, "summary")]
+                + [make_snippet(line, pattern, "transcript") for line in utterances]
+            )
+        })
+    return results
+
+SEARCHERS = {"chats": (_search_chats, "chat_collection"), "appointments": (_search_appointments, "appointment_collection")}
+
+def search_history(user_id: str, query: str, types: Iterable[str], page: int, page_size: int) -> Dict[str, Any]:
+    """
+    Full-text search over the user's chat messages and appointment transcripts
+    and summaries. Each collection is ranked by Mongo's textScore; the top
+    page * page_size hits of each are merged by score and the requested page
+    is sliced out, with highlighted snippets for every result.
+    """
+    pattern = highlight_pattern(query)
+    fetch = page * page_size
+    hits, total = [], 0
+    for search_type in types:
+        searcher, collection_name = SEARCHERS[search_type]
+        hits.extend(searcher(user_id, query, pattern, fetch))
+        total += getattr(db, collection_name).count_documents(_text_query(user_id, query))
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return {
+        "query": query,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": hits[(page - 1) * page_size:fetch]
+    }
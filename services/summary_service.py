@@ -0,0 +1,117 @@
+# services/summary_service.py
+
+import asyncio
+import re
+from typing import Any, Dict, List
+
+from services.gemini_service import generate_soap_summary, generate_structured_summary
+from services.usage_service import record_usage
+
+async def summarize_transcript(transcript: str) -> Dict[str, Any]:
+    """
+    Runs the SOAP and structured summaries concurrently and returns the
+    appointment fields they produce: summary, structured_summary, the
+    extracted diagnoses/medications and summary_usage. Raises
+    SummaryGenerationError if either summary failed, so nothing partial or
+    placeholder is ever stored.
+    """
+    (summary, soap_usage), (structured_summary, structured_usage) = await asyncio.gather(
+        generate_soap_summary(transcript),
+        generate_structured_summary(transcript)
+    )
+    return {
+        "summary": summary,
+        "structured_summary": structured_summary,
+        **summary_index_fields(structured_summary),
+        "summary_usage": {
+            kind: usage for kind, usage in (("soap", soap_usage), ("structured", structured_usage)) if usage
+        }
+    }
+
+def record_summary_usage(user_id: str, summary_fields: Dict[str, Any], **refs):
+    usage = summary_fields["summary_usage"]
+    record_usage(user_id, "soap_summary", usage.get("soap"), **refs)
+    record_usage(user_id, "structured_summary", usage.get("structured"), **refs)
+
+def _split_terms(text: Any, separators: str = r"[,;\n]") -> List[str]:
+    """Splits a free-text summary field into lowercased entries, dropping "None"/"Unclear"."""
+    if not isinstance(text, str):
+        return []
+    terms = []
+    for part in re.split(separators, text):
+        term = part.strip().strip(".").strip()
+        if term and term.lower() not in ("none", "unclear", "n/a"):
+            terms.append(term.lower())
+    return list(dict.fromkeys(terms))
+
+def diagnosis_terms(structured_summary: dict) -> List[str]:
+    """Splits the free-text Diagnosis field into individual condition names."""
+    return _split_terms((structured_summary or {}).get("Diagnosis"))
+
+# Words that introduce or describe a medication entry but never name a drug.
+_MEDICATION_LEAD_INS = {
+    "started", "start", "starting", "on", "continue", "continued", "continuing", "take", "taking", "takes",
+    "prescribed", "prescribe", "prescription", "current", "currently", "resume", "resumed", "stop", "stopped",
+    "discontinue", "discontinued", "increase", "increased", "decrease", "decreased", "switch", "switched",
+    "to", "the", "a", "an", "of", "with", "his", "her", "their", "patient", "recommended", "advised", "use", "using"
+}
+_NON_DRUG_WORDS = {"medication", "medications", "medicine", "medicines", "drug", "drugs", "meds", "regimen", "therapy", "treatment"}
+# Dose, route and frequency words: an entry's drug name ends where these begin.
+_DOSE_WORDS = {
+    "mg", "mcg", "g", "ml", "units", "iu", "tablet", "tablets", "tab", "tabs", "capsule", "capsules", "pill", "pills",
+    "daily", "once", "twice", "thrice", "times", "every", "each", "per", "for", "as", "needed", "prn", "bid", "tid",
+    "qid", "qd", "od", "morning", "evening", "night", "bedtime", "orally", "oral", "po", "by", "mouth", "at", "in",
+    "one", "two", "three", "four", "weekly", "monthly", "hourly", "days", "weeks", "x"
+}
+_TOKEN_STOPWORDS = {"of", "the", "and", "or", "with", "without", "to", "in", "on", "a", "an", "due", "possible", "likely", "probable"}
+
+def _clean_medication(entry: str) -> str:
+    words = [w.strip("\"'-:.") for w in re.sub(r"\(.*?\)|\[.*?\]", " ", entry).split()]
+    words = [w for w in words if w]
+    while words and words[0] in _MEDICATION_LEAD_INS:
+        words.pop(0)
+    name = []
+    for word in words:
+        if any(ch.isdigit() for ch in word) or word in _DOSE_WORDS:
+            break
+        name.append(word)
+    if not name or all(w in _NON_DRUG_WORDS or w in _MEDICATION_LEAD_INS for w in name):
+        return ""
+    return " ".join(name)
+
+def medication_names(structured_summary: dict) -> List[str]:
+    """
+    Extracts drug names from the free-text Medications field: "Started on
+    Metformin 500mg twice daily (with food)" becomes "metformin". Lead-ins
+    ("started on", "continue") are dropped, the name ends at the first dose
+    or frequency word, and entries that are only dose/frequency text or a
+    generic "current medications" are skipped.
+    """
+    names = []
+    for entry in _split_terms((structured_summary or {}).get("Medications"), r"[,;\n]|\band\b|\bplus\b"):
+        name = _clean_medication(entry)
+        if name:
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+def _word_tokens(phrases: List[str]) -> List[str]:
+    tokens = []
+    for phrase in phrases:
+        tokens.extend(w for w in re.findall(r"[a-z0-9]+", phrase) if w not in _TOKEN_STOPWORDS)
+    return list(dict.fromkeys(tokens))
+
+def summary_index_fields(structured_summary: dict) -> Dict[str, List[str]]:
+    """
+    The appointment fields extracted from the structured summary: the
+    diagnosis and medication phrases, plus their individual words, which the
+    /appointments/search indexes are built on so "diabetes" finds "type 2
+    diabetes mellitus".
+    """
+    diagnoses = diagnosis_terms(structured_summary)
+    medications = medication_names(structured_summary)
+    return {
+        "diagnoses": diagnoses,
+        "medications": medications,
+        "diagnosis_tokens": _word_tokens(diagnoses),
+        "medication_tokens": _word_tokens(medications)
+    }
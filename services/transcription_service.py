@@ -0,0 +1,143 @@
+# services/transcription_service.py
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+import assemblyai as aai
+from assemblyai.streaming.v3 import (
+    StreamingClient, StreamingClientOptions, StreamingError, StreamingEvents, StreamingParameters, TurnEvent
+)
+
+from config import settings
+from metrics import track_dependency
+
+logger = logging.getLogger(__name__)
+
+aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
+
+@dataclass
+class TranscriptEvent:
+    type: str  # "partial", "final" or "error"
+    text: str
+
+class StreamingTranscriptionSession(ABC):
+    """
+    One live transcription stream. Audio frames (16-bit little-endian mono PCM
+    at `sample_rate`) go in through `send_audio`; partial and final utterances
+    come out of `events()` until `close()` has flushed the backend.
+    """
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.final_utterances: List[str] = []
+        self._events: asyncio.Queue = asyncio.Queue()
+
+    def _emit(self, event: Optional[TranscriptEvent]):
+        if event is not None and event.type == "final":
+            self.final_utterances.append(event.text)
+        self._events.put_nowait(event)
+
+    @property
+    def transcript(self) -> str:
+        return "\n".join(self.final_utterances)
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+    async def start(self):
+        pass
+
+    @abstractmethod
+    async def send_audio(self, frame: bytes):
+        ...
+
+    async def close(self):
+        self._emit(None)
+
+class AssemblyAIStreamingSession(StreamingTranscriptionSession):
+    """Forwards audio to AssemblyAI's v3 streaming API, whose event handlers run on the SDK's own threads."""
+    def __init__(self, sample_rate: int):
+        super().__init__(sample_rate)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[StreamingClient] = None
+
+    def _on_turn(self, client: StreamingClient, event: TurnEvent):
+        if not event.transcript:
+            return
+        # With format_turns the end of a turn arrives twice, unformatted and
+        # then formatted; only the formatted one is the final utterance.
+        kind = "final" if event.end_of_turn and event.turn_is_formatted else "partial"
+        self._loop.call_soon_threadsafe(self._emit, TranscriptEvent(kind, event.transcript))
+
+    def _on_error(self, client: StreamingClient, error: StreamingError):
+        logger.error(f"AssemblyAI streaming transcription error: {error}")
+        self._loop.call_soon_threadsafe(self._emit, TranscriptEvent("error", str(error)))
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._client = StreamingClient(StreamingClientOptions(api_key=settings.ASSEMBLYAI_API_KEY))
+        self._client.on(StreamingEvents.Turn, self._on_turn)
+        self._client.on(StreamingEvents.Error, self._on_error)
+        with track_dependency("assemblyai", "realtime_connect"):
+            await asyncio.to_thread(
+                self._client.connect, StreamingParameters(sample_rate=self.sample_rate, format_turns=True)
+            )
+
+    async def send_audio(self, frame: bytes):
+        # stream() only enqueues the frame for the SDK's writer thread.
+        self._client.stream(frame)
+
+    async def close(self):
+        if self._client is not None:
+            # Blocks until AssemblyAI has sent the remaining turns and the session ends.
+            with track_dependency("assemblyai", "realtime_close"):
+                await asyncio.to_thread(self._client.disconnect, terminate=True)
+        await super().close()
+
+class FakeStreamingSession(StreamingTranscriptionSession):
+    """
+    Deterministic local backend for tests and offline development: every
+    `utterance_seconds` of audio becomes one final utterance, with a partial
+    after each frame.
+    """
+    def __init__(self, sample_rate: int, utterance_seconds: float = 2.0):
+        super().__init__(sample_rate)
+        self._bytes_per_second = sample_rate * 2
+        self._bytes_per_utterance = int(self._bytes_per_second * utterance_seconds)
+        self._buffered = 0
+
+    def _text(self) -> str:
+        seconds = self._buffered / self._bytes_per_second
+        return f"Utterance {len(self.final_utterances) + 1} ({seconds:.1f}s of audio)"
+
+    async def send_audio(self, frame: bytes):
+        self._buffered += len(frame)
+        if self._buffered >= self._bytes_per_utterance:
+            self._emit(TranscriptEvent("final", self._text()))
+            self._buffered = 0
+        else:
+            self._emit(TranscriptEvent("partial", self._text()))
+
+    async def close(self):
+        if self._buffered:
+            self._emit(TranscriptEvent("final", self._text()))
+            self._buffered = 0
+        await super().close()
+
+STREAMING_BACKENDS = {
+    "assemblyai": AssemblyAIStreamingSession,
+    "fake": FakeStreamingSession,
+}
+
+def create_streaming_session(sample_rate: int) -> StreamingTranscriptionSession:
+    """Builds a session for the backend named by STREAMING_TRANSCRIPTION_BACKEND."""
+    backend = STREAMING_BACKENDS.get(settings.STREAMING_TRANSCRIPTION_BACKEND)
+    if backend is None:
+        raise ValueError(f"Unknown streaming transcription backend '{settings.STREAMING_TRANSCRIPTION_BACKEND}'.")
+    return backend(sample_rate)
@@ -0,0 +1,247 @@
+# services/upload_service.py
+
+import asyncio
+import base64
+import glob
+import logging
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+import weakref
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+class UploadError(Exception):
+    """Base class for chunked upload failures."""
+
+class UploadOffsetMismatch(UploadError):
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Chunk offset does not match the current upload offset ({expected_offset}).")
+        self.expected_offset = expected_offset
+
+class UploadChecksumMismatch(UploadError):
+    """The chunk's digest did not match the Upload-Checksum header; the chunk was discarded."""
+
+class UploadLengthExceeded(UploadError):
+    """The chunk would grow the upload past its declared length; the chunk was discarded."""
+
+class UploadIncomplete(UploadError):
+    """Finalize was called before all declared bytes arrived."""
+
+SUPPORTED_CHECKSUM_ALGORITHMS = {"sha256", "sha1", "md5"}
+
+def parse_checksum_header(value: Optional[str]):
+    """Parses a tus `Upload-Checksum: <algorithm> <base64 digest>` header."""
+    if not value:
+        return None
+    try:
+        algorithm, digest = value.strip().split(" ", 1)
+        expected = base64.b64decode(digest.strip(), validate=True)
+    except ValueError:
+        raise UploadError("Malformed Upload-Checksum header.")
+    algorithm = algorithm.lower()
+    if algorithm not in SUPPORTED_CHECKSUM_ALGORITHMS:
+        raise UploadError(f"Unsupported checksum algorithm '{algorithm}'.")
+    return algorithm, expected
+
+class ChunkedUploadStore:
+    """
+    Keeps in-progress audio uploads next to the appointment's audio files:
+    <root>/<user_id>/<appointment_id>/uploads/<upload_id>.part plus a .json
+    sidecar with the metadata. Modelled on the tus protocol: chunks are
+    appended at the offset the client says it is sending from, a chunk is
+    either fully committed or rolled back, and clients resume from the
+    offset reported by the store.
+    """
+    def __init__(self, root: str, expiry: timedelta):
+        self.root = root
+        self.expiry = expiry
+        # One lock per upload_id for as long as a request is using it, so two
+        # PATCHes at the same offset cannot both pass the offset check.
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    def _lock(self, upload_id: str) -> asyncio.Lock:
+        lock = self._locks.get(upload_id)
+        if lock is None:
+            lock = self._locks[upload_id] = asyncio.Lock()
+        return lock
+
+    def _upload_dir(self, user_id: str, appointment_id: str) -> str:
+        return os.path.join(self.root, user_id, appointment_id, "uploads")
+
+    def _paths(self, user_id: str, appointment_id: str, upload_id: str):
+        upload_dir = self._upload_dir(user_id, appointment_id)
+        return os.path.join(upload_dir, f"{upload_id}.part"), os.path.join(upload_dir, f"{upload_id}.json")
+
+    def _save_meta(self, meta: dict):
+        _, meta_path = self._paths(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def create(
+        self,
+        user_id: str,
+        appointment_id: str,
+        filename: str,
+        content_type: Optional[str],
+        length: Optional[int] = None
+    ) -> dict:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(user_id, appointment_id), exist_ok=True)
+        part_path, _ = self._paths(user_id, appointment_id, upload_id)
+        open(part_path, "wb").close()
+        meta = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "appointment_id": appointment_id,
+            "filename": os.path.basename(filename) or f"{upload_id}.webm",
+            "content_type": content_type,
+            "offset": 0,
+            "length": length,
+            "created_at": datetime.now().isoformat()
+        }
+        self._save_meta(meta)
+        return meta
+
+    def get(self, user_id: str, appointment_id: str, upload_id: str) -> Optional[dict]:
+        if not _UPLOAD_ID_RE.match(upload_id):
+            return None
+        _, meta_path = self._paths(user_id, appointment_id, upload_id)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    async def append(
+        self,
+        meta: dict,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+        checksum: Optional[tuple] = None
+    ) -> dict:
+        """
+        Appends a streamed chunk that starts at `offset` and returns the updated
+        metadata. If the stream breaks, the checksum does not match or the
+        declared length would be exceeded, the file is truncated back to
+        `offset` so the client can resend the chunk. Appends to one upload are
+        serialised, and the offset is checked against the metadata re-read
+        under the lock; file I/O runs in a worker thread.
+        """
+        async with self._lock(meta["upload_id"]):
+            meta = self.get(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+            if meta is None:
+                raise UploadError("Upload no longer exists.")
+            if meta.get("file_path"):
+                raise UploadError("Upload is already finalized.")
+            if offset != meta["offset"]:
+                raise UploadOffsetMismatch(meta["offset"])
+            part_path, _ = self._paths(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+            digest = hashlib.new(checksum[0]) if checksum else None
+            written = 0
+            f = await asyncio.to_thread(open, part_path, "r+b")
+            try:
+                await asyncio.to_thread(f.seek, offset)
+                try:
+                    async for chunk in chunks:
+                        written += len(chunk)
+                        if meta.get("length") is not None and offset + written > meta["length"]:
+                            raise UploadLengthExceeded(f"Upload is limited to {meta['length']} bytes.")
+                        await asyncio.to_thread(f.write, chunk)
+                        if digest:
+                            digest.update(chunk)
+                    if digest and digest.digest() != checksum[1]:
+                        raise UploadChecksumMismatch("Chunk checksum does not match Upload-Checksum.")
+                except BaseException:
+                    # Synchronous on purpose: this must also complete when the request is cancelled.
+                    f.truncate(offset)
+                    raise
+                await asyncio.to_thread(f.truncate, offset + written)
+            finally:
+                f.close()
+            meta["offset"] += written
+            await asyncio.to_thread(self._save_meta, meta)
+            return meta
+
+    async def finalize(self, meta: dict) -> str:
+        """
+        Moves the completed upload next to the appointment's other audio and
+        returns its path. The metadata is kept, recording the moved file, so
+        finalize can be retried if processing fails; call `complete` once
+        processing has succeeded.
+        """
+        async with self._lock(meta["upload_id"]):
+            meta = self.get(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+            if meta is None:
+                raise UploadError("Upload no longer exists.")
+            if meta.get("file_path") and os.path.exists(meta["file_path"]):
+                return meta["file_path"]
+            if meta["offset"] == 0:
+                raise UploadIncomplete("Upload is empty.")
+            if meta.get("length") is not None and meta["offset"] != meta["length"]:
+                raise UploadIncomplete(f"Upload has {meta['offset']} of {meta['length']} bytes.")
+            part_path, _ = self._paths(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+            audio_dir = os.path.join(self.root, meta["user_id"], meta["appointment_id"])
+            file_path = os.path.join(audio_dir, meta["filename"])
+            await asyncio.to_thread(shutil.move, part_path, file_path)
+            meta["file_path"] = file_path
+            self._save_meta(meta)
+            return file_path
+
+    def complete(self, meta: dict):
+        """Forgets a finalized upload after its audio has been processed."""
+        _, meta_path = self._paths(meta["user_id"], meta["appointment_id"], meta["upload_id"])
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+    def cleanup_all_expired(self) -> int:
+        """Removes partial uploads, in any appointment, untouched for longer than the expiry; returns the file count."""
+        removed = 0
+        cutoff = (datetime.now() - self.expiry).timestamp()
+        for path in glob.glob(os.path.join(self.root, "*", "*", "uploads", "*")):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                # Finalized or swept concurrently.
+                pass
+        return removed
+
+    def start_cleanup(self, interval: float):
+        """Sweeps abandoned partial uploads now and then every `interval` seconds."""
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop(interval))
+
+    async def stop_cleanup(self):
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+
+    async def _cleanup_loop(self, interval: float):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.cleanup_all_expired)
+                if removed:
+                    logger.info(f"Removed {removed} expired partial upload files")
+            except Exception as e:
+                logger.error(f"Upload cleanup failed: {e}")
+            await asyncio.sleep(interval)
+
+upload_store = ChunkedUploadStore(
+    settings.AUDIO_FILES_DIR,
+    expiry=timedelta(hours=settings.UPLOAD_EXPIRY_HOURS)
+)
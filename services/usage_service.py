@@ -0,0 +1,94 @@
+# services/usage_service.py
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from database import db
+from metrics import GEMINI_COST, GEMINI_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens. Thinking tokens are billed at the output rate.
+MODEL_PRICING = {
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.31, "output": 10.00},
+}
+
+TOKEN_FIELDS = ("prompt_tokens", "cached_tokens", "thinking_tokens", "output_tokens", "tool_use_prompt_tokens", "total_tokens")
+
+def estimate_cost(usage: Dict[str, Any]) -> float:
+    pricing = MODEL_PRICING.get(usage["model"])
+    if pricing is None:
+        return 0.0
+    uncached = usage["prompt_tokens"] + usage["tool_use_prompt_tokens"] - usage["cached_tokens"]
+    cost = (
+        uncached * pricing["input"]
+        + usage["cached_tokens"] * pricing["cached_input"]
+        + (usage["thinking_tokens"] + usage["output_tokens"]) * pricing["output"]
+    ) / 1_000_000
+    return round(cost, 8)
+
+def extract_usage(response, model: str) -> Optional[Dict[str, Any]]:
+    """Turns a generate_content response's usage_metadata into a plain dict with an estimated cost."""
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is None:
+        return None
+    usage = {
+        "model": model,
+        "prompt_tokens": metadata.prompt_token_count or 0,
+        "cached_tokens": metadata.cached_content_token_count or 0,
+        "thinking_tokens": metadata.thoughts_token_count or 0,
+        "output_tokens": metadata.candidates_token_count or 0,
+        "tool_use_prompt_tokens": metadata.tool_use_prompt_token_count or 0,
+        "total_tokens": metadata.total_token_count or 0,
+    }
+    usage["cost_usd"] = estimate_cost(usage)
+    return usage
+
+def record_usage(user_id: str, endpoint: str, usage: Optional[Dict[str, Any]], **refs):
+    """
+    Stores one Gemini call's usage for aggregation. `refs` link it to the
+    record it produced, e.g. chat_id or appointment_id. Never raises: losing
+    an accounting row must not fail the user's request.
+    """
+    if not usage:
+        return
+    for field in ("prompt_tokens", "thinking_tokens", "output_tokens"):
+        GEMINI_TOKENS.labels(endpoint, field.removesuffix("_tokens")).inc(usage[field])
+    GEMINI_COST.labels(endpoint).inc(usage["cost_usd"])
+    try:
+        db.usage_collection.insert_one({
+            "user_id": user_id,
+            "endpoint": endpoint,
+            **usage,
+            **refs,
+            "created_at": datetime.now(timezone.utc)
+        })
+    except Exception as e:
+        logger.error(f"Failed to record Gemini usage for user {user_id}: {e}")
+
+def _totals_group(key) -> dict:
+    group = {"_id": key, "calls": {"$sum": 1}, "cost_usd": {"$sum": "$cost_usd"}}
+    for field in TOKEN_FIELDS:
+        group[field] = {"$sum": f"${field}"}
+    return {"$group": group}
+
+def usage_stats(days: int, top_users: int) -> Dict[str, Any]:
+    """Aggregates recorded usage over the last `days`, overall, per endpoint/model and for the heaviest users."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    match = {"$match": {"created_at": {"$gte": since}}}
+    totals = list(db.usage_collection.aggregate([match, _totals_group(None)]))
+    by_endpoint = db.usage_collection.aggregate([
+        match, _totals_group({"endpoint": "$endpoint", "model": "$model", "route": "$route"}), {"$sort": {"cost_usd": -1}}
+    ])
+    by_user = db.usage_collection.aggregate([
+        match, _totals_group("$user_id"), {"$sort": {"cost_usd": -1}}, {"$limit": top_users}
+    ])
+    return {
+        "since": since,
+        "totals": totals[0] if totals else {"calls": 0},
+        "by_endpoint": [{**row, **row["_id"]} for row in by_endpoint],
+        "by_user": [{**row, "user_id": row["_id"]} for row in by_user],
+    }
@@ -0,0 +1,88 @@
+# tracing.py
+import logging
+import sys
+from typing import Optional, TextIO
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.trace import SpanKind
+from pymongo import monitoring
+
+from config import settings
+
+tracer = trace.get_tracer("sageai")
+
+_provider: Optional[TracerProvider] = None
+_trace_file: Optional[TextIO] = None
+
+def configure_tracing():
+    """
+    Installs the SDK tracer provider. TRACING_EXPORTER picks where finished
+    spans go: "console" (stdout), "file" (one JSON span per line in
+    TRACING_FILE) or "none". With "none" spans are still created, so trace
+    IDs keep appearing in log records.
+    """
+    global _provider, _trace_file
+    _provider = TracerProvider(resource=Resource.create({"service.name": "sageai-api"}))
+    if settings.TRACING_EXPORTER == "console":
+        _provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter(out=sys.stdout)))
+    elif settings.TRACING_EXPORTER == "file":
+        _trace_file = open(settings.TRACING_FILE, "a")
+        exporter = ConsoleSpanExporter(
+            out=_trace_file,
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+def shutdown_tracing():
+    """Flushes spans still queued in the batch processor, then closes TRACING_FILE."""
+    global _trace_file
+    if _provider is not None:
+        _provider.shutdown()
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+class TraceContextFilter(logging.Filter):
+    """
+    Stamps records with the active trace and span IDs. Must run on the
+    logging thread's caller (i.e. on the queue handler), where the request's
+    span is still current.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            record.trace_id = format(context.trace_id, "032x")
+            record.span_id = format(context.span_id, "016x")
+        return True
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """Opens a client span for every MongoDB command, parented to whatever span issued it."""
+    def __init__(self):
+        self._spans = {}
+
+    def started(self, event):
+        span = tracer.start_span(
+            f"mongodb.{event.command_name}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+            }
+        )
+        self._spans[(event.request_id, event.connection_id)] = span
+
+    def succeeded(self, event):
+        span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            span.end()
+
+    def failed(self, event):
+        span = self._spans.pop((event.request_id, event.connection_id), None)
+        if span is not None:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(event.failure)))
+            span.end()